@@ -2,6 +2,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from functools import lru_cache
 from typing import Annotated,TypedDict, List, Tuple, Union, Literal
 
 # langgraph 相關
@@ -18,22 +19,27 @@ class State(TypedDict):
     messages: Annotated[list, add_messages]
 
 # 步驟 2：定義語言模型
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
+@lru_cache(maxsize=None)
+def get_llm():
+    return LLMManager().get_llm("chat")
 
 # 步驟 3：添加語言模型節點
 def chatbot(state: State):
-    return {"messages": [llm.invoke(state["messages"])]}
+    return {"messages": [get_llm().invoke(state["messages"])]}
 
 # 步驟 4：構建圖
-def build_graph():
+def build_graph(checkpointer=None):
+    """
+    Args:
+        checkpointer: 要保存對話時傳入，例如 utils/delta_checkpointer.py 的 DeltaCheckpointSaver
+    """
     graph_builder = StateGraph(State)
     graph_builder.add_node("chatbot", chatbot)
 
     graph_builder.set_entry_point("chatbot")
     graph_builder.set_finish_point("chatbot")
 
-    graph = graph_builder.compile() # 步驟 5：編譯圖
+    graph = graph_builder.compile(checkpointer=checkpointer) # 步驟 5：編譯圖
 
     return graph
 
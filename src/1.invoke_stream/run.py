@@ -2,6 +2,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from functools import lru_cache
 from typing import Annotated  # Annotated 用於為類型添加額外元數據，例如在這裡用於指定 list 的處理方式
 from typing_extensions import TypedDict  # TypedDict 是一種特殊的字典類型，用於定義具有固定鍵和類型的字典結構，與普通 dict 不同，它提供類型檢查和更好的 IDE 支持
 from langgraph.graph import StateGraph
@@ -14,8 +15,9 @@ class State(TypedDict):
     messages: Annotated[list, add_messages]  # messages 是一個列表，使用 add_messages 來處理消息的添加邏輯
 
 # 步驟 2：定義語言模型
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
+@lru_cache(maxsize=None)
+def get_llm():
+    return LLMManager().get_llm("chat")
 
 # 步驟 3：添加語言模型節點
 def preprocess(state: State):
@@ -27,7 +29,7 @@ def chatbot(state: State):
     # 這個函數代表圖中的一個節點，它接收當前狀態，調用 LLM 生成回應，並返回更新後的狀態
     # 這裡的動作是將用戶的消息傳遞給 LLM，並將回應添加到 messages 中
     print(state["messages"])
-    return {"messages": [llm.invoke(state["messages"])]}
+    return {"messages": [get_llm().invoke(state["messages"])]}
 
 
 def build_graph():
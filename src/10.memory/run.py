@@ -1,20 +1,53 @@
+"""
+長期對話的冷熱分層（HISTORY_DIR）
+
+設定 HISTORY_DIR 後，每輪對話結束時超過 HISTORY_HOT_WINDOW（預設 20）則的舊訊息會移到
+HISTORY_DIR 下的區段檔（utils/tiered_messages.py），state 與 checkpoint 只保留最近的訊息。
+模型需要更早的內容時可以呼叫 recall_history 工具，只載回符合的訊息。
+
+上下文視窗修剪（build_graph(max_tokens=...) 或 CONTEXT_MAX_TOKENS）
+
+每次呼叫模型前由 trim 節點以 utils/incremental_trim.py 更新視窗，state 中保存視窗起點與 token 前綴和，
+每輪只計算新增的訊息；模型只會看到系統訊息加上從使用者訊息開始、不超過上限的最近訊息。
+
+滾動摘要（build_graph(summary_tokens=...) 或 SUMMARY_MAX_TOKENS）
+
+未摘要的訊息超過門檻時，較早的訊息會折疊進 state 的 summary（utils/rolling_summary.py），
+呼叫模型時摘要放在最前面。摘要在回應產生之後才進行：SUMMARY_MODE=background（預設）在背景執行，
+下一輪開始時套用；SUMMARY_MODE=inline 在同一輪結束前完成。
+同時設定 HISTORY_DIR 時，折疊的訊息會先寫入冷資料層，仍可用 recall_history 找回。
+延遲與 prompt 大小的比較：python src/10.memory/summary_benchmark.py
+"""
+
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from typing import Annotated, List, Tuple, TypedDict, Literal
+from functools import lru_cache, partial
+from typing import Annotated, List, Optional, Tuple, TypedDict, Literal
 
 from langgraph.graph import StateGraph
 from langgraph.graph.message import add_messages
 from llm import LLMManager
 from langchain_core.tools import tool
 
-from langgraph.graph import MessagesState, StateGraph, START
+from langgraph.graph import MessagesState, StateGraph, START, END
 from langgraph.prebuilt import ToolNode
 
 from utils.graph2mermaid import create_mermaid # for saving mermaid code
 from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.checkpoint.memory import MemorySaver
+from utils.compact_serde import get_serde
+from utils.tiered_messages import TieredMessageStore, archive_messages
+from utils.incremental_trim import IncrementalTrimmer, trimmed_window
+from utils.rolling_summary import RollingSummarizer, with_summary
+
+class ChatState(MessagesState):
+    window_start: int
+    token_prefix: List[int]
+    counted_id: Optional[str]
+    summary: str
 
 @tool
 def search_taiwan_info(query: str):
@@ -25,41 +58,133 @@ def search_taiwan_info(query: str):
     ]
 
 
-tools = [search_taiwan_info]
-tool_node = ToolNode(tools)
+@tool
+def recall_history(query: str, config: RunnableConfig):
+    """搜尋這個對話中較早、已不在目前上下文裡的訊息。"""
+    store = get_history_store()
+    if store is None:
+        return "沒有更早的對話紀錄。"
+    messages = store.search(config["configurable"]["thread_id"], query)
+    if not messages:
+        return f"較早的對話中沒有提到「{query}」。"
+    return "\n".join(f"{message.type}: {message.text()}" for message in messages)
+
+
+@lru_cache(maxsize=None)
+def get_history_store():
+    """依 HISTORY_DIR 取得冷資料層，未設定時為 None（所有訊息都留在 state 中）"""
+    directory = os.getenv("HISTORY_DIR")
+    return TieredMessageStore(directory, serde=get_serde()) if directory else None
+
+
+@lru_cache(maxsize=None)
+def get_tools():
+    return [search_taiwan_info] + ([recall_history] if get_history_store() else [])
 
 
 # 定義語言模型
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
-bound_model = llm.bind_tools(tools)
+@lru_cache(maxsize=None)
+def get_llm():
+    return LLMManager().get_llm("chat")
+
+@lru_cache(maxsize=None)
+def get_bound_model():
+    return get_llm().bind_tools(get_tools())
 
 # 步驟 3：添加語言模型節點
 """定義節點與流程控制函數"""
-def should_continue(state: MessagesState) -> Literal["action", "__end__"]:
+def should_continue(state: ChatState) -> Literal["action", "done"]:
     """決定下一個執行的節點。"""
     last_message = state["messages"][-1]
     if not last_message.tool_calls:
-        return "__end__"
+        return "done"
     return "action"
 
-def call_model(state: MessagesState):
-    response = bound_model.invoke(state["messages"])
+def call_model(state: ChatState):
+    # 有 trim 節點時只送出視窗內的訊息，有摘要時放在最前面
+    messages = with_summary(state.get("summary"), trimmed_window(state["messages"], state))
+    response = get_bound_model().invoke(messages)
     return {"messages": response}
 
+def _folded(update, state: ChatState, config: RunnableConfig):
+    """折疊的訊息從 state 移除前，先寫入冷資料層（有設定 HISTORY_DIR 時）"""
+    store = get_history_store()
+    if update and store:
+        removed = {message.id for message in update["messages"]}
+        store.append_new(config["configurable"]["thread_id"], [message for message in state["messages"] if message.id in removed])
+    return update or {}
+
+def apply_summary(state: ChatState, config: RunnableConfig, summarizer: RollingSummarizer):
+    """套用上一輪已完成的背景摘要（不等待）"""
+    update = summarizer.collect(config["configurable"]["thread_id"], state["messages"])
+    return _folded(update, state, config)
+
+def summarize_history(state: ChatState, config: RunnableConfig, summarizer: RollingSummarizer):
+    """回應產生後檢查是否需要摘要（background 只送出請求）"""
+    update = summarizer.request(config["configurable"]["thread_id"], state.get("summary", ""), state["messages"])
+    return _folded(update, state, config)
+
+def trim_context(state: ChatState, trimmer: IncrementalTrimmer):
+    """更新上下文視窗（只計算上次之後新增的訊息）"""
+    return trimmer.update(state["messages"], state)
+
+def archive_history(state: ChatState, config: RunnableConfig):
+    """把超出熱資料視窗的舊訊息移到冷資料層"""
+    hot_window = int(os.getenv("HISTORY_HOT_WINDOW", "20"))
+    thread_id = config["configurable"]["thread_id"]
+    return {"messages": archive_messages(get_history_store(), thread_id, state["messages"], hot_window=hot_window)}
+
 # 步驟 4：構建圖
-def build_graph():
-    workflow = StateGraph(MessagesState)
+def build_graph(checkpointer=None, max_tokens=None, summary_tokens=None, summary_mode=None):
+    """
+    Args:
+        checkpointer: 自訂的 checkpointer（例如 SqliteCheckpointSaver，或只存差異的 DeltaCheckpointSaver），
+            預設為 MemorySaver（序列化器依 CHECKPOINT_SERDE，compact 可縮小訊息 checkpoint 並加快讀寫）
+        max_tokens: 送給模型的上下文 token 上限，預設為環境變數 CONTEXT_MAX_TOKENS，未設定時不修剪
+        summary_tokens: 未摘要訊息的 token 門檻，預設為環境變數 SUMMARY_MAX_TOKENS，未設定時不摘要
+        summary_mode: background 或 inline，預設為環境變數 SUMMARY_MODE（background）
+    """
+    max_tokens = max_tokens or int(os.getenv("CONTEXT_MAX_TOKENS", "0"))
+    summary_tokens = summary_tokens or int(os.getenv("SUMMARY_MAX_TOKENS", "0"))
+    summary_mode = summary_mode or os.getenv("SUMMARY_MODE", "background")
+    workflow = StateGraph(ChatState)
     workflow.add_node("agent", call_model)
-    workflow.add_node("action", tool_node)
-    workflow.add_edge(START, "agent")
+    workflow.add_node("action", ToolNode(get_tools()))
+
+    # 每輪開始：套用背景摘要 → 更新視窗 → 模型
+    entry = ["agent"]
+    # 每次呼叫模型前（包含工具回傳後）更新視窗
+    model_entry = "agent"
+    if max_tokens:
+        trimmer = IncrementalTrimmer(max_tokens, include_system=True, start_on="human")
+        workflow.add_node("trim", partial(trim_context, trimmer=trimmer))
+        entry.insert(0, "trim")
+        model_entry = "trim"
+    # 回應產生後：摘要 → 移到冷資料層
+    done = []
+    if summary_tokens:
+        summarizer = RollingSummarizer(get_llm, max_tokens=summary_tokens, background=summary_mode == "background")
+        workflow.add_node("summarize", partial(summarize_history, summarizer=summarizer))
+        done.append("summarize")
+        if summarizer.background:
+            workflow.add_node("apply_summary", partial(apply_summary, summarizer=summarizer))
+            entry.insert(0, "apply_summary")
+    if get_history_store():
+        workflow.add_node("archive", archive_history)
+        done.append("archive")
+
+    for source, target in zip([START] + entry, entry):
+        workflow.add_edge(source, target)
     workflow.add_conditional_edges(
         "agent",
         should_continue,
+        {"action": "action", "done": done[0] if done else END},
     )
-    workflow.add_edge("action", "agent")
+    workflow.add_edge("action", model_entry)
+    for source, target in zip(done, done[1:] + [END]):
+        workflow.add_edge(source, target)
 
-    memory = MemorySaver()
+    memory = checkpointer or MemorySaver(serde=get_serde())
     graph = workflow.compile(checkpointer=memory)
 
     return graph
@@ -88,5 +213,11 @@ def chat_interface(graph):
 if __name__ == "__main__":
     # 運行聊天界面
     graph = build_graph()
+    # 對話記憶存在 SQLite 檔案，重啟後可以接續同一個 thread_id
+    # from utils.sqlite_checkpointer import SqliteCheckpointSaver
+    # graph = build_graph(checkpointer=SqliteCheckpointSaver("checkpoints.sqlite", keep_last=50))
+    # 以精簡格式序列化（CHECKPOINT_SERDE=compact 效果相同）
+    # from utils.compact_serde import CompactSerializer
+    # graph = build_graph(checkpointer=SqliteCheckpointSaver("checkpoints.sqlite", serde=CompactSerializer()))
     chat_interface(graph)
     # create_mermaid(graph)
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+比較 10.memory 在長對話下有無滾動摘要的每輪延遲與 prompt 大小
+
+每種模式先以同一個 thread 對話到第 T-1 輪，再從該 checkpoint 分岔執行 --repeats 次第 T 輪，
+統計第 T 輪的延遲 p50 / p99 與送給模型的 prompt token 數：
+- full：每輪送出完整歷史（原本的行為）
+- background：SUMMARY_MAX_TOKENS 門檻的滾動摘要，在背景執行
+- inline：同上，但在同一輪結束前完成摘要（延遲包含摘要）
+
+預設使用 fake 後端（LLM_BACKEND=fake），回覆與摘要為固定長度的文字，並以 --ms-per-1k-tokens 模擬模型處理 prompt 的時間
+（依實際送出的 token 數延遲），設為 0 時只量測 graph 與 checkpoint 的開銷。
+設定 LLM_BACKEND=openai 等真實後端時請把 --ms-per-1k-tokens 設為 0。
+
+    python src/10.memory/summary_benchmark.py --turns 10 100 500
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import time
+import uuid
+import argparse
+import statistics
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+
+from llm import LLMManager
+from utils.rolling_summary import SUMMARY_PROMPT
+from utils.token_counter import get_token_counter
+
+QUESTION = "第 {turn} 輪：我是小明，住在台北，最近想安排週末去九份和平溪放天燈，有什麼建議？"
+ANSWER = "建議週六早上從台北搭火車到瑞芳，轉乘平溪線到十分放天燈，傍晚再搭公車上九份看夜景、吃芋圓，週日早上避開人潮再回台北。"
+SUMMARY = "使用者小明住在台北，正在規劃週末到九份與平溪的行程，已討論交通方式、放天燈地點與九份的夜景和小吃。" * 2
+SUMMARY_SYSTEM = SUMMARY_PROMPT.messages[0].prompt.template
+
+
+def fake_responder(messages, tools) -> Optional[str]:
+    """fake 後端的回應：摘要請求回傳固定長度的摘要，其餘回傳固定長度的回覆"""
+    if messages and messages[0].type == "system" and messages[0].content == SUMMARY_SYSTEM:
+        return SUMMARY
+    return ANSWER
+
+
+class PromptMeter(BaseCallbackHandler):
+    """記錄每次呼叫模型的 prompt token 數，並依 token 數模擬模型延遲"""
+
+    run_inline = True
+
+    def __init__(self, ms_per_1k_tokens: float):
+        self.ms_per_1k_tokens = ms_per_1k_tokens
+        self.prompt_tokens: List[int] = []
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, tags=None, **kwargs: Any) -> None:
+        tokens = get_token_counter()(messages[0])
+        if "rolling_summary" not in (tags or []):
+            self.prompt_tokens.append(tokens)
+        if self.ms_per_1k_tokens:
+            time.sleep(tokens / 1000 * self.ms_per_1k_tokens / 1000)
+
+
+def run(mode: str, turns: List[int], repeats: int, summary_tokens: int, ms_per_1k_tokens: float) -> List[Dict[str, Any]]:
+    import run as chat
+
+    if os.getenv("LLM_BACKEND") == "fake":
+        # 預設的 fake 回應會重複輸入內容，摘要會跟著對話一起變長，改用固定長度的回覆與摘要
+        chat.get_llm = lru_cache(maxsize=None)(lambda: LLMManager().get_llm("chat", responder=fake_responder))
+        chat.get_bound_model.cache_clear()
+    if mode == "full":
+        graph = chat.build_graph()
+    else:
+        graph = chat.build_graph(summary_tokens=summary_tokens, summary_mode=mode)
+    meter = PromptMeter(ms_per_1k_tokens)
+    thread = {"configurable": {"thread_id": f"benchmark-{mode}-{uuid.uuid4().hex[:8]}"}, "callbacks": [meter]}
+
+    results = []
+    done = 0
+    for target in sorted(turns):
+        while done < target - 1:
+            done += 1
+            graph.invoke({"messages": [HumanMessage(content=QUESTION.format(turn=done))]}, thread)
+        checkpoint_id = graph.get_state(thread).config["configurable"]["checkpoint_id"]
+
+        latencies: List[float] = []
+        meter.prompt_tokens.clear()
+        for _ in range(repeats):
+            fork = {"configurable": {**thread["configurable"], "checkpoint_id": checkpoint_id}, "callbacks": [meter]}
+            start = time.perf_counter()
+            graph.invoke({"messages": [HumanMessage(content=QUESTION.format(turn=target))]}, fork)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        results.append({
+            "turn": target,
+            "p50_ms": statistics.median(latencies),
+            "p99_ms": latencies[min(len(latencies) - 1, round(0.99 * (len(latencies) - 1)))],
+            "prompt_tokens": max(meter.prompt_tokens),
+        })
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="比較有無滾動摘要的每輪延遲與 prompt 大小")
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--modes", nargs="+", default=["full", "background", "inline"])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--summary-tokens", type=int, default=1500)
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=20.0)
+    args = parser.parse_args()
+    os.environ.setdefault("LLM_BACKEND", "fake")
+
+    print(f"{'turn':>5} {'mode':<11} {'p50_ms':>8} {'p99_ms':>8} {'prompt_tokens':>14}")
+    for mode in args.modes:
+        for result in run(mode, args.turns, args.repeats, args.summary_tokens, args.ms_per_1k_tokens):
+            print(f"{result['turn']:>5} {mode:<11} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['prompt_tokens']:>14,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+import time
 from typing import Annotated,TypedDict, List, Tuple, Union, Literal
 
 # langchain,langgraph 相關
@@ -13,49 +14,71 @@ from langchain_core.messages import filter_messages, AIMessage, HumanMessage, Sy
 # utils & llm 相關
 from llm import LLMManager
 from utils.graph2mermaid import create_mermaid # for saving mermaid code
+from utils.token_counter import get_token_counter
+from utils.indexed_messages import IndexedMessages # graph state 可用 utils.indexed_messages.IndexedMessagesState
 
 
-messages = [
-    SystemMessage("你是一個優秀的助理。"),
-    HumanMessage("你叫什麼名字？", id="q1", name="台灣使用者"),
-    AIMessage("我叫小智。", id="a1", name="AI助理"),
-    HumanMessage("你最喜歡的台灣小吃是什麼？", id="q2"),
-    AIMessage("我最喜歡的是臺灣的珍珠奶茶！", id="a2"),
-]
+# 過濾訊息範例
+def filter_demo():
+    messages = [
+        SystemMessage("你是一個優秀的助理。"),
+        HumanMessage("你叫什麼名字？", id="q1", name="台灣使用者"),
+        AIMessage("我叫小智。", id="a1", name="AI助理"),
+        HumanMessage("你最喜歡的台灣小吃是什麼？", id="q2"),
+        AIMessage("我最喜歡的是臺灣的珍珠奶茶！", id="a2"),
+    ]
+
+    filtered_msgs = filter_messages(
+        messages,
+        include_names=("台灣使用者", "AI助理"),
+        include_types=("system",),
+        exclude_ids=("a1",),
+    )
+
+    print(filtered_msgs)
+
+    # 相同的條件以索引查詢，只會碰到符合的訊息
+    indexed = IndexedMessages(messages)
+    assert indexed.filter(
+        include_names=("台灣使用者", "AI助理"),
+        include_types=("system",),
+        exclude_ids=("a1",),
+    ) == filtered_msgs
 
-filtered_msgs = filter_messages(
-    messages,
-    include_names=("台灣使用者", "AI助理"),
-    include_types=("system",),
-    exclude_ids=("a1",),
-)
 
-print(filtered_msgs)
+# 長對話中的過濾：filter_messages 每次掃描整個列表，IndexedMessages 只看符合的訊息
+def indexed_filter_demo(turns: int = 10000, repeats: int = 20):
+    history = []
+    for turn in range(turns):
+        # 每 100 輪有一則來自「客服主管」的訊息
+        name = "客服主管" if turn % 100 == 0 else None
+        history.append(HumanMessage(f"第 {turn} 個問題", id=f"q{turn}", name=name))
+        history.append(AIMessage(f"第 {turn} 個回答", id=f"a{turn}"))
+    indexed = IndexedMessages(history)
 
+    start = time.perf_counter()
+    for _ in range(repeats):
+        expected = filter_messages(history, include_names=("客服主管",), exclude_ids=("q0",))
+    scan_ms = (time.perf_counter() - start) / repeats * 1000
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = indexed.filter(include_names=("客服主管",), exclude_ids=("q0",))
+    index_ms = (time.perf_counter() - start) / repeats * 1000
 
-messages = [
-    SystemMessage(content="你是一個了解台灣文化的助理"),
-    HumanMessage(content="你好！我是小明"),
-    AIMessage(content="你好小明！很高興認識你。"),
-    HumanMessage(content="我最喜歡吃臺灣的牛肉麵"),
-    AIMessage(content="牛肉麵確實是台灣很受歡迎的美食！"),
-    HumanMessage(content="謝謝你的回答"),
-    AIMessage(content="不客氣，很高興能幫到你！"),
-    HumanMessage(content="你喜歡台灣嗎？"),
-    AIMessage(content="當然！台灣有豐富的文化和美食，我很喜歡。"),
-]
+    assert result == expected
+    print(f"{len(history)} 則訊息中找出 {len(result)} 則：filter_messages {scan_ms:.2f} ms，IndexedMessages {index_ms:.3f} ms")
 
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
 
 # 自定義 token 計數函數，因為模型不支援內建計數
 def count_tokens(messages):
-    """近似 token 計數：假設每個字符約為 1 個 token（適用於中文）"""
-    total_chars = sum(len(str(msg.content)) for msg in messages)
-    return total_chars
+    """
+    以 tokenizer 計算 token 數（無法載入 tiktoken 時依中英文等文字系統估算），
+    每則訊息的結果會快取，重複修剪持續增長的對話只需要計算新訊息
+    """
+    return get_token_counter()(messages)
 
 trimmer = trim_messages(
-    max_tokens=50,
+    max_tokens=80,  # 含每則訊息的格式開銷
     strategy="last",
     token_counter=count_tokens,  # 使用自定義計數函數
     include_system=True,  # 保留初始的系統訊息
@@ -63,13 +86,35 @@ trimmer = trim_messages(
     start_on="human",  # 確保第一條訊息（不包括系統訊息）始終是特定類型
 )
 
-# 先修剪消息並印出
-trimmed_messages = trimmer.invoke(messages)
-print("修剪後的消息：")
-print(trimmed_messages)
-print(f"修剪後的 token 數量：{count_tokens(trimmed_messages)}")
+# 修剪訊息範例
+def trim_demo():
+    messages = [
+        SystemMessage(content="你是一個了解台灣文化的助理"),
+        HumanMessage(content="你好！我是小明"),
+        AIMessage(content="你好小明！很高興認識你。"),
+        HumanMessage(content="我最喜歡吃臺灣的牛肉麵"),
+        AIMessage(content="牛肉麵確實是台灣很受歡迎的美食！"),
+        HumanMessage(content="謝謝你的回答"),
+        AIMessage(content="不客氣，很高興能幫到你！"),
+        HumanMessage(content="你喜歡台灣嗎？"),
+        AIMessage(content="當然！台灣有豐富的文化和美食，我很喜歡。"),
+    ]
+
+    # 先修剪消息並印出
+    trimmed_messages = trimmer.invoke(messages)
+    print("修剪後的消息：")
+    print(trimmed_messages)
+    print(f"修剪後的 token 數量：{count_tokens(trimmed_messages)}")
+
+    # 語言模型在執行時才建立，避免 import 時就連線
+    llm = LLMManager().get_llm("chat")
+    chain = trimmer | llm
+    result = chain.invoke(messages)
+    print("最終結果：")
+    print(result)
+
 
-chain = trimmer | llm
-result = chain.invoke(messages)
-print("最終結果：")
-print(result)
\ No newline at end of file
+if __name__ == "__main__":
+    filter_demo()
+    indexed_filter_demo()
+    trim_demo()
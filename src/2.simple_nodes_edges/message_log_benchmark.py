@@ -0,0 +1,105 @@
+"""
+比較 N 個節點串成一條鏈時，operator.add 與 MessageLog 的時間與記憶體
+
+- add + 完整歷史：原本 run.py 的寫法（operator.add，節點回傳 state["messages"] + [...]），
+  列表在每個節點倍增，長度約 2^N，超過 --max-doubling 個節點時略過
+- add + 新訊息：operator.add，節點只回傳新訊息，每個節點複製一次列表，總共 O(N^2)
+- log + 完整歷史：MessageLogChannel，節點仍回傳 state["messages"] + [...]，重複的歷史會被去除
+- log + 新訊息：MessageLogChannel，節點只回傳新訊息（目前 run.py 的寫法）
+
+時間為 --repeats 次 invoke 的中位數；記憶體為 tracemalloc 量到的峰值（另外執行一次）。
+--history 可以讓輸入先帶有一段既有的對話（模擬長期使用的 thread），operator.add 每個節點都要複製這段歷史。
+
+    python src/2.simple_nodes_edges/message_log_benchmark.py --nodes 10 100 1000
+    python src/2.simple_nodes_edges/message_log_benchmark.py --nodes 10 100 1000 --history 10000
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import operator
+import argparse
+import statistics
+import tracemalloc
+from typing import Annotated, Any, Callable, Dict, Tuple
+from typing_extensions import TypedDict
+from langgraph.graph import StateGraph, START, END
+
+from utils.message_log import MessageLog, MessageLogChannel
+
+
+class AddState(TypedDict):
+    messages: Annotated[list, operator.add]
+
+
+class LogState(TypedDict):
+    messages: Annotated[MessageLog, MessageLogChannel]
+
+
+def full_history(state):
+    return {"messages": state["messages"] + [("assistant", f"第 {len(state['messages'])} 則處理完畢")]}
+
+
+def new_only(state):
+    return {"messages": [("assistant", f"第 {len(state['messages'])} 則處理完畢")]}
+
+
+MODES: Dict[str, Tuple[Any, Callable]] = {
+    "add + 完整歷史": (AddState, full_history),
+    "add + 新訊息": (AddState, new_only),
+    "log + 完整歷史": (LogState, full_history),
+    "log + 新訊息": (LogState, new_only),
+}
+
+
+def build_chain(state_schema: Any, node: Callable, nodes: int):
+    graph_builder = StateGraph(state_schema)
+    previous = START
+    for index in range(nodes):
+        graph_builder.add_node(f"node{index}", node)
+        graph_builder.add_edge(previous, f"node{index}")
+        previous = f"node{index}"
+    graph_builder.add_edge(previous, END)
+    return graph_builder.compile()
+
+
+def measure(graph, nodes: int, repeats: int, history: int = 0) -> Tuple[float, float, int]:
+    """回傳 (每次 invoke 的毫秒數, 記憶體峰值 MB, 最後的訊息數)"""
+    config = {"recursion_limit": nodes + 10}
+    inputs = {"messages": [("user", f"第 {index} 個問題") for index in range(history)] + [("user", "你好")]}
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = graph.invoke(inputs, config)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    graph.invoke(inputs, config)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak / 1024 / 1024, len(result["messages"])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="比較 operator.add 與 MessageLog 的時間與記憶體")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--history", type=int, default=0, help="輸入中既有的訊息數")
+    parser.add_argument("--max-doubling", type=int, default=16, help="add + 完整歷史 最多跑幾個節點（列表長度約 2^N）")
+    args = parser.parse_args()
+
+    print(f"{'nodes':>6} {'mode':<12} {'ms':>10} {'peak_MB':>9} {'messages':>12}")
+    for nodes in args.nodes:
+        for mode, (state_schema, node) in MODES.items():
+            if node is full_history and state_schema is AddState and nodes > args.max_doubling:
+                print(f"{nodes:>6} {mode:<12} {'略過':>10} {'':>9} {'~2^' + str(nodes + 1):>12}")
+                continue
+            elapsed, peak, length = measure(build_chain(state_schema, node, nodes), nodes, args.repeats, args.history)
+            print(f"{nodes:>6} {mode:<12} {elapsed:>10.1f} {peak:>9.2f} {length:>12,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,31 +2,36 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-import operator
+from functools import lru_cache
 from typing import Annotated
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END # 入口點(Entry Point)和終點(End Point)
 
 from llm import LLMManager
+from utils.message_log import MessageLog, MessageLogChannel
 
 # 步驟 1：定義狀態
 class AllState(TypedDict):
-    messages: Annotated[list, operator.add] # messages 是一個列表，使用 operator.add 來處理消息的添加邏輯
+    # messages 是只會追加的訊息紀錄，節點只回傳新訊息，追加為 O(1) 且各版本共用同一份資料
+    # （原本的 operator.add 每次都複製整個列表；節點若回傳完整歷史，預設只追加新的部分）
+    # 效能比較：python src/2.simple_nodes_edges/message_log_benchmark.py
+    messages: Annotated[MessageLog, MessageLogChannel]
 
 # 步驟 2：定義語言模型
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
+@lru_cache(maxsize=None)
+def get_llm():
+    return LLMManager().get_llm("chat")
 
 # 步驟 3：添加語言模型節點
 def function1(state):
     last_message = state["messages"][-1][1]
     new_content = last_message + " Function1處理完畢"
-    return {"messages": state["messages"] + [("assistant", new_content)]}
+    return {"messages": [("assistant", new_content)]}
 
 def function2(state):
     last_message = state["messages"][-1][1]
     new_content = last_message + " Function2處理完畢"
-    return {"messages": state["messages"] + [("assistant", new_content)]}
+    return {"messages": [("assistant", new_content)]}
 
 # 定義條件邊
 def where_to_go(state):
@@ -3,6 +3,7 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 import operator
+from functools import lru_cache
 # Annotated 用於為類型添加額外元數據，例如在這裡用於指定 list 的處理方式
 # TypedDict 是一種特殊的字典類型，用於定義具有固定鍵
 # Sequence 用於表示一個有序的元素集合，例如 list 或 tuple
@@ -10,19 +11,18 @@ from typing import TypedDict, Annotated, Sequence
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
-from langchain.prompts import ChatPromptTemplate
+from langchain_core.prompts import ChatPromptTemplate
 from llm import LLMManager
 from langchain_core.messages import AIMessage
-from PIL import Image
-from io import BytesIO
 
 # 步驟 1：定義狀態
 class AllState(TypedDict):
     messages: Annotated[list, operator.add]
 
 # 步驟 2：定義語言模型
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
+@lru_cache(maxsize=None)
+def get_llm():
+    return LLMManager().get_llm("chat")
 
 # add chain
 def extract_city_name(messages: list) -> str:
@@ -38,7 +38,7 @@ def extract_city_name(messages: list) -> str:
     """
     prompt = ChatPromptTemplate.from_template(prompt_str)
 
-    chain = prompt | llm
+    chain = prompt | get_llm()
 
     response = chain.invoke({"user_query": user_query})
     return response
@@ -60,7 +60,7 @@ def create_response_chain(user_query: str, information: str):
     """
     response_prompt = ChatPromptTemplate.from_template(response_prompt_str) # 使用模板創建提示
 
-    response_chain = response_prompt | llm # 創建鏈
+    response_chain = response_prompt | get_llm() # 創建鏈
     response = response_chain.invoke({'user_query': user_query, 'information': information}) # 調用鏈
     return response
 
@@ -131,6 +131,8 @@ def generate_mermaid(graph):
     return graph.get_graph().draw_mermaid()
 
 def create_mermaid():
+    from PIL import Image # 只有輸出圖片時才需要
+    from io import BytesIO
     graph = build_graph()
     # 生成 PNG 數據
     png_data = graph.get_graph().draw_mermaid_png()
@@ -2,6 +2,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from functools import lru_cache
 from typing import Annotated, Literal
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, MessagesState, START, END
@@ -10,8 +11,10 @@ from llm import LLMManager
 
 from langgraph.prebuilt import ToolNode
 from langchain_core.tools import tool
+from langchain_core.messages import AIMessage
 
 from utils.graph2mermaid import create_mermaid # for saving mermaid code
+from utils.run_budget import RunBudget, budget_router
 
 # 步驟 1：定義狀態
 class State(TypedDict):
@@ -35,12 +38,11 @@ tools = [get_taiwan_weather]
 tool_node = ToolNode(tools)
 
 # 步驟 2：定義語言模型
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
-
-
-# Modification: tell the LLM which tools it can call
-llm_with_tools = llm.bind_tools(tools)
+@lru_cache(maxsize=None)
+def get_llm_with_tools():
+    llm = LLMManager().get_llm("chat")
+    # Modification: tell the LLM which tools it can call
+    return llm.bind_tools(tools)
 
 # 步驟 3：添加語言模型節點
 
@@ -53,22 +55,30 @@ def should_continue(state: MessagesState) -> Literal["tools", END]: # type: igno
 
 def call_model(state: MessagesState):
     messages = state["messages"]
-    response = llm_with_tools.invoke(messages)
+    response = get_llm_with_tools().invoke(messages)
     return {"messages": [response]}
 
+# 預算用完時的結束節點：不再呼叫模型，直接回覆使用者
+def budget_exhausted(state: MessagesState):
+    return {"messages": [AIMessage(content="抱歉，這個問題超出本次可用的處理次數，請換個方式再問一次。")]}
+
 # 步驟 4：構建圖
 def build_graph():
     graph_builder = StateGraph(State)
 
     graph_builder.add_node("agent", call_model)
     graph_builder.add_node("tools", tool_node)
+    graph_builder.add_node("fallback", budget_exhausted)
 
     graph_builder.set_entry_point("agent")
 
+    # 以 RunBudget 執行時，agent -> tools 的次數或 LLM 呼叫用完會改走 fallback
     graph_builder.add_conditional_edges(
         "agent",
-        should_continue,
+        budget_router(should_continue, cycle="tools", loop_targets={"tools"}),
+        ["tools", "fallback", END],
     )
+    graph_builder.add_edge("fallback", END)
 
     # Any time a tool is called, we return to the agent to decide the next step
     graph_builder.add_edge("tools", "agent")
@@ -82,9 +92,10 @@ def chat_interface(graph):
 
     # user_input = "苗栗天氣如何?"
     user_input = "高雄天氣如何?"
+    budget = RunBudget(max_iterations=5, max_llm_calls=10, max_seconds=60)
     events = graph.stream(
         {"messages": [("user", user_input)]}, # initial state
-        config={"recursion_limit": 100}, # we want to limit the recursion depth
+        config=budget.config(recursion_limit=100), # we want to limit the recursion depth
         stream_mode="values" 
         # 表示會流式傳輸每個事件的完整狀態值（即整個狀態字典），
         # 而不是只傳輸更新或消息。這允許逐步觀察圖的執行過程。
@@ -93,6 +104,7 @@ def chat_interface(graph):
     for event in events:
         if "messages" in event:
             event["messages"][-1].pretty_print()
+    print(budget.report())
 
 if __name__ == "__main__":
     # 運行聊天界面
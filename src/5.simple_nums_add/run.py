@@ -6,8 +6,6 @@ from typing import Annotated
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
-from io import BytesIO
-from PIL import Image
 
 # 步驟 1：定義狀態
 class MyState(TypedDict):  # from typing import TypedDict
@@ -48,6 +46,8 @@ def build_graph():
     return graph
 
 def create_mermaid():
+    from PIL import Image # 只有輸出圖片時才需要
+    from io import BytesIO
     graph = build_graph()
     # 生成 PNG 數據
     png_data = graph.get_graph().draw_mermaid_png()
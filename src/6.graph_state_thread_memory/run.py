@@ -2,6 +2,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from functools import lru_cache
 from typing import Annotated
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, END
@@ -11,6 +12,7 @@ from llm import LLMManager
 
 from utils.graph2mermaid import create_mermaid # for saving mermaid code
 from langgraph.checkpoint.memory import MemorySaver # for saving memory
+from utils.compact_serde import get_serde # CHECKPOINT_SERDE=compact for smaller, faster checkpoints
 
 """
 加入記憶與不加入的差別
@@ -32,8 +34,9 @@ class AgentState(TypedDict):
     
 
 # 步驟 2：定義語言模型
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
+@lru_cache(maxsize=None)
+def get_llm():
+    return LLMManager().get_llm("chat")
 
 # 步驟 3：添加語言模型節點
 def node1(state: AgentState):
@@ -48,7 +51,13 @@ def should_continue(state):
     return state["count"] < 3
 
 # 步驟 4：構建圖
-def build_graph(memory_enabled=True):
+def build_graph(memory_enabled=True, checkpointer=None):
+    """
+    Args:
+        memory_enabled: 是否加入記憶
+        checkpointer: 自訂的 checkpointer（例如 utils/sqlite_checkpointer.py 的 SqliteCheckpointSaver、
+            utils/bounded_memory_saver.py 的 BoundedMemorySaver），預設為 MemorySaver（序列化器依 CHECKPOINT_SERDE）
+    """
     graph_builder = StateGraph(AgentState)
     graph_builder.add_node("Node1", node1)
     graph_builder.add_node("Node2", node2)
@@ -70,7 +79,7 @@ def build_graph(memory_enabled=True):
         return graph
     
     # Set up memory
-    memory = MemorySaver()
+    memory = checkpointer or MemorySaver(serde=get_serde())
     
     graph = graph_builder.compile(checkpointer=memory) # 步驟 5：編譯圖
 
@@ -99,6 +108,12 @@ if __name__ == "__main__":
     # 運行聊天界面
     memory_enabled = True  # 設置為 True 或 False 以啟用或禁用記憶
     graph = build_graph(memory_enabled=memory_enabled)
+    # 以 SQLite 檔案保存記憶，重啟後仍在，且每個 thread 只保留最近 20 個 checkpoint
+    # from utils.sqlite_checkpointer import SqliteCheckpointSaver
+    # graph = build_graph(checkpointer=SqliteCheckpointSaver("checkpoints.sqlite", keep_last=20))
+    # 記憶體中最多保留 1000 個 thread，閒置 1 小時移到磁碟，下次使用同一個 thread_id 時自動載回
+    # from utils.bounded_memory_saver import BoundedMemorySaver
+    # graph = build_graph(checkpointer=BoundedMemorySaver(max_threads=1000, idle_ttl=3600, spill_dir=".cache/threads"))
     # chat_interface(graph)
 
     create_mermaid(graph)
\ No newline at end of file
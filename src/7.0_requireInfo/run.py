@@ -1,6 +1,7 @@
 import sys
 import os
 import inspect
+from functools import lru_cache
 
 from pydantic import BaseModel, Field
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -8,11 +9,14 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from typing import Annotated, Optional, TypedDict
 from langgraph.graph import START, END, StateGraph
 from langgraph.graph import add_messages
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import HumanMessage, AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import HumanMessage, AIMessage
 from llm import LLMManager
 from typing import Literal, Any, Dict, List
 from utils.graph2mermaid import create_mermaid # for saving mermaid code
+from utils.run_budget import RunBudget, budget_router
+from utils.compact_serde import get_serde
+from langgraph.checkpoint.memory import MemorySaver
 
 ## 定義使用者資訊
 class RequiredInformation(BaseModel):
@@ -36,11 +40,14 @@ class AssistantGraphState(TypedDict):
     messages: Annotated[list, add_messages]
 
 """定義語言模型"""
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
+@lru_cache(maxsize=None)
+def get_llm():
+    return LLMManager().get_llm("chat")
 
 """定義系統提示"""
-system = f"""你是 AI 客服助理。你的任務是收集必要的用戶資訊。請遵循以下原則:
+# 需要 inspect.getsource 讀取原始碼，延後到第一次使用時才組出提示
+def build_system_prompt() -> str:
+    return f"""你是 AI 客服助理。你的任務是收集必要的用戶資訊。請遵循以下原則:
 
 1. 保持禮貌和專業,使用適當的敬語。
 2. 如果用戶詢問的資訊不完整,請適當地要求補充。
@@ -58,25 +65,6 @@ DO NOT FILL IN THE USERS INFORMATION, YOU NEED TO COLLECT IT.
 
 請根據用戶的問題和已提供的資訊,給出適當的回應和指引。"""
 
-collect_info_system = f"""你是 AI 客服助理。你的任務是收集必要的用戶資訊。請遵循以下原則:
-
-1. 保持禮貌和專業,使用適當的敬語。
-2. 如果用戶詢問的資訊不完整,請適當地要求補充。
-3. 在收集用戶資訊時,請確保隱私和安全。
-4. 如果無法回答某個問題,請誠實地表示,並提供其他可能的幫助方式。
-
-
-需要收集的資訊包括：
-
-{inspect.getsource(RequiredInformation)}
-
-請確保每項資訊都符合要求後再進行下一項。
-
-DO NOT FILL IN THE USERS INFORMATION, YOU NEED TO COLLECT IT.
-
-請根據用戶的問題和已提供的資訊,給出適當的回應和指引。
-"""
-
 # 定義回應建構器的系統提示
 response_builder_system = """
 你是台灣高鐵的AI客服助理。你的任務是總結對話內容，並提供一個清晰、專業的回應給用戶。請遵循以下原則：
@@ -92,32 +80,38 @@ response_builder_system = """
 
 """定義提示模板"""
 # 創建助理提示模板
-assistant_prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system", system),
+@lru_cache(maxsize=None)
+def get_assistant_prompt() -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", build_system_prompt()),
+            (
+                "human",
+                "User question: {user_question}\n"
+                "Chat history: {messages}\n"
+                "\n\n What the user have provided so far {provided_required_information} \n\n"
+            ),
+        ]
+    )
+# 創建收集資訊提示模板
+@lru_cache(maxsize=None)
+def get_collect_info_prompt() -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages([
+        ("system", build_system_prompt() + "\n"),
         (
             "human",
             "User question: {user_question}\n"
             "Chat history: {messages}\n"
             "\n\n What the user have provided so far {provided_required_information} \n\n"
         ),
-    ]
-)
-# 創建助理提示模板
-collect_info_prompt = ChatPromptTemplate.from_messages([
-    ("system", collect_info_system),
-    (
-        "human",
-        "User question: {user_question}\n"
-        "Chat history: {messages}\n"
-        "\n\n What the user have provided so far {provided_required_information} \n\n"
-    ),
-])
-
-response_builder_prompt = ChatPromptTemplate.from_messages([
-    ("system", response_builder_system),
-    ("human", "用戶資訊：{user_info}\n對話歷史：{chat_history}\n請提供一個總結性的回應。")
-])
+    ])
+
+@lru_cache(maxsize=None)
+def get_response_builder_prompt() -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages([
+        ("system", response_builder_system),
+        ("human", "用戶資訊：{user_info}\n對話歷史：{chat_history}\n請提供一個總結性的回應。")
+    ])
 
 """定義流程控制函數"""
 def provided_all_details(state: AssistantGraphState) -> Literal["info all collected", "not fulfill"]:
@@ -135,13 +129,13 @@ def provided_all_details(state: AssistantGraphState) -> Literal["info all collec
         return "not fulfill"
 
 """定義 Chain"""
-
-collect_info_chain = collect_info_prompt | llm.with_structured_output(RequiredInformation)
-get_information_chain = assistant_prompt | llm
+@lru_cache(maxsize=None)
+def get_collect_info_chain():
+    return get_collect_info_prompt() | get_llm().with_structured_output(RequiredInformation)
 
 # 定義助理節點函數
 def assistant_chain_func(state: AssistantGraphState) -> Dict[str, Any]:
-    get_information_chain = assistant_prompt | llm
+    get_information_chain = get_assistant_prompt() | get_llm()
 
     res = get_information_chain.invoke(
         {
@@ -192,7 +186,7 @@ def collect_info_chain_func(state: AssistantGraphState) -> AssistantGraphState:
     information_from_stdin = str(input("\n輸入用戶資訊：\n"))
 
     # 調用 collect_info_chain 處理用戶輸入
-    response = collect_info_chain.invoke(
+    response = get_collect_info_chain().invoke(
         {
           "user_question": state["user_question"],
           "provided_required_information": information_from_stdin,
@@ -226,7 +220,7 @@ def response_builder_func(state: Dict[str, Any]) -> Dict[str, Any]:
     chat_history_str = "\n".join([f"{msg.type}: {msg.content}" for msg in chat_history if hasattr(msg, 'type') and hasattr(msg, 'content')])
 
     # 生成總結回應
-    response_chain = response_builder_prompt | llm
+    response_chain = get_response_builder_prompt() | get_llm()
     summary_response = response_chain.invoke({
         "user_info": user_info,
         "chat_history": chat_history_str
@@ -239,11 +233,21 @@ def response_builder_func(state: Dict[str, Any]) -> Dict[str, Any]:
 
     return updated_state
 
+# 預算用完時的結束節點：不再呼叫模型，告知用戶哪些資訊尚未提供
+def budget_fallback_func(state: AssistantGraphState) -> Dict[str, Any]:
+    info = state.get("required_information") or RequiredInformation()
+    missing = [name for name, value in info.model_dump().items() if not value]
+    content = "抱歉，目前無法完成資訊收集，請稍後再試或洽詢客服專線。"
+    if missing:
+        content += f"\n尚未提供的資訊：{', '.join(missing)}"
+    summary_response = AIMessage(content=content)
+    return {"final_response": content, "messages": [summary_response]}
+
 # 測試資訊收集 Chain 的函數
 def test_collect_info(user_input, messages = [], collected_info=None):
     if collected_info is None:
         collected_info = RequiredInformation()
-    result = collect_info_chain.invoke({
+    result = get_collect_info_chain().invoke({
         "user_question": user_input,
         "provided_required_information": collected_info,
         "messages": [],
@@ -254,11 +258,17 @@ def test_collect_info(user_input, messages = [], collected_info=None):
 
 
 """定義流程圖"""
-def build_graph():
+def build_graph(checkpointer=None):
+    """
+    Args:
+        checkpointer: 要保存對話時傳入，例如 MemorySaver(serde=get_serde((RequiredInformation,)))；
+            CHECKPOINT_SERDE=compact 時 RequiredInformation 以註冊名稱精簡儲存
+    """
     # 定義節點名稱
     ASSISTANT_NODE = "assistant_node"
     COLLECT_INFO_NODE = "collect_info_node"
     RESPONSE_BUILDER_NODE = "response_builder_node"
+    FALLBACK_NODE = "fallback_node"
 
     workflow = StateGraph(AssistantGraphState)
 
@@ -266,22 +276,26 @@ def build_graph():
     workflow.add_node(ASSISTANT_NODE, assistant_chain_func)
     workflow.add_node(COLLECT_INFO_NODE, collect_info_chain_func)
     workflow.add_node(RESPONSE_BUILDER_NODE, response_builder_func)
+    workflow.add_node(FALLBACK_NODE, budget_fallback_func)
 
     # 添加邊
     workflow.add_edge(START, "assistant_node" )
     workflow.add_edge("assistant_node", "collect_info_node")
+    # 以 RunBudget 執行時，來回詢問的次數或 LLM 呼叫用完會改走 fallback_node
     workflow.add_conditional_edges(
         "collect_info_node",
-        provided_all_details,
+        budget_router(provided_all_details, cycle="collect_info", loop_targets={"not fulfill"}),
         {
             "info all collected": "response_builder_node",
-            "not fulfill": "assistant_node"
+            "not fulfill": "assistant_node",
+            "fallback": "fallback_node",
         }
     )
     workflow.add_edge("response_builder_node", END)
+    workflow.add_edge("fallback_node", END)
 
     # 編譯
-    graph = workflow.compile()
+    graph = workflow.compile(checkpointer=checkpointer)
 
     return graph
 
@@ -292,7 +306,7 @@ if __name__ == "__main__":
     # test_collect_info("我的電話是0912345678")
     # test_collect_info("我的身分證末四碼是5678")
 
-    graph = build_graph()
+    graph = build_graph(checkpointer=MemorySaver(serde=get_serde((RequiredInformation,))))
 
     # create_mermaid(graph)
 
@@ -304,9 +318,10 @@ if __name__ == "__main__":
         messages=[],
     )
 
+    budget = RunBudget(max_iterations=5, max_llm_calls=20)
     for output in graph.stream(
         init_state,
-        config={"configurable": {"thread_id": 888}}
+        config=budget.config(configurable={"thread_id": 888})
     ):
         for key, value in output.items():
             if "messages" in value:
@@ -314,4 +329,5 @@ if __name__ == "__main__":
                     last_msg = value["messages"][-1]
                     last_msg.pretty_print()
                 except Exception as e:
-                    print(f"last_msg:{last_msg}")
\ No newline at end of file
+                    print(f"last_msg:{last_msg}")
+    print(budget.report())
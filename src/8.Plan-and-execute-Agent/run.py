@@ -2,6 +2,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 import asyncio
+from functools import lru_cache
 from typing import Annotated, List, Tuple, TypedDict, Union, Literal
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
@@ -10,7 +11,6 @@ import operator
 from utils.graph2mermaid import create_mermaid # for saving mermaid code
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
-from langgraph.prebuilt import create_react_agent
 from langchain_core.tools import tool
 
 @tool
@@ -77,7 +77,6 @@ class Act(BaseModel):
 
 
 # 步驟 2：定義語言模型
-llm_manager = LLMManager()
 # prompt = hub.pull("wfh/react-agent-executor")
 # Replace with local prompt due to connection issues
 prompt = """You are a helpful assistant. Use the provided tools to answer questions.
@@ -92,8 +91,14 @@ TOOL: search(query="example")
 
 After getting tool results, provide the final answer."""
 
-llm = llm_manager.get_llm("chat")
-agent_executor = create_react_agent(llm, tools, prompt=prompt)
+@lru_cache(maxsize=None)
+def get_llm():
+    return LLMManager().get_llm("chat")
+
+@lru_cache(maxsize=None)
+def get_agent_executor():
+    from langgraph.prebuilt import create_react_agent
+    return create_react_agent(get_llm(), tools, prompt=prompt)
 
 """定義提示模板"""
 planner_prompt = ChatPromptTemplate.from_messages(
@@ -127,8 +132,13 @@ Update your plan accordingly. If no more steps are needed and you can return to
 )
 
 """chain the prompts and llm to create the final nodes"""
-planner = planner_prompt | llm.with_structured_output(Plan)
-replanner = replanner_prompt | llm.with_structured_output(Act)
+@lru_cache(maxsize=None)
+def get_planner():
+    return planner_prompt | get_llm().with_structured_output(Plan)
+
+@lru_cache(maxsize=None)
+def get_replanner():
+    return replanner_prompt | get_llm().with_structured_output(Act)
 
 
 """定義節點函數"""
@@ -138,7 +148,7 @@ async def execute_step(state: PlanExecute):
     task = plan[0]
     task_formatted = f"""For the following plan:
 {plan_str}\n\nYou are tasked with executing step {1}, {task}."""
-    agent_response = await agent_executor.ainvoke(
+    agent_response = await get_agent_executor().ainvoke(
         {"messages": [("user", task_formatted)]}
     )
     # make past_steps as list and append task, agent_response["messages"][-1].content)
@@ -151,12 +161,12 @@ async def execute_step(state: PlanExecute):
 
 
 async def plan_step(state: PlanExecute):
-    plan = await planner.ainvoke({"messages": [("user", state["input"])]})
+    plan = await get_planner().ainvoke({"messages": [("user", state["input"])]})
     return {"plan": plan.steps}
 
 
 async def replan_step(state: PlanExecute):
-    output = await replanner.ainvoke(state)
+    output = await get_replanner().ainvoke(state)
     if isinstance(output.action, Response):
         return {"response": output.action.response}
     else:
@@ -170,7 +180,11 @@ def should_end(state: PlanExecute) -> Literal["agent", "__end__"]:
         return "agent"
 
 # 步驟 4：構建圖
-def build_graph():
+def build_graph(checkpointer=None):
+    """
+    Args:
+        checkpointer: 要保存執行狀態時傳入，例如 MemorySaver(serde=get_serde((Plan, Response, Act)))
+    """
     workflow = StateGraph(PlanExecute)
 
     # Add the plan node
@@ -199,7 +213,7 @@ def build_graph():
     # Finally, we compile it!
     # This compiles it into a LangChain Runnable,
     # meaning you can use it as you would any other runnable
-    graph = workflow.compile()
+    graph = workflow.compile(checkpointer=checkpointer)
 
     return graph
 
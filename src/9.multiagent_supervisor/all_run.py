@@ -1,5 +1,6 @@
 import sys
 import os
+from functools import lru_cache
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from typing import Annotated, List, Tuple, Union, Literal,TypedDict
@@ -13,6 +14,9 @@ from datetime import datetime
 import pytz
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
+from utils.article_checks import detect_script, precheck_article
+# 只評估主觀欄位的 grader 與 graph.py 共用同一份定義
+from chains.ArticlePostabilityGrader import get_subjective_news_chef
 
 current_time = datetime.now(pytz.timezone('Asia/Taipei')).strftime("%Y-%m-%d %Z")
 
@@ -49,10 +53,13 @@ class TaiwanArticlePostabilityGrader(BaseModel):
 
 
 """定義語言模型 & structured output"""
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
-structured_llm_grader = llm.with_structured_output(CheerleaderNewsGrader)
-structured_llm_postability_grader = llm.with_structured_output(TaiwanArticlePostabilityGrader)
+@lru_cache(maxsize=None)
+def get_llm():
+    return LLMManager().get_llm("chat", cache=False) # 生成類 chain 不使用回應快取
+
+@lru_cache(maxsize=None)
+def get_grader_llm():
+    return LLMManager().get_llm("chat", cache=True) # 評分結果可重複使用，開啟回應快取
 
 
 """建立提示詞"""
@@ -71,11 +78,13 @@ postability_system = """You are a grader assessing whether a Taiwanese news arti
     Provide four binary scores: one to indicate if the article can be posted ('yes' or 'no'), one for adequate character count ('yes' or 'no'), one for sensationalistic writing ('yes' or 'no'), and another if the language is Traditional Chinese ('yes' or 'no').\n
     Pay attention to Taiwan-specific terms, idioms, and writing styles."""
 
-translation_system = """You are a translator converting Taiwanese news articles into English.
+translation_system = """You are a translator converting news articles into Traditional Chinese as used in Taiwan (繁體中文).
+The article may be written in English, Simplified Chinese or another language; Simplified Chinese must be converted to Traditional Chinese characters and Taiwanese wording.
 Translate the text accurately while maintaining the original tone and style.
 Pay special attention to Taiwanese cultural references, idioms, and context.
-Ensure that sports team names, player names, and other proper nouns are correctly transliterated or translated as appropriate.
-When translating quotes, maintain the speaker's tone and intent."""
+Ensure that sports team names, player names, and other proper nouns use the names familiar to Taiwanese readers.
+When translating quotes, maintain the speaker's tone and intent.
+Output only the translated article."""
 
 expansion_system = """你是一位專業的台灣新聞記者，負責將給定的簡短新聞擴展至至少 300 字。在擴展過程中，請注意以下幾點：
 
@@ -105,10 +114,23 @@ expansion_prompt = ChatPromptTemplate.from_messages(
 )
 
 """建立chain"""
-evaluator = grade_prompt | structured_llm_grader # 建置 TransfreNewsGrader，啦啦隊相關新聞評估
-news_chef = postability_grade_prompt | structured_llm_postability_grader  # 建置 ArticlePostabilityGrader，文章可發佈性評估
-translator = translation_prompt | llm # 建置 translation_system，文章翻譯
-expander = expansion_prompt | llm # 建置 expansion_system，文章擴展
+@lru_cache(maxsize=None)
+def get_evaluator():
+    # 建置 TransfreNewsGrader，啦啦隊相關新聞評估
+    return grade_prompt | get_grader_llm().with_structured_output(CheerleaderNewsGrader)
+
+@lru_cache(maxsize=None)
+def get_news_chef():
+    # 建置 ArticlePostabilityGrader，文章可發佈性評估
+    return postability_grade_prompt | get_grader_llm().with_structured_output(TaiwanArticlePostabilityGrader)
+
+@lru_cache(maxsize=None)
+def get_translator():
+    return translation_prompt | get_llm() # 建置 translation_system，文章翻譯
+
+@lru_cache(maxsize=None)
+def get_expander():
+    return expansion_prompt | get_llm() # 建置 expansion_system，文章擴展
 
 # 步驟 3：添加語言模型節點
 ### 呼叫 Agnet 工作以及顯示節點狀態用
@@ -123,13 +145,13 @@ def evaluate_article(state: AgentState) -> AgentState:
 def translate_article(state: AgentState) -> AgentState:
     print(f"translate_article: Current state: {state}")
     article = state["article_state"]
-    result = translator.invoke({"article": article})
+    result = get_translator().invoke({"article": article})
     state["article_state"] = result.content
     return state
 def expand_article(state: AgentState) -> AgentState:
     print(f"expand_article: Current state: {state}")
     article = state["article_state"]
-    result = expander.invoke({"article": article})
+    result = get_expander().invoke({"article": article})
     state["article_state"] = result.content
     return state
 def publisher(state: AgentState) -> AgentState:
@@ -140,8 +162,7 @@ def publisher(state: AgentState) -> AgentState:
 ## 提供路由使用
 def evaluator_router(state: AgentState) -> Literal["news_chef", "not_relevant"]:
     article = state["article_state"]
-    evaluator = grade_prompt | structured_llm_grader
-    result = evaluator.invoke({"article": article})
+    result = get_evaluator().invoke({"article": article})
     print(f"evaluator_router: Current state: {state}")
     print("Evaluator result: ", result)
     if result.binary_score == "yes":
@@ -152,16 +173,25 @@ def evaluator_router(state: AgentState) -> Literal["news_chef", "not_relevant"]:
 
 def news_chef_router(
     state: AgentState,
-) -> Literal["translator", "publisher", "expander"]:
+) -> Literal["translator", "publisher", "expander", "stop"]:
     article = state["article_state"]
-    result = news_chef.invoke({"article": article})
     print(f"news_chef_router: Current state: {state}")
+    # 字數與語言在本地判斷，能直接決定路徑時不呼叫 LLM
+    checks = precheck_article(article)
+    if checks["is_language_traditional_chinese"] == "no":
+        print("News chef precheck (skip LLM): ", checks)
+        # 沒有任何文字（空白、只有數字或符號）時翻譯不會有結果，直接結束
+        return "stop" if detect_script(article) == "unknown" else "translator"
+    if checks["meets_word_count"] == "no":
+        print("News chef precheck (skip LLM): ", checks)
+        return "expander"
+    subjective = get_subjective_news_chef().invoke({"article": article})
+    result = TaiwanArticlePostabilityGrader(**checks, **subjective.model_dump())
     print("News chef result: ", result)
     if result.can_be_posted == "yes":
         return "publisher"
-    elif result.is_language_traditional_chinese == "yes":
-        if result.meets_word_count == "no" or result.is_sensationalistic == "no":
-            return "expander"
+    elif result.is_sensationalistic == "no":
+        return "expander"
     return "translator"
 
 # 步驟 4：構建圖
@@ -182,7 +212,7 @@ def build_graph():
     workflow.add_conditional_edges(
         "news_chef",
         news_chef_router,
-        {"translator": "translator", "publisher": "publisher", "expander": "expander"},
+        {"translator": "translator", "publisher": "publisher", "expander": "expander", "stop": END},
     )
     workflow.add_edge("translator", "news_chef")
     workflow.add_edge("expander", "news_chef")
@@ -208,20 +238,20 @@ def chat_interface():
 
 def simple_test():
     """測試"""
-    result = evaluator.invoke(
+    result = get_evaluator().invoke(
         {"震撼彈！知名啦啦隊女神小雨宣布退出Lamigo桃猿，轉戰統一獅啦啦隊"}
     )
 
     print(result)
 
-    result = news_chef.invoke(
+    result = get_news_chef().invoke(
         {
             "article": "震撼彈！知名啦啦隊女神小雨宣布退出Lamigo桃猿，轉戰統一獅啦啦隊。消息一出，引起球迷熱烈討論。有內部消息指出，小雨此舉可能與新東家開出的天價薪酬有關。究竟是否屬實？本報將持續追蹤報導。敬請球迷朋友們拭目以待，這個夏天的職棒轉會市場肯定會掀起更多驚人巨浪！"
         }
     )
     print(result)
 
-    result = translator.invoke(
+    result = get_translator().invoke(
         {
             "article": "震撼彈！知名啦啦隊女神小雨宣布退出Lamigo桃猿，轉戰統一獅啦啦隊。消息一出，引起球迷熱烈討論。有內部消息指出，小雨此舉可能與新東家開出的天價薪酬有關。究竟是否屬實？本報將持續追蹤報導。敬請球迷朋友們拭目以待，這個夏天的職棒轉會市場肯定會掀起更多驚人巨浪！"
         }
@@ -230,7 +260,7 @@ def simple_test():
     print(result)
 
     article_content = "知名啦啦隊女神小雨宣布退出Lamigo桃猿，轉戰統一獅啦啦隊。"
-    result = expander.invoke({"article": article_content})
+    result = get_expander().invoke({"article": article_content})
 
     print(result)
 
@@ -0,0 +1,173 @@
+"""
+新聞審核 graph 的批次執行
+
+一次送入多篇文章，以 max_concurrency 限制同時處理的文章數（每個節點都在等 LLM，
+適合用 async 併發），並依完成順序逐篇回傳結果。
+
+每篇結果包含：
+- index / article_id：輸入順序與文章 ID
+- route：最終路徑，publisher（發佈）、not_relevant（不相關）、oscillation（改寫沒有收斂，提前結束）、
+  untranslatable（沒有可翻譯的文字，提前結束）、budget_exhausted（預算用完，提前結束）或 error
+- path：依序經過的節點
+- elapsed_ms：該篇文章的處理時間
+- article_state：最終的文章內容
+- relevance_source：相關性由本地預篩（prefilter）或 LLM（llm）判斷
+- budget：有設定預算時，各項預算的用量（RunBudget.report()）
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import time
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Union
+
+from graph import abuild_graph
+from utils.run_budget import RunBudget
+from prefilter import get_prefilter
+from speculation import get_speculation
+
+Article = Union[str, Dict[str, Any]]
+
+
+def _normalize_article(index: int, article: Article) -> Dict[str, Any]:
+    """文章可以是字串，或包含 id 與 article 的字典"""
+    if isinstance(article, str):
+        return {"id": index, "article": article}
+    return {"id": article.get("id", index), "article": article["article"]}
+
+
+async def _run_one(
+    graph,
+    index: int,
+    article: Dict[str, Any],
+    config: Optional[Dict[str, Any]],
+    budget: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    path: List[str] = []
+    final_state: Dict[str, Any] = {}
+    # 每篇文章各自一份預算
+    run_budget = RunBudget(**budget) if budget else None
+    if run_budget is not None:
+        config = run_budget.config(**(config or {}))
+    start = time.perf_counter()
+    try:
+        async for mode, chunk in graph.astream(
+            {"article_state": article["article"]}, config=config, stream_mode=["updates", "values"]
+        ):
+            if mode == "updates":
+                path.extend(chunk.keys())
+            else:
+                final_state = chunk
+        if "publisher" in path:
+            route = "publisher"
+        else:
+            route = final_state.get("stop_reason") or "not_relevant"
+        error = None
+    except Exception as e:
+        route = "error"
+        error = repr(e)
+    return {
+        "index": index,
+        "article_id": article["id"],
+        "route": route,
+        "path": path,
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+        "article_state": final_state.get("article_state"),
+        "relevance_source": final_state.get("relevance_source"),
+        "error": error,
+        "budget": run_budget.report() if run_budget is not None else None,
+    }
+
+
+async def abatch_articles(
+    articles: Iterable[Article],
+    max_concurrency: int = 8,
+    graph=None,
+    config: Optional[Dict[str, Any]] = None,
+    budget: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    批次處理文章，依完成順序逐篇產出結果
+
+    輸入只會在有空位時才往下讀，因此可以傳入很大的 generator。
+
+    Args:
+        articles: 文章（字串，或包含 id 與 article 的字典）
+        max_concurrency: 同時處理的文章數上限
+        graph: 已編譯的 graph，預設為 abuild_graph()
+        config: 傳給 graph 的設定，例如 recursion_limit
+        budget: 每篇文章的預算上限（RunBudget 的參數，例如 {"max_iterations": 3, "max_llm_calls": 10}）
+
+    Yields:
+        每篇文章的處理結果
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency 必須大於 0")
+    graph = graph or abuild_graph()
+    iterator = enumerate(articles)
+    pending = set()
+
+    def fill() -> None:
+        while len(pending) < max_concurrency:
+            try:
+                index, article = next(iterator)
+            except StopIteration:
+                return
+            pending.add(asyncio.ensure_future(
+                _run_one(graph, index, _normalize_article(index, article), config, budget)
+            ))
+
+    try:
+        fill()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                yield task.result()
+            fill()
+    finally:
+        # 呼叫端提前結束（break、例外、取消）時，取消還在處理的文章並等它們結束，不留下孤兒 task
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def batch_articles(
+    articles: Iterable[Article],
+    max_concurrency: int = 8,
+    graph=None,
+    config: Optional[Dict[str, Any]] = None,
+    budget: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    abatch_articles 的同步版本，回傳依完成順序排列的結果列表
+
+    Args:
+        articles: 文章（字串，或包含 id 與 article 的字典）
+        max_concurrency: 同時處理的文章數上限
+        graph: 已編譯的 graph，預設為 abuild_graph()
+        config: 傳給 graph 的設定
+        budget: 每篇文章的預算上限
+
+    Returns:
+        每篇文章的處理結果
+    """
+    async def collect() -> List[Dict[str, Any]]:
+        return [result async for result in abatch_articles(articles, max_concurrency, graph, config, budget)]
+
+    return asyncio.run(collect())
+
+
+if __name__ == "__main__":
+    test_articles = [
+        "知名啦啦隊女神小雨宣布退出Lamigo桃猿，轉戰統一獅啦啦隊。",
+        "台北市今日發布最新空氣品質報告，PM2.5指數持續攀升。",
+        "CPBL star outfielder Wang Po-Jung considering a return to NPB after successful stint with Lamigo Monkeys.",
+    ]
+    for result in batch_articles(test_articles, max_concurrency=3, budget={"max_iterations": 5}):
+        print(f"[{result['article_id']}] {result['route']} {result['elapsed_ms']:.0f}ms path={result['path']}")
+    print("prefilter:", get_prefilter().report())
+    print("speculation:", get_speculation().report())
@@ -1,5 +1,6 @@
 import sys
 import os
+from functools import lru_cache
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
 
 from langchain_core.prompts import ChatPromptTemplate
@@ -23,12 +24,19 @@ class TaiwanArticlePostabilityGrader(BaseModel):
         description="The language of the article is Traditional Chinese, 'yes' or 'no'"
     )
 
+# 字數與語言已在本地檢查（utils/article_checks.py），只請 LLM 評估主觀欄位
+class TaiwanArticleSubjectiveGrader(BaseModel):
+    """Binary scores for postability and sensationalism of a Taiwanese news article."""
+
+    can_be_posted: str = Field(
+        description="The article is ready to be posted, 'yes' or 'no'"
+    )
+    is_sensationalistic: str = Field(
+        description="The article is written in a sensationalistic style, 'yes' or 'no'"
+    )
 
-# 定義 LLM 呼叫流程
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
-structured_llm_postability_grader = llm.with_structured_output(TaiwanArticlePostabilityGrader)
 
+# 定義提示詞
 postability_system = """You are a grader assessing whether a Taiwanese news article is ready to be posted, if it meets the minimum character count of 300 characters, is written in a sensationalistic style, and if it is in Traditional Chinese. \n
     Evaluate the article for grammatical errors, completeness, appropriateness for publication, and EXAGGERATED sensationalism. \n
     Also, confirm if the language used in the article is Traditional Chinese and it meets the character count requirement. \n
@@ -39,11 +47,31 @@ postability_grade_prompt = ChatPromptTemplate.from_messages(
     [("system", postability_system), ("human", "News Article:\n\n {article}")]
 )
 
-news_chef = postability_grade_prompt | structured_llm_postability_grader
+subjective_system = """You are a grader assessing whether a Taiwanese news article is ready to be posted and whether it is written in a sensationalistic style. \n
+    The article has already been verified to be in Traditional Chinese and to meet the minimum character count. \n
+    Evaluate the article for grammatical errors, completeness, appropriateness for publication, and EXAGGERATED sensationalism. \n
+    Provide two binary scores: one to indicate if the article can be posted ('yes' or 'no') and one for sensationalistic writing ('yes' or 'no').\n
+    Pay attention to Taiwan-specific terms, idioms, and writing styles."""
+
+subjective_grade_prompt = ChatPromptTemplate.from_messages(
+    [("system", subjective_system), ("human", "News Article:\n\n {article}")]
+)
+
+# 定義 LLM 呼叫流程
+@lru_cache(maxsize=None)
+def get_news_chef():
+    llm = LLMManager().get_llm("chat", cache=True) # 評分結果可重複使用，開啟回應快取
+    structured_llm_postability_grader = llm.with_structured_output(TaiwanArticlePostabilityGrader)
+    return postability_grade_prompt | structured_llm_postability_grader
+
+@lru_cache(maxsize=None)
+def get_subjective_news_chef():
+    llm = LLMManager().get_llm("chat", cache=True) # 評分結果可重複使用，開啟回應快取
+    return subjective_grade_prompt | llm.with_structured_output(TaiwanArticleSubjectiveGrader)
 
 if __name__ == "__main__":
     # 測試 Agent 運作狀況
-    result = news_chef.invoke(
+    result = get_news_chef().invoke(
         {
             "article": "震撼彈！知名啦啦隊女神小雨宣布退出Lamigo桃猿，轉戰統一獅啦啦隊。消息一出，引起球迷熱烈討論。有內部消息指出，小雨此舉可能與新東家開出的天價薪酬有關。究竟是否屬實？本報將持續追蹤報導。敬請球迷朋友們拭目以待，這個夏天的職棒轉會市場肯定會掀起更多驚人巨浪！"
         }
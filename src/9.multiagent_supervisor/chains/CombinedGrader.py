@@ -0,0 +1,48 @@
+import sys
+import os
+from functools import lru_cache
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
+
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel, Field
+from llm import LLMManager
+
+# 定義輸出格式（介面）
+# 一次回傳 CheerleaderNewsGrader 與 TaiwanArticlePostabilityGrader 的欄位；
+# 字數與語言在本地檢查（utils/article_checks.py），不需要 LLM 判斷
+class CombinedArticleGrader(BaseModel):
+    """Binary scores for cheerleader relevance, postability and sensationalism of a Taiwanese news article."""
+
+    binary_score: str = Field(
+        description="The article is about Taiwanese professional baseball cheerleaders, 'yes' or 'no'"
+    )
+    can_be_posted: str = Field(
+        description="The article is ready to be posted, 'yes' or 'no'"
+    )
+    is_sensationalistic: str = Field(
+        description="The article is written in a sensationalistic style, 'yes' or 'no'"
+    )
+
+# 定義提示詞
+system = """You are a grader assessing a news article for a Taiwanese professional baseball cheerleader news desk.
+    First, check if the article explicitly concerns Taiwanese professional baseball cheerleaders: cheerleader transfers between CPBL (Chinese Professional Baseball League) teams, new cheerleader recruitment or retirement, special performances or events featuring the cheerleaders, controversies or notable incidents involving cheerleaders, or changes in cheerleading teams' leadership or management.
+    Then, evaluate the article for grammatical errors, completeness, appropriateness for publication, and EXAGGERATED sensationalism. \n
+    Provide three binary scores: one to indicate whether the news is about Taiwanese professional baseball cheerleaders ('yes' or 'no'), one to indicate if the article can be posted ('yes' or 'no'), and one for sensationalistic writing ('yes' or 'no').\n
+    Pay attention to Taiwan-specific terms, idioms, and writing styles."""
+
+grade_prompt = ChatPromptTemplate.from_messages(
+    [("system", system), ("human", "News Article:\n\n {article}")]
+)
+
+# 定義 LLM 呼叫流程
+@lru_cache(maxsize=None)
+def get_combined_grader():
+    llm = LLMManager().get_llm("chat", cache=True) # 評分結果可重複使用，開啟回應快取
+    return grade_prompt | llm.with_structured_output(CombinedArticleGrader)
+
+if __name__ == "__main__":
+    # 測試 Agent 運作狀況
+    result = get_combined_grader().invoke(
+        {"article": "震撼彈！知名啦啦隊女神小雨宣布退出Lamigo桃猿，轉戰統一獅啦啦隊"}
+    )
+    print(result)
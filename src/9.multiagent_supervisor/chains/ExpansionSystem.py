@@ -1,5 +1,6 @@
 import sys
 import os
+from functools import lru_cache
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
 
 from langchain_core.prompts import ChatPromptTemplate
@@ -7,9 +8,7 @@ from pydantic import BaseModel, Field
 from llm import LLMManager
 
 
-# 定義 LLM 呼叫流程
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
+# 定義提示詞
 expansion_system = """你是一位專業的台灣新聞記者，負責將給定的簡短新聞擴展至至少 300 字。在擴展過程中，請注意以下幾點：
 
 1. 保持原文的主題和tone，同時增加相關的背景資訊和細節。
@@ -24,12 +23,16 @@ expansion_prompt = ChatPromptTemplate.from_messages(
     [("system", expansion_system), ("human", "原始新聞內容：\n\n {article}")]
 )
 
-expander = expansion_prompt | llm
+# 定義 LLM 呼叫流程
+@lru_cache(maxsize=None)
+def get_expander():
+    llm = LLMManager().get_llm("chat", cache=False) # 生成類 chain 不使用回應快取
+    return expansion_prompt | llm
 
 if __name__ == "__main__":
     # 測試 Agent 運作狀況
     article_content = "知名啦啦隊女神小雨宣布退出Lamigo桃猿，轉戰統一獅啦啦隊。"
-    result = expander.invoke({"article": article_content})
+    result = get_expander().invoke({"article": article_content})
 
     print(result)
      
\ No newline at end of file
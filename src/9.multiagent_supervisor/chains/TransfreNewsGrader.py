@@ -1,5 +1,6 @@
 import sys
 import os
+from functools import lru_cache
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
 
 from langchain_core.prompts import ChatPromptTemplate
@@ -14,11 +15,7 @@ class CheerleaderNewsGrader(BaseModel):
         description="The article is about Taiwanese professional baseball cheerleaders, 'yes' or 'no'"
     )
 
-# 定義 LLM 呼叫流程
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
-structured_llm_grader = llm.with_structured_output(CheerleaderNewsGrader)
-
+# 定義提示詞
 system = """You are a grader assessing whether a news article concerns Taiwanese professional baseball cheerleaders.
     Check if the article explicitly mentions:
     1. Cheerleader transfers between CPBL (Chinese Professional Baseball League) teams
@@ -32,11 +29,16 @@ grade_prompt = ChatPromptTemplate.from_messages(
     [("system", system), ("human", "News Article:\n\n {article}")]
 )
 
-evaluator = grade_prompt | structured_llm_grader
+# 定義 LLM 呼叫流程
+@lru_cache(maxsize=None)
+def get_evaluator():
+    llm = LLMManager().get_llm("chat", cache=True) # 評分結果可重複使用，開啟回應快取
+    structured_llm_grader = llm.with_structured_output(CheerleaderNewsGrader)
+    return grade_prompt | structured_llm_grader
 
 if __name__ == "__main__":
     # 測試 Agent 運作狀況
-    result = evaluator.invoke(
+    result = get_evaluator().invoke(
         {"震撼彈！知名啦啦隊女神小雨宣布退出Lamigo桃猿，轉戰統一獅啦啦隊"}
     )
 
@@ -1,32 +1,241 @@
+"""
+新聞翻譯
+
+- single：整篇文章一次送出（get_translator）
+- chunked：依段落 / 句子切塊後同時翻譯再依序組回（get_chunked_translator），
+  長文章的延遲取決於最慢的一塊，也不會碰到單次輸出 token 上限。
+  切塊前先整理一份專有名詞對照表（球隊、球員名稱），每一塊都使用同一份對照表，避免各塊譯名不一致。
+  每一塊是 trace 中名為 translate_chunk_<序號> 的子 run，可以看到各自的延遲。
+
+graph 透過 get_translation_chain() 取得翻譯 chain，由環境變數 TRANSLATION_MODE（single / chunked）決定。
+"""
+
 import sys
 import os
+import re
+from functools import lru_cache
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
 
+from typing import Any, Dict, List, Tuple
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from pydantic import BaseModel, Field
 from llm import LLMManager
 
+# 固定的球隊譯名（英文名或舊名 → 台灣通用的繁體中文隊名），優先於 LLM 整理出的對照
+TEAM_GLOSSARY = {
+    "CTBC Brothers": "中信兄弟",
+    "Brother Elephants": "兄弟象",
+    "Uni-President 7-Eleven Lions": "統一7-ELEVEn獅",
+    "Uni-President Lions": "統一獅",
+    "Uni-Lions": "統一獅",
+    "Rakuten Monkeys": "樂天桃猿",
+    "Lamigo Monkeys": "Lamigo桃猿",
+    "Fubon Guardians": "富邦悍將",
+    "Wei Chuan Dragons": "味全龍",
+    "TSG Hawks": "台鋼雄鷹",
+    "CPBL": "中職",
+}
 
-# 定義 LLM 呼叫流程
-llm_manager = LLMManager()
-llm = llm_manager.get_llm("chat")
-translation_system = """You are a translator converting Taiwanese news articles into English.
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n|\n")
+_SENTENCE_END = re.compile(r"(?<=[。！？!?；;])\s*|(?<=\.)\s+")
+
+
+class GlossaryTerm(BaseModel):
+    """A proper noun in the article and the translation to use for it."""
+
+    source: str = Field(description="The proper noun as written in the article")
+    translation: str = Field(description="The Traditional Chinese (Taiwan) name to use for this proper noun")
+
+
+class Glossary(BaseModel):
+    """Proper nouns (sports teams, players, people, places, organizations) found in a news article."""
+
+    terms: List[GlossaryTerm] = Field(description="Proper nouns and their Traditional Chinese translations")
+
+
+# 定義提示詞
+translation_system = """You are a translator converting news articles into Traditional Chinese as used in Taiwan (繁體中文).
+The article may be written in English, Simplified Chinese or another language; Simplified Chinese must be converted to Traditional Chinese characters and Taiwanese wording.
 Translate the text accurately while maintaining the original tone and style.
 Pay special attention to Taiwanese cultural references, idioms, and context.
-Ensure that sports team names, player names, and other proper nouns are correctly transliterated or translated as appropriate.
-When translating quotes, maintain the speaker's tone and intent."""
+Ensure that sports team names, player names, and other proper nouns use the names familiar to Taiwanese readers.
+When translating quotes, maintain the speaker's tone and intent.
+Output only the translated article."""
 
 translation_prompt = ChatPromptTemplate.from_messages(
     [("system", translation_system), ("human", "Article to translate:\n\n {article}")]
 )
 
-translator = translation_prompt | llm
+glossary_system = """You are preparing a translation glossary for a news article that will be translated into Traditional Chinese (Taiwan) in several parts.
+List every proper noun in the article: sports team names, player names, other people, places and organizations.
+For each one, give the single Traditional Chinese name, as commonly used by Taiwanese media, that every part of the translation must use."""
+
+glossary_prompt = ChatPromptTemplate.from_messages(
+    [("system", glossary_system), ("human", "Article:\n\n {article}")]
+)
+
+chunk_translation_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            translation_system
+            + """
+You are translating part {index} of {total} of a longer article. Translate only this part, without adding an introduction or summary.
+Always use these translations for proper nouns:
+{glossary}""",
+        ),
+        ("human", "Article to translate:\n\n {article}"),
+    ]
+)
+
+# 定義 LLM 呼叫流程
+@lru_cache(maxsize=None)
+def get_translator():
+    llm = LLMManager().get_llm("chat", cache=False) # 生成類 chain 不使用回應快取
+    return translation_prompt | llm
+
+@lru_cache(maxsize=None)
+def get_glossary_extractor():
+    llm = LLMManager().get_llm("chat", cache=True) # 同一篇文章的對照表可重複使用
+    return glossary_prompt | llm.with_structured_output(Glossary)
+
+@lru_cache(maxsize=None)
+def get_chunk_translator():
+    llm = LLMManager().get_llm("chat", cache=False) # 生成類 chain 不使用回應快取
+    return chunk_translation_prompt | llm
+
+
+def split_article(article: str, max_chars: int = 800) -> List[Tuple[str, str]]:
+    """
+    依段落切塊，過長的段落再依句子切開，並把相鄰的短段落合併到 max_chars 以內
+
+    Args:
+        article: 文章內容
+        max_chars: 每一塊的字元數上限（單一句子超過上限時自成一塊）
+
+    Returns:
+        [(切塊內容, 與下一塊之間的分隔)]，分隔為段落間的 "\n\n" 或同段落句子間原本的空白（中文句子之間為 ""）
+    """
+    units: List[Tuple[str, str]] = []
+    for paragraph in _PARAGRAPH_BREAK.split(article.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            units.append((paragraph, ""))
+        else:
+            units.extend(_split_sentences(paragraph))
+        units[-1] = (units[-1][0], "\n\n")
+
+    chunks: List[Tuple[str, str]] = []
+    for text, separator in units:
+        if chunks and len(chunks[-1][0]) + len(text) <= max_chars:
+            previous, previous_separator = chunks[-1]
+            chunks[-1] = (previous + previous_separator + text, separator)
+        else:
+            chunks.append((text, separator))
+    return chunks
+
+
+def _split_sentences(paragraph: str) -> List[Tuple[str, str]]:
+    """依句尾標點切開段落，回傳 [(句子, 句子後原本的空白)]"""
+    sentences: List[Tuple[str, str]] = []
+    start = 0
+    for match in _SENTENCE_END.finditer(paragraph):
+        if match.start() > start:
+            sentences.append((paragraph[start:match.start()], match.group()))
+            start = match.end()
+    if start < len(paragraph):
+        sentences.append((paragraph[start:], ""))
+    return sentences
+
+
+def _format_glossary(article: str, terms: List[GlossaryTerm]) -> str:
+    glossary = {term.source: term.translation for term in terms}
+    glossary.update({name: translation for name, translation in TEAM_GLOSSARY.items() if name in article})
+    return "\n".join(f"- {source}: {translation}" for source, translation in glossary.items()) or "(none)"
+
+
+def _chunk_inputs(glossary: str, chunks: List[Tuple[str, str]], config: RunnableConfig) -> Tuple[List[Dict[str, Any]], List[RunnableConfig]]:
+    inputs = [
+        {"article": text, "index": index + 1, "total": len(chunks), "glossary": glossary}
+        for index, (text, _) in enumerate(chunks)
+    ]
+    configs = [
+        {**config, "run_name": f"translate_chunk_{index + 1}", "metadata": {**config.get("metadata", {}), "chunk_index": index + 1}}
+        for index in range(len(chunks))
+    ]
+    return inputs, configs
+
+
+def _reassemble(chunks: List[Tuple[str, str]], results: List[AIMessage]) -> AIMessage:
+    parts = []
+    for (_, separator), result in zip(chunks, results):
+        # 譯文是中文，同一段落的句子之間不加空白，只保留段落間的換行
+        parts.extend([result.content.strip(), "\n\n" if separator == "\n\n" else ""])
+    return AIMessage(content="".join(parts[:-1]))
+
+
+def _translate_chunked(inputs: Dict[str, Any], config: RunnableConfig, max_chars: int, max_concurrency: int) -> AIMessage:
+    article = inputs["article"]
+    chunks = split_article(article, max_chars)
+    if len(chunks) <= 1:
+        return get_translator().invoke({"article": article}, config)
+    glossary = _format_glossary(article, get_glossary_extractor().invoke({"article": article}, config).terms)
+    chunk_inputs, chunk_configs = _chunk_inputs(glossary, chunks, config)
+    for chunk_config in chunk_configs:
+        chunk_config["max_concurrency"] = max_concurrency
+    return _reassemble(chunks, get_chunk_translator().batch(chunk_inputs, chunk_configs))
+
+
+async def _atranslate_chunked(inputs: Dict[str, Any], config: RunnableConfig, max_chars: int, max_concurrency: int) -> AIMessage:
+    article = inputs["article"]
+    chunks = split_article(article, max_chars)
+    if len(chunks) <= 1:
+        return await get_translator().ainvoke({"article": article}, config)
+    glossary = _format_glossary(article, (await get_glossary_extractor().ainvoke({"article": article}, config)).terms)
+    chunk_inputs, chunk_configs = _chunk_inputs(glossary, chunks, config)
+    for chunk_config in chunk_configs:
+        chunk_config["max_concurrency"] = max_concurrency
+    return _reassemble(chunks, await get_chunk_translator().abatch(chunk_inputs, chunk_configs))
+
+
+@lru_cache(maxsize=None)
+def get_chunked_translator(max_chars: int = 800, max_concurrency: int = 8):
+    """
+    切塊平行翻譯，輸入輸出與 get_translator() 相同（{"article": ...} -> AIMessage）
+
+    Args:
+        max_chars: 每一塊的字元數上限，只有一塊時直接整篇翻譯
+        max_concurrency: 同時翻譯的塊數上限
+    """
+    def translate(inputs: Dict[str, Any], config: RunnableConfig) -> AIMessage:
+        return _translate_chunked(inputs, config, max_chars, max_concurrency)
+
+    async def atranslate(inputs: Dict[str, Any], config: RunnableConfig) -> AIMessage:
+        return await _atranslate_chunked(inputs, config, max_chars, max_concurrency)
+
+    return RunnableLambda(translate, afunc=atranslate, name="chunked_translator")
+
+def get_translation_chain():
+    """依環境變數 TRANSLATION_MODE（single / chunked）選擇翻譯方式，預設為 single"""
+    mode = os.getenv("TRANSLATION_MODE", "single")
+    if mode == "chunked":
+        return get_chunked_translator(
+            max_chars=int(os.getenv("TRANSLATION_CHUNK_CHARS", "800")),
+            max_concurrency=int(os.getenv("TRANSLATION_MAX_CONCURRENCY", "8")),
+        )
+    if mode != "single":
+        raise ValueError(f"不支援的翻譯方式: {mode}（可用: single, chunked）")
+    return get_translator()
 
 if __name__ == "__main__":
     # Test the Agent
-    result = translator.invoke(
+    result = get_translator().invoke(
         {
-            "article": "震撼彈！知名啦啦隊女神小雨宣布退出Lamigo桃猿，轉戰統一獅啦啦隊。消息一出，引起球迷熱烈討論。有內部消息指出，小雨此舉可能與新東家開出的天價薪酬有關。究竟是否屬實？本報將持續追蹤報導。敬請球迷朋友們拭目以待，這個夏天的職棒轉會市場肯定會掀起更多驚人巨浪！"
+            "article": "Bombshell! Popular cheerleader Xiaoyu announced she is leaving the Lamigo Monkeys to join the Uni-President Lions cheerleading squad. The news sparked heated discussion among fans, and insiders say a lucrative offer from her new team may be behind the move. The CPBL transfer market is set for more surprises this summer!"
         }
     )
 
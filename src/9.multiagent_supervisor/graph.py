@@ -1,44 +1,199 @@
 import sys
 import os
+import hashlib
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from typing import Annotated, List, Tuple, Union, Literal,TypedDict
+from typing import Annotated, Any, Callable, Dict, List, Optional, Tuple, Union, Literal,TypedDict
 
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from utils.graph2mermaid import create_mermaid # for saving mermaid code
 from langchain_core.prompts import ChatPromptTemplate
+from utils.article_checks import detect_script, precheck_article
+from prefilter import get_prefilter
+from speculation import get_speculation
+from langchain_core.runnables import RunnableParallel
+from utils.run_budget import RunBudget, budget_router
 
 # import the chains
-from chains.ExpansionSystem import expander
-from chains.ArticlePostabilityGrader import news_chef
-from chains.TransfreNewsGrader import evaluator
-from chains.TranslationSystem import translator
+from chains.ExpansionSystem import get_expander
+from chains.ArticlePostabilityGrader import TaiwanArticlePostabilityGrader, get_subjective_news_chef
+from chains.TransfreNewsGrader import get_evaluator
+from chains.TranslationSystem import get_translation_chain
+from chains.CombinedGrader import get_combined_grader
+
+# 評分方式：separate 為 evaluator 與 news_chef 各呼叫一次 LLM；
+# combined 為第一輪只呼叫一次 LLM，同時取得相關性與發佈評分；
+# speculative 為 evaluator 與 news_chef 的評分同時送出，不相關時丟棄評分（見 speculation.py）
+GRADING_MODES = ("separate", "combined", "speculative")
 
 class AgentState(TypedDict):
     article_state: str
+    # 目前文章的評分（binary_score / can_be_posted / is_sensationalistic / meets_word_count /
+    # is_language_traditional_chinese），由節點寫入，router 只讀取；文章改寫後只保留 binary_score
+    grade: Dict[str, str]
+    # 以內容雜湊為索引的各版本評分：{hash: 評分}，震盪結束時取回該版本的評分
+    history: Dict[str, Dict[str, str]]
+    # news_chef 依序評估過的版本雜湊，用來偵測來回震盪
+    versions: List[str]
+    # 提前結束的原因（oscillation / untranslatable / budget_exhausted），正常流程不會設定
+    stop_reason: str
+    # 相關性評分的來源：prefilter（本地預篩）或 llm，pipeline 輸出據此挑選預篩器的訓練資料
+    relevance_source: str
 
 
 ### 呼叫 Agnet 工作以及顯示節點狀態用
+def article_hash(article: str) -> str:
+    """文章內容的雜湊，作為版本紀錄的索引"""
+    return hashlib.sha256(article.encode("utf-8")).hexdigest()[:16]
+def _prefilter_grade(article: str) -> Optional[Dict[str, str]]:
+    """本地預篩有把握時直接給出相關性評分，不確定時回傳 None"""
+    decision = get_prefilter().decide(article)
+    if decision == "uncertain":
+        return None
+    print("Prefilter result (skip LLM): ", decision)
+    return {"binary_score": "yes" if decision == "relevant" else "no"}
+def _evaluator_grade(result: Any) -> Dict[str, str]:
+    print("Evaluator result: ", result)
+    return result.model_dump()
+def _combined_grade(result: Any) -> Dict[str, str]:
+    # 一次呼叫同時取得相關性與發佈評分，news_chef 不需要再呼叫 LLM
+    print("Combined grader result: ", result)
+    return result.model_dump()
+def _should_speculate(article: str) -> bool:
+    # 字數或語言不符時 news_chef 不需要主觀評分，不必投機
+    return "no" not in precheck_article(article).values() and get_speculation().should_speculate(article)
+def _speculative_grade(result: Dict[str, Any]) -> Dict[str, str]:
+    """合併同時送出的相關性與主觀評分，不相關時丟棄主觀評分"""
+    grade = result["relevance"].model_dump()
+    used = grade["binary_score"] == "yes"
+    get_speculation().record(used)
+    if used:
+        grade.update(result["subjective"].model_dump())
+    print("Speculative grader result: ", grade, "(used)" if used else "(wasted)")
+    return grade
+def _evaluator_chain(article: str, grading: str) -> Tuple[Any, Callable[[Any], Dict[str, str]]]:
+    """
+    依評分方式選出 evaluator 要呼叫的 chain
+
+    Returns:
+        (chain, 把 chain 的結果轉成評分的函數)
+    """
+    if grading == "combined":
+        return get_combined_grader(), _combined_grade
+    if grading == "speculative" and _should_speculate(article):
+        return RunnableParallel(relevance=get_evaluator(), subjective=get_subjective_news_chef()), _speculative_grade
+    return get_evaluator(), _evaluator_grade
+def _start_grading(state: AgentState) -> Optional[Dict[str, str]]:
+    """evaluator 共用的前置步驟：本地預篩有結論時回傳評分，並記錄相關性的來源"""
+    grade = _prefilter_grade(state["article_state"])
+    state["relevance_source"] = "llm" if grade is None else "prefilter"
+    return grade
+def _grade_article(state: AgentState, grading: str) -> AgentState:
+    grade = _start_grading(state)
+    if grade is None:
+        chain, to_grade = _evaluator_chain(state["article_state"], grading)
+        grade = to_grade(chain.invoke({"article": state["article_state"]}))
+    state["grade"] = grade
+    return state
+async def _agrade_article(state: AgentState, grading: str) -> AgentState:
+    grade = _start_grading(state)
+    if grade is None:
+        chain, to_grade = _evaluator_chain(state["article_state"], grading)
+        grade = to_grade(await chain.ainvoke({"article": state["article_state"]}))
+    state["grade"] = grade
+    return state
 def get_transfer_news_grade(state: AgentState) -> AgentState:
     print(f"get_transfer_news_grade: Current state: {state}")
-    print("Evaluator: Reading article but doing nothing to change it...")
+    return _grade_article(state, "separate")
+async def aget_transfer_news_grade(state: AgentState) -> AgentState:
+    print(f"aget_transfer_news_grade: Current state: {state}")
+    return await _agrade_article(state, "separate")
+def get_combined_news_grade(state: AgentState) -> AgentState:
+    print(f"get_combined_news_grade: Current state: {state}")
+    return _grade_article(state, "combined")
+async def aget_combined_news_grade(state: AgentState) -> AgentState:
+    print(f"aget_combined_news_grade: Current state: {state}")
+    return await _agrade_article(state, "combined")
+def get_speculative_news_grade(state: AgentState) -> AgentState:
+    print(f"get_speculative_news_grade: Current state: {state}")
+    return _grade_article(state, "speculative")
+async def aget_speculative_news_grade(state: AgentState) -> AgentState:
+    print(f"aget_speculative_news_grade: Current state: {state}")
+    return await _agrade_article(state, "speculative")
+def _prepare_news_chef(state: AgentState) -> Tuple[str, Dict[str, str], bool]:
+    """
+    以本地檢查補上評分，並判斷是否需要 LLM
+
+    回到評估過的版本時取回 history 中該版本的評分並結束改寫；
+    不同文章、不同 thread 的主觀評分由 grader 的回應快取（utils/llm_cache.py）重複使用。
+
+    Returns:
+        (版本雜湊, 評分, 是否需要呼叫 LLM 取得主觀評分)
+    """
+    article = state["article_state"]
+    key = article_hash(article)
+    if key in state.get("versions", []):
+        # 改寫後回到評估過的版本（翻譯原文照抄，或在兩個版本間來回），再改寫也不會收斂，不必再評分
+        print("News chef: article version already seen, stop rewriting: ", key)
+        state["stop_reason"] = "oscillation"
+        # 目前的 grade 屬於上一個版本（改寫後也只剩 binary_score），改用這個版本當時的評分
+        return key, dict(state.get("history", {}).get(key, state.get("grade", {}))), False
+    # 字數與語言在本地判斷，兩者都通過且還沒有主觀評分時才呼叫 LLM
+    checks = precheck_article(article)
+    grade = {**state.get("grade", {}), **checks}
+    if "no" in checks.values():
+        print("News chef precheck (skip LLM): ", checks)
+        if checks["is_language_traditional_chinese"] == "no" and detect_script(article) == "unknown":
+            # 沒有任何文字（空白、只有數字或符號），翻譯也不會變成繁體中文
+            print("News chef: nothing to translate, stop rewriting")
+            state["stop_reason"] = "untranslatable"
+        return key, grade, False
+    return key, grade, "can_be_posted" not in grade
+def _record_news_chef(state: AgentState, key: str, grade: Dict[str, str]) -> AgentState:
+    """把評分寫回 state，並記錄評估過的版本與評分"""
+    state["grade"] = grade
+    state["history"] = {**state.get("history", {}), key: grade}
+    state["versions"] = state.get("versions", []) + [key]
     return state
 def evaluate_article(state: AgentState) -> AgentState:
     print(f"evaluate_article: Current state: {state}")
-    print("News : Reading article but doing nothing to change it...")
+    key, grade, needs_llm = _prepare_news_chef(state)
+    if needs_llm:
+        subjective = get_subjective_news_chef().invoke({"article": state["article_state"]})
+        grade.update(subjective.model_dump())
+    return _record_news_chef(state, key, grade)
+async def aevaluate_article(state: AgentState) -> AgentState:
+    print(f"aevaluate_article: Current state: {state}")
+    key, grade, needs_llm = _prepare_news_chef(state)
+    if needs_llm:
+        subjective = await get_subjective_news_chef().ainvoke({"article": state["article_state"]})
+        grade.update(subjective.model_dump())
+    return _record_news_chef(state, key, grade)
+def _rewritten(state: AgentState, article: str) -> AgentState:
+    state["article_state"] = article
+    state["grade"] = {"binary_score": state["grade"]["binary_score"]} # 文章已改寫，需要重新評分
     return state
 def translate_article(state: AgentState) -> AgentState:
     print(f"translate_article: Current state: {state}")
-    article = state["article_state"]
-    result = translator.invoke({"article": article})
-    state["article_state"] = result.content
-    return state
+    result = get_translation_chain().invoke({"article": state["article_state"]})
+    return _rewritten(state, result.content)
+async def atranslate_article(state: AgentState) -> AgentState:
+    print(f"atranslate_article: Current state: {state}")
+    result = await get_translation_chain().ainvoke({"article": state["article_state"]})
+    return _rewritten(state, result.content)
 def expand_article(state: AgentState) -> AgentState:
     print(f"expand_article: Current state: {state}")
-    article = state["article_state"]
-    result = expander.invoke({"article": article})
-    state["article_state"] = result.content
+    result = get_expander().invoke({"article": state["article_state"]})
+    return _rewritten(state, result.content)
+async def aexpand_article(state: AgentState) -> AgentState:
+    print(f"aexpand_article: Current state: {state}")
+    result = await get_expander().ainvoke({"article": state["article_state"]})
+    return _rewritten(state, result.content)
+def budget_fallback(state: AgentState) -> AgentState:
+    # 改寫迴圈的預算用完，保留目前的文章並結束，不發佈
+    print(f"budget_fallback: Current state: {state}")
+    state["stop_reason"] = "budget_exhausted"
     return state
 def publisher(state: AgentState) -> AgentState:
     print(f"publisher: Current state: {state}")
@@ -46,56 +201,103 @@ def publisher(state: AgentState) -> AgentState:
     return state
      
 
-## 提供路由使用
+## 提供路由使用（只讀取 state 中的評分，不呼叫 LLM）
 def evaluator_router(state: AgentState) -> Literal["news_chef", "not_relevant"]:
-    article = state["article_state"]
-    result = evaluator.invoke({"article": article})
     print(f"evaluator_router: Current state: {state}")
-    print("Evaluator result: ", result)
-    if result.binary_score == "yes":
+    if state["grade"]["binary_score"] == "yes":
         return "news_chef"
     else:
         return "not_relevant"
 def news_chef_router(
     state: AgentState,
-) -> Literal["translator", "publisher", "expander"]:
-    article = state["article_state"]
-    result = news_chef.invoke({"article": article})
+) -> Literal["translator", "publisher", "expander", "stop"]:
     print(f"news_chef_router: Current state: {state}")
+    if state.get("stop_reason"):
+        return "stop"
+    grade = state["grade"]
+    if grade["is_language_traditional_chinese"] == "no":
+        return "translator"
+    if grade["meets_word_count"] == "no":
+        return "expander"
+    result = TaiwanArticlePostabilityGrader(**{name: grade[name] for name in TaiwanArticlePostabilityGrader.model_fields})
     print("News chef result: ", result)
     if result.can_be_posted == "yes":
         return "publisher"
-    elif result.is_language_traditional_chinese == "yes":
-        if result.meets_word_count == "no" or result.is_sensationalistic == "no":
-            return "expander"
+    elif result.is_sensationalistic == "no":
+        return "expander"
     return "translator"
 
-def build_graph() -> StateGraph:
+def _compile_graph(grading: Optional[str], nodes: Dict[str, Dict[str, Any]]) -> StateGraph:
+    grading = grading or os.getenv("GRADING_MODE", "separate")
+    if grading not in GRADING_MODES:
+        raise ValueError(f"不支援的評分方式: {grading}（可用: {', '.join(GRADING_MODES)}）")
     workflow = StateGraph(AgentState)
 
-    workflow.add_node("evaluator", get_transfer_news_grade)
-    workflow.add_node("news_chef", evaluate_article)
-    workflow.add_node("translator", translate_article)
-    workflow.add_node("expander", expand_article)
+    workflow.add_node("evaluator", nodes["evaluator"][grading])
+    workflow.add_node("news_chef", nodes["news_chef"])
+    workflow.add_node("translator", nodes["translator"])
+    workflow.add_node("expander", nodes["expander"])
     workflow.add_node("publisher", publisher)
+    workflow.add_node("fallback", budget_fallback)
 
     workflow.set_entry_point("evaluator")
 
     workflow.add_conditional_edges(
         "evaluator", evaluator_router, {"news_chef": "news_chef", "not_relevant": END}
     )
+    # 以 RunBudget（utils/run_budget.py）執行時，改寫迴圈的預算用完會改走 fallback
     workflow.add_conditional_edges(
         "news_chef",
-        news_chef_router,
-        {"translator": "translator", "publisher": "publisher", "expander": "expander"},
+        budget_router(news_chef_router, cycle="rewrite", loop_targets={"translator", "expander"}),
+        {"translator": "translator", "publisher": "publisher", "expander": "expander", "stop": END, "fallback": "fallback"},
     )
     workflow.add_edge("translator", "news_chef")
     workflow.add_edge("expander", "news_chef")
     workflow.add_edge("publisher", END)
+    workflow.add_edge("fallback", END)
 
     graph = workflow.compile()
     return graph
 
+def build_graph(grading: Optional[str] = None) -> StateGraph:
+    """
+    建立新聞審核 graph
+
+    Args:
+        grading: 評分方式（separate / combined / speculative），預設讀取 GRADING_MODE 環境變數，未設定時為 separate
+    """
+    return _compile_graph(grading, {
+        "evaluator": {
+            "separate": get_transfer_news_grade,
+            "combined": get_combined_news_grade,
+            "speculative": get_speculative_news_grade,
+        },
+        "news_chef": evaluate_article,
+        "translator": translate_article,
+        "expander": expand_article,
+    })
+
+def abuild_graph(grading: Optional[str] = None) -> StateGraph:
+    """
+    建立節點全部使用 ainvoke 的新聞審核 graph
+
+    節點在等 LLM 時不佔用執行緒，單一 event loop 即可同時處理上百篇文章。
+    只能以 ainvoke / astream 執行，同步的 invoke 請用 build_graph()。
+
+    Args:
+        grading: 評分方式（separate / combined / speculative），預設讀取 GRADING_MODE 環境變數，未設定時為 separate
+    """
+    return _compile_graph(grading, {
+        "evaluator": {
+            "separate": aget_transfer_news_grade,
+            "combined": aget_combined_news_grade,
+            "speculative": aget_speculative_news_grade,
+        },
+        "news_chef": aevaluate_article,
+        "translator": atranslate_article,
+        "expander": aexpand_article,
+    })
+
 def test_case_1(graph: StateGraph):
     test_case_1 = {
         "article_state": "知名啦啦隊女神小雨宣布退出Lamigo桃猿，轉戰統一獅啦啦隊。"
@@ -125,7 +327,10 @@ def test_case_3(graph: StateGraph):
     test_case_3 = {
         "article_state": "CPBL star outfielder Wang Po-Jung considering a return to NPB after successful stint with Lamigo Monkeys."
     }
-    result_3 = graph.invoke(test_case_3)
+    # 限制改寫迴圈的次數與 LLM 呼叫數，用完時走 fallback 結束而不是 GraphRecursionError
+    budget = RunBudget(max_iterations=5, max_llm_calls=20)
+    result_3 = graph.invoke(test_case_3, config=budget.config())
+    print(budget.report())
     print(result_3)
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+"""
+以 fake 後端離線跑完整個新聞審核 graph，確認改寫迴圈會收斂
+
+- 英文文章：news_chef 判定不是繁體中文 → translator 翻譯成繁體中文 → news_chef 通過 → publisher
+- 只有數字的文章：沒有可以翻譯的文字 → 直接結束（stop_reason 為 untranslatable），不會送進 translator
+
+fake 模型的規則：翻譯的 prompt 回覆一篇超過 300 字的繁體中文文章，其餘 grader 依 schema 回答 'yes'。
+同步（build_graph）與非同步（abuild_graph）的 graph 都會檢查，任何一項不符時以非零狀態結束。
+
+    python src/9.multiagent_supervisor/offline_check.py
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import yaml
+from typing import Any, Dict
+
+ENGLISH_ARTICLE = "CPBL star outfielder Wang Po-Jung considering a return to NPB after successful stint with Lamigo Monkeys."
+
+TRANSLATED_ARTICLE = (
+    "中職明星外野手王柏融正考慮重返日本職棒。王柏融過去效力Lamigo桃猿時表現亮眼，"
+    "曾兩度單季打擊率超過四成，並拿下打擊三冠王，是聯盟最具代表性的打者之一。"
+    "旅日期間他在火腿鬥士隊累積了寶貴經驗，返台後也持續在球場上展現身手。"
+    "據了解，目前已有日本球團與他的經紀團隊接觸，雙方針對合約內容與球隊定位進行初步討論。"
+    "球團人士表示，王柏融的打擊實力與比賽經驗都是球隊需要的，若能順利簽約，將可補強外野戰力。"
+    "王柏融本人則低調回應，目前專注於本季賽事，未來動向會與家人及經紀團隊討論後再做決定。"
+    "許多球迷在社群網站上留言，有人希望他留在中職繼續為台灣球迷打球，也有人支持他再次挑戰日本職棒。"
+    "體育評論員指出，王柏融正值當打之年，若能在日本站穩腳步，對台灣棒球的國際能見度也有正面幫助。"
+    "無論最後的決定為何，這位台灣強打的下一步都將是今年冬天最受矚目的轉隊話題之一，本報將持續追蹤。"
+)
+
+DIGITS_ARTICLE = "2024 03 15 9 : 3"
+
+FAKE_CONFIG = {
+    "llms": {
+        "chat": {
+            "provider": "fake",
+            "model": "offline-check",
+            "fake": {"rules": [["Article to translate", TRANSLATED_ARTICLE]]},
+        }
+    }
+}
+
+
+def _use_fake_backend(workdir: str) -> None:
+    """在第一次建立 chain 之前設定 fake 後端（chain 以 lru_cache 建立，之後不會再讀設定）"""
+    config_path = os.path.join(workdir, "config.yaml")
+    with open(config_path, "w", encoding="utf-8") as file:
+        yaml.safe_dump(FAKE_CONFIG, file, allow_unicode=True)
+    os.environ["LLM_CONFIG_PATH"] = config_path
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["LLM_CACHE_PATH"] = os.path.join(workdir, "llm_cache.sqlite")
+    os.environ["TRANSLATION_MODE"] = "single"
+    os.environ.pop("LLM_CASSETTE_DIR", None)
+
+
+def _check(name: str, result: Dict[str, Any], expected_stop: str = None) -> bool:
+    """
+    檢查 graph 的結果
+
+    Args:
+        name: 檢查項目名稱
+        result: graph 的最終 state
+        expected_stop: 預期的 stop_reason，None 時預期文章已翻譯並發佈
+    """
+    if expected_stop is None:
+        ok = result["article_state"] == TRANSLATED_ARTICLE and not result.get("stop_reason") \
+            and result["grade"].get("can_be_posted") == "yes"
+    else:
+        ok = result.get("stop_reason") == expected_stop and result["article_state"] == DIGITS_ARTICLE
+    print(f"{'OK  ' if ok else 'FAIL'} {name}: stop_reason={result.get('stop_reason')}, versions={len(result.get('versions', []))}")
+    return ok
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as workdir:
+        _use_fake_backend(workdir)
+        from graph import abuild_graph, build_graph
+        from utils.run_budget import RunBudget
+
+        results = []
+        for grading in ("separate", "combined", "speculative"):
+            graph, agraph = build_graph(grading), abuild_graph(grading)
+            budget = RunBudget(max_iterations=5, max_llm_calls=20)
+            results.append(_check(f"{grading} / 英文", graph.invoke({"article_state": ENGLISH_ARTICLE}, config=budget.config())))
+            budget = RunBudget(max_iterations=5, max_llm_calls=20)
+            results.append(_check(
+                f"{grading} / 英文（ainvoke）",
+                asyncio.run(agraph.ainvoke({"article_state": ENGLISH_ARTICLE}, config=budget.config())),
+            ))
+            results.append(_check(f"{grading} / 只有數字", graph.invoke({"article_state": DIGITS_ARTICLE}), "untranslatable"))
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
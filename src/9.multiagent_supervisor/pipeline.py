@@ -0,0 +1,169 @@
+"""
+新聞審核的串流處理 pipeline
+
+從 JSONL 或 CSV 分塊讀取文章（pandas chunksize，記憶體用量不隨檔案大小成長），
+交給 abatch_articles 以固定併發數處理（有空位才讀下一篇，形成 backpressure），
+每完成一篇就附加一行結果到輸出 JSONL。
+
+可續跑：重新啟動時會先掃描輸出檔，跳過已經成功處理過的文章 ID；
+處理失敗（route=error）的文章不算完成，下次會重試。
+
+    python src/9.multiagent_supervisor/pipeline.py articles.jsonl results.jsonl --max-concurrency 16
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import json
+import asyncio
+import argparse
+from typing import Any, Dict, Iterator, Optional, Set
+
+import pandas as pd
+
+from batch import abatch_articles
+from graph import GRADING_MODES, abuild_graph
+
+
+def read_articles(
+    path: str,
+    id_column: str = "id",
+    text_column: str = "article",
+    chunksize: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    """
+    分塊讀取 JSONL / CSV 文章
+
+    Args:
+        path: 輸入檔路徑（.jsonl / .csv）
+        id_column: 文章 ID 欄位，缺少時以列號作為 ID
+        text_column: 文章內容欄位
+        chunksize: 每次讀取的列數
+
+    Yields:
+        {"id": 文章 ID（字串）, "article": 文章內容}
+    """
+    if path.endswith((".jsonl", ".ndjson")):
+        reader = pd.read_json(path, lines=True, chunksize=chunksize, dtype=False)
+    elif path.endswith(".csv"):
+        reader = pd.read_csv(path, chunksize=chunksize, dtype={id_column: str})
+    else:
+        raise ValueError(f"不支援的輸入格式: {path}（僅支援 .jsonl / .ndjson / .csv）")
+
+    row_number = 0
+    with reader:
+        for chunk in reader:
+            has_id = id_column in chunk.columns
+            ids = chunk[id_column].tolist() if has_id else range(row_number, row_number + len(chunk))
+            for article_id, text in zip(ids, chunk[text_column].tolist()):
+                row_number += 1
+                yield {"id": str(article_id), "article": "" if pd.isna(text) else str(text)}
+
+
+def load_done_ids(output_path: str) -> Set[str]:
+    """
+    讀取輸出檔中已成功處理的文章 ID
+
+    Args:
+        output_path: 輸出 JSONL 路徑
+
+    Returns:
+        已完成的文章 ID 集合
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # 上次中斷時寫到一半的行
+            if record.get("route") != "error":
+                done.add(str(record["article_id"]))
+    return done
+
+
+def _open_output(output_path: str):
+    """以附加模式開啟輸出檔；若最後一行寫到一半，先補上換行"""
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            needs_newline = file.read(1) != b"\n"
+        if needs_newline:
+            with open(output_path, "a", encoding="utf-8") as file:
+                file.write("\n")
+    return open(output_path, "a", encoding="utf-8")
+
+
+async def run_pipeline(
+    input_path: str,
+    output_path: str,
+    max_concurrency: int = 8,
+    id_column: str = "id",
+    text_column: str = "article",
+    chunksize: int = 1000,
+    graph=None,
+    config: Optional[Dict[str, Any]] = None,
+) -> Dict[str, int]:
+    """
+    串流處理輸入檔中的文章並逐篇寫出結果
+
+    Args:
+        input_path: 輸入檔路徑（.jsonl / .csv）
+        output_path: 輸出 JSONL 路徑
+        max_concurrency: 同時處理的文章數上限
+        id_column: 文章 ID 欄位
+        text_column: 文章內容欄位
+        chunksize: 每次讀取的列數
+        graph: 已編譯的 graph，預設為 abuild_graph()
+        config: 傳給 graph 的設定
+
+    Returns:
+        處理、跳過與失敗的數量
+    """
+    done = load_done_ids(output_path)
+    stats = {"processed": 0, "skipped_done": 0, "skipped_empty": 0, "errors": 0}
+
+    def pending_articles() -> Iterator[Dict[str, Any]]:
+        for article in read_articles(input_path, id_column, text_column, chunksize):
+            if article["id"] in done:
+                stats["skipped_done"] += 1
+            elif not article["article"].strip():
+                stats["skipped_empty"] += 1
+            else:
+                yield article
+
+    with _open_output(output_path) as output:
+        async for result in abatch_articles(pending_articles(), max_concurrency, graph, config):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            stats["processed"] += 1
+            if result["route"] == "error":
+                stats["errors"] += 1
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="串流處理新聞文章")
+    parser.add_argument("input_path", help="輸入檔（.jsonl / .csv）")
+    parser.add_argument("output_path", help="輸出 JSONL")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--id-column", default="id")
+    parser.add_argument("--text-column", default="article")
+    parser.add_argument("--chunksize", type=int, default=1000)
+    parser.add_argument("--grading", choices=GRADING_MODES, default=None, help="評分方式，預設讀取 GRADING_MODE")
+    args = parser.parse_args()
+
+    stats = asyncio.run(run_pipeline(
+        args.input_path,
+        args.output_path,
+        max_concurrency=args.max_concurrency,
+        id_column=args.id_column,
+        text_column=args.text_column,
+        chunksize=args.chunksize,
+        graph=abuild_graph(args.grading),
+    ))
+    print(stats)
@@ -0,0 +1,303 @@
+"""
+evaluator 前的本地相關性預篩
+
+大部分進來的文章與啦啦隊無關，不需要每篇都花一次 LLM 呼叫。預篩器以訓練好的模型
+（NumPy 實作的 hashing TF-IDF + logistic regression，加上 CPBL 球隊 / 啦啦隊關鍵字特徵）算出相關機率：
+機率 <= negative_threshold 直接判定不相關（END），>= positive_threshold 直接送 news_chef，
+中間的不確定區間才交給 CheerleaderNewsGrader。stats 記錄省下的 LLM 呼叫數。
+
+只有載入訓練好的模型（PREFILTER_MODEL_PATH）時才會跳過 LLM；沒有模型時每篇文章都交給 LLM，
+預設的 graph 判斷結果不變。關鍵字表不可能列出所有相關用語（成員暱稱、新的應援團名稱），
+「女神」之類的泛用詞加上球隊名稱也不代表是啦啦隊新聞，因此關鍵字估計只用來排序投機評分（speculation.py），不直接決定路徑。
+
+門檻與模型路徑可用環境變數設定：PREFILTER_MODEL_PATH、PREFILTER_NEGATIVE_THRESHOLD、
+PREFILTER_POSITIVE_THRESHOLD；PREFILTER_ENABLED=0 時即使有模型也全部交給 LLM。
+
+訓練資料可以來自 cassette 錄製檔（CheerleaderNewsGrader 的回應）或 pipeline 的輸出 JSONL：
+
+    python src/9.multiagent_supervisor/prefilter.py train --cassette .cassettes --output prefilter.npz
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import re
+import glob
+import gzip
+import json
+import zlib
+import warnings
+import argparse
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# CPBL 球隊（含舊名與英文名）
+TEAM_TERMS = (
+    "中信兄弟", "兄弟象", "統一獅", "統一7-ELEVEn獅", "樂天桃猿", "Lamigo桃猿", "桃猿", "富邦悍將",
+    "味全龍", "台鋼雄鷹", "中職", "職棒", "CPBL", "CTBC Brothers", "Rakuten Monkeys", "Lamigo", "Uni-Lions",
+    "Fubon Guardians", "Wei Chuan Dragons", "TSG Hawks",
+)
+# 啦啦隊相關用語
+CHEER_TERMS = (
+    "啦啦隊", "啦啦隊員", "啦啦隊女孩", "女神", "應援", "樂天女孩", "小龍女", "峮峮", "Passion Sisters", "Rakuten Girls", "Fubon Angels",
+    "Uni-Girls", "Dragon Beauties", "Wing Stars", "cheerleader", "cheerleading", "cheer squad",
+)
+
+_HAN = re.compile(r"[一-鿿]+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """中文取字元 bigram，英文取小寫單字"""
+    tokens = []
+    for run in _HAN.findall(text):
+        tokens.extend(run[i:i + 2] for i in range(max(1, len(run) - 1)))
+    tokens.extend(_WORD.findall(text.lower()))
+    return tokens
+
+
+def keyword_hits(text: str) -> Tuple[int, int]:
+    """計算球隊與啦啦隊關鍵字出現次數"""
+    lowered = text.lower()
+    teams = sum(lowered.count(term.lower()) for term in TEAM_TERMS)
+    cheers = sum(lowered.count(term.lower()) for term in CHEER_TERMS)
+    return teams, cheers
+
+
+def keyword_probability(text: str) -> float:
+    """沒有模型時，以關鍵字估計相關機率（沒有命中時的 0.05 只代表「關鍵字看不出來」，不代表不相關）"""
+    teams, cheers = keyword_hits(text)
+    if teams and cheers:
+        return 0.95
+    if cheers:
+        return 0.8
+    if teams:
+        return 0.5
+    return 0.05
+
+
+class HashingTfidfLogistic:
+    """
+    以 hashing trick 向量化的 TF-IDF + logistic regression
+
+    Args:
+        n_features: hash 空間大小
+    """
+
+    def __init__(self, n_features: int = 2 ** 12):
+        self.n_features = n_features
+        self.idf = np.ones(n_features, dtype=np.float32)
+        self.weights = np.zeros(n_features + 2, dtype=np.float32)  # 最後兩維為關鍵字特徵
+        self.bias = 0.0
+
+    def _counts(self, texts: Iterable[str]) -> np.ndarray:
+        texts = list(texts)
+        matrix = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            indices = [zlib.crc32(token.encode("utf-8")) % self.n_features for token in tokenize(text)]
+            if indices:
+                np.add.at(matrix[row], indices, 1.0)
+        return matrix
+
+    def transform(self, texts: Iterable[str]) -> np.ndarray:
+        """轉成 TF-IDF（L2 正規化）並附上關鍵字特徵"""
+        texts = list(texts)
+        matrix = np.log1p(self._counts(texts)) * self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+        keywords = np.log1p(np.array([keyword_hits(text) for text in texts], dtype=np.float32).reshape(-1, 2))
+        return np.hstack([matrix, keywords])
+
+    def fit(self, texts: List[str], labels: List[int], epochs: int = 300, lr: float = 1.0, l2: float = 1e-3) -> "HashingTfidfLogistic":
+        """以批次梯度下降訓練"""
+        counts = self._counts(texts)
+        document_frequency = (counts > 0).sum(axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        x = self.transform(texts)
+        y = np.asarray(labels, dtype=np.float32)
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-(x @ self.weights + self.bias)))
+            error = p - y
+            self.weights -= lr * (x.T @ error / len(y) + l2 * self.weights)
+            self.bias -= lr * float(error.mean())
+        return self
+
+    def predict_proba(self, texts: Iterable[str]) -> np.ndarray:
+        """回傳相關機率"""
+        x = self.transform(texts)
+        return 1.0 / (1.0 + np.exp(-(x @ self.weights + self.bias)))
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, idf=self.idf, weights=self.weights, bias=np.float32(self.bias))
+
+    @classmethod
+    def load(cls, path: str) -> "HashingTfidfLogistic":
+        data = np.load(path)
+        model = cls(n_features=len(data["idf"]))
+        model.idf, model.weights, model.bias = data["idf"], data["weights"], float(data["bias"])
+        return model
+
+
+class RelevancePrefilter:
+    """
+    相關性預篩器
+
+    Args:
+        model: 訓練好的模型，None 時 decide() 一律回傳 uncertain（probability() 改用關鍵字估計）
+        negative_threshold: 機率低於等於此值直接判定不相關
+        positive_threshold: 機率高於等於此值直接判定相關
+    """
+
+    def __init__(
+        self,
+        model: Optional[HashingTfidfLogistic] = None,
+        negative_threshold: float = 0.1,
+        positive_threshold: float = 0.9,
+    ):
+        self.model = model
+        self.negative_threshold = negative_threshold
+        self.positive_threshold = positive_threshold
+        self._lock = threading.Lock()
+        self.stats = {"not_relevant": 0, "relevant": 0, "uncertain": 0}
+
+    def probability(self, article: str) -> float:
+        if self.model is not None:
+            return float(self.model.predict_proba([article])[0])
+        return keyword_probability(article)
+
+    def decide(self, article: str) -> str:
+        """
+        判斷文章是否需要交給 LLM
+
+        Returns:
+            "not_relevant"、"relevant" 或 "uncertain"（需要 LLM 判斷）
+        """
+        probability = self.probability(article) if self.model is not None else None
+        if probability is None:
+            # 沒有訓練好的模型，關鍵字估計不足以取代 LLM 的判斷
+            decision = "uncertain"
+        elif probability <= self.negative_threshold:
+            decision = "not_relevant"
+        elif probability >= self.positive_threshold:
+            decision = "relevant"
+        else:
+            decision = "uncertain"
+        with self._lock:
+            self.stats[decision] += 1
+        return decision
+
+    def report(self) -> Dict[str, int]:
+        """
+        取得預篩統計
+
+        Returns:
+            各判斷結果的數量與省下的 LLM 呼叫數
+        """
+        with self._lock:
+            return {**self.stats, "llm_calls_saved": self.stats["not_relevant"] + self.stats["relevant"]}
+
+
+@lru_cache(maxsize=None)
+def get_prefilter() -> RelevancePrefilter:
+    """取得共用的預篩器，模型與門檻由環境變數決定"""
+    if os.getenv("PREFILTER_ENABLED", "1") == "0":
+        # 門檻設在機率範圍之外，所有文章都會交給 LLM
+        return RelevancePrefilter(negative_threshold=-1.0, positive_threshold=2.0)
+    model_path = os.getenv("PREFILTER_MODEL_PATH")
+    model = HashingTfidfLogistic.load(model_path) if model_path and os.path.exists(model_path) else None
+    return RelevancePrefilter(
+        model=model,
+        negative_threshold=float(os.getenv("PREFILTER_NEGATIVE_THRESHOLD", "0.1")),
+        positive_threshold=float(os.getenv("PREFILTER_POSITIVE_THRESHOLD", "0.9")),
+    )
+
+
+def load_cassette_examples(cassette_dir: str) -> Tuple[List[str], List[int]]:
+    """
+    從 cassette 錄製檔取出 CheerleaderNewsGrader 的文章與判斷結果
+
+    Args:
+        cassette_dir: cassette 目錄
+
+    Returns:
+        (文章列表, 標籤列表)
+    """
+    from langchain_core.load import loads
+
+    texts, labels = [], []
+    for path in glob.glob(os.path.join(cassette_dir, "*", "*.json.gz")):
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            entry = json.load(file)
+        if "CheerleaderNewsGrader" not in entry["llm_string"]:
+            continue
+        human = json.loads(entry["prompt"])[-1]["kwargs"]["content"]
+        article = human.split("News Article:", 1)[-1].strip()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            message = loads(entry["generations"])[0].message
+        args = message.tool_calls[0]["args"] if message.tool_calls else json.loads(message.content)
+        texts.append(article)
+        labels.append(1 if args.get("binary_score") == "yes" else 0)
+    return texts, labels
+
+
+def load_pipeline_examples(results_path: str) -> Tuple[List[str], List[int]]:
+    """
+    從 pipeline 輸出取出文章與判斷結果（有經過 news_chef 代表相關）
+
+    輸出中的 article_state 是處理後的文章，因此只取未經改寫、直接判定不相關或直接發佈的文章。
+    只取相關性由 LLM 判斷的文章（relevance_source=llm），預篩器自己的判斷不能拿來訓練預篩器。
+
+    Args:
+        results_path: pipeline 輸出 JSONL
+
+    Returns:
+        (文章列表, 標籤列表)
+    """
+    texts, labels = [], []
+    with open(results_path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("route") == "error" or "translator" in record["path"] or "expander" in record["path"]:
+                continue
+            if record.get("relevance_source") != "llm":
+                continue
+            texts.append(record["article_state"])
+            labels.append(1 if "news_chef" in record["path"] else 0)
+    return texts, labels
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="訓練相關性預篩模型")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train = subparsers.add_parser("train")
+    train.add_argument("--cassette", action="append", default=[], help="cassette 目錄，可指定多次")
+    train.add_argument("--results", action="append", default=[], help="pipeline 輸出 JSONL，可指定多次")
+    train.add_argument("--output", required=True, help="模型輸出路徑（.npz）")
+    train.add_argument("--n-features", type=int, default=2 ** 12)
+    args = parser.parse_args()
+
+    texts, labels = [], []
+    for cassette_dir in args.cassette:
+        more_texts, more_labels = load_cassette_examples(cassette_dir)
+        texts += more_texts
+        labels += more_labels
+    for results_path in args.results:
+        more_texts, more_labels = load_pipeline_examples(results_path)
+        texts += more_texts
+        labels += more_labels
+    if not texts or len(set(labels)) < 2:
+        sys.exit("訓練資料不足：需要同時包含相關與不相關的文章")
+
+    model = HashingTfidfLogistic(n_features=args.n_features).fit(texts, labels)
+    accuracy = float(((model.predict_proba(texts) >= 0.5) == np.asarray(labels)).mean())
+    model.save(args.output)
+    print(f"訓練完成：{len(texts)} 篇，訓練集準確率 {accuracy:.3f}，模型已儲存至 {args.output}")
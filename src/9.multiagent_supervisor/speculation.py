@@ -0,0 +1,79 @@
+"""
+speculative 評分模式的策略
+
+一般流程是先呼叫 evaluator 判斷相關性，相關才呼叫 news_chef 評分，兩次呼叫串行。
+speculative 模式在判斷相關性的同時就送出 news_chef 評分：文章相關時省下一整段等待，
+不相關時這次評分就浪費掉了。
+
+是否投機由文章的預估相關率決定：
+- 設定 expected_relevance_rate 時，所有文章都以這個固定值預估（例如來源已經過篩選）
+- 未設定時，以預篩器（prefilter.py）對該篇文章算出的機率預估
+預估值 >= min_relevance 才同時送出評分。report() 的 wasted_ratio 是投機評分中被丟棄的比例，
+可以依此調整 min_relevance，在成本與延遲之間取捨。
+
+環境變數：SPECULATIVE_RELEVANCE_RATE、SPECULATIVE_MIN_RELEVANCE
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import threading
+from functools import lru_cache
+from typing import Dict, Optional
+
+from prefilter import get_prefilter
+
+
+class SpeculationPolicy:
+    """
+    決定是否投機評分，並統計浪費的呼叫
+
+    Args:
+        expected_relevance_rate: 固定的預估相關率，None 時以預篩器逐篇預估
+        min_relevance: 預估相關率達到此值才投機評分
+    """
+
+    def __init__(self, expected_relevance_rate: Optional[float] = None, min_relevance: float = 0.5):
+        self.expected_relevance_rate = expected_relevance_rate
+        self.min_relevance = min_relevance
+        self._lock = threading.Lock()
+        self.stats = {"speculated": 0, "used": 0, "wasted": 0, "skipped": 0}
+
+    def should_speculate(self, article: str) -> bool:
+        """預估相關率夠高時才投機評分"""
+        if self.expected_relevance_rate is not None:
+            relevance = self.expected_relevance_rate
+        else:
+            relevance = get_prefilter().probability(article)
+        speculate = relevance >= self.min_relevance
+        with self._lock:
+            self.stats["speculated" if speculate else "skipped"] += 1
+        return speculate
+
+    def record(self, used: bool) -> None:
+        """記錄投機評分的結果是否被採用"""
+        with self._lock:
+            self.stats["used" if used else "wasted"] += 1
+
+    def report(self) -> Dict[str, float]:
+        """
+        取得投機評分統計
+
+        Returns:
+            投機 / 採用 / 浪費 / 未投機的次數，以及浪費比例 wasted_ratio
+        """
+        with self._lock:
+            speculated = self.stats["speculated"]
+            return {**self.stats, "wasted_ratio": self.stats["wasted"] / speculated if speculated else 0.0}
+
+
+@lru_cache(maxsize=None)
+def get_speculation() -> SpeculationPolicy:
+    """取得共用的投機評分策略，參數由環境變數決定"""
+    rate = os.getenv("SPECULATIVE_RELEVANCE_RATE")
+    return SpeculationPolicy(
+        expected_relevance_rate=float(rate) if rate else None,
+        min_relevance=float(os.getenv("SPECULATIVE_MIN_RELEVANCE", "0.5")),
+    )
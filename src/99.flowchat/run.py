@@ -8,6 +8,7 @@ from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 
 from utils.graph2mermaid import create_mermaid # for saving mermaid code
+from utils.run_budget import budget_router
 
 # 步驟 1：定義狀態
 class MyState(TypedDict):  # from typing import TypedDict
@@ -50,6 +51,11 @@ def validate(state: MyState):
 #         return {"i": i, "valid": "TOO BIG:I"}
 #     return {"i": i, "valid": "OK"}
 
+# 預算用完時的結束節點：保留最後一次的輸入，標記為未通過驗證
+def give_up(state: MyState):
+    print(f"give_up: {state['i'], state['j'], state['k']}")
+    return {"valid": "BUDGET EXHAUSTED", "reask": False}
+
 # Conditional **edge** function
 def is_small_enough(state: MyState):
     if state['valid'] == "OK":
@@ -63,13 +69,18 @@ def build_graph():
 
     workflow.add_node("parse", parse)
     workflow.add_node("validate", validate)
+    workflow.add_node("give_up", give_up)
 
     workflow.set_entry_point("parse")
 
     workflow.add_edge("parse", "validate")
+    # 以 RunBudget 執行時，重新輸入的次數用完會改走 give_up
     workflow.add_conditional_edges(
-        source="validate", path=is_small_enough
+        source="validate",
+        path=budget_router(is_small_enough, cycle="reask", loop_targets={"parse"}, fallback="give_up"),
+        path_map=["parse", "give_up", END],
     )
+    workflow.add_edge("give_up", END)
     graph = workflow.compile()
     return graph
 
@@ -83,7 +94,9 @@ if __name__ == "__main__":
     create_mermaid(graph)
 
     # user_input = {"i": 0, "j": 0, "k": 0}
-    # r = graph.stream(user_input)
+    # from utils.run_budget import RunBudget
+    # budget = RunBudget(max_iterations=3) # 最多重新輸入 3 次
+    # r = graph.stream(user_input, config=budget.config())
     # for item in r:
     #     print(item)
     
\ No newline at end of file
@@ -0,0 +1,282 @@
+"""
+語言模型管理
+
+各範例透過 LLMManager().get_llm("chat") 取得語言模型。
+
+範例與 chains 模組在 import 時不建立模型、chain 或綁定工具，一律包在 @lru_cache 的 get_xxx() 中，
+第一次呼叫時才建立並在程序內共用。langgraph.json 的 server 與 startup_report 都會 import 所有範例，
+import 時建立模型會讓每個範例多付出載入 SDK、建立 client 的時間；新增範例時請沿用這個寫法，
+冷啟動時間可用 utils/startup_report.py 檢查。
+LLMManager 是程序層級的 registry：相同設定的 get_llm 會回傳同一個模型實例，
+所有 openai / ollama 模型共用一組 keep-alive 連線池（同步與非同步），
+連線池大小可由設定檔的 pool 區塊或 LLM_POOL_* 環境變數設定，使用狀況見 LLMManager.stats()。
+
+後端的決定順序：
+1. get_llm 的 backend 參數
+2. 環境變數 LLM_BACKEND（例如 LLM_BACKEND=fake 即可離線執行任何範例）
+3. 設定檔中該名稱的 provider（設定檔路徑為 LLM_CONFIG_PATH，預設為專案根目錄的 config.yaml）
+4. 環境變數 LLM_PROVIDER，預設為 openai
+
+設定 LLM_CASSETTE_DIR（以及 LLM_CASSETTE_MODE=record/replay）即可錄製或重播所有 LLM 呼叫，
+詳見 utils/llm_cassette.py。
+
+回應快取（utils/llm_cache.py）由各 chain 以 get_llm(..., cache=True/False) 個別開啟或關閉，
+cache=None 時依環境變數 LLM_CACHE=1 決定。快取參數可由設定檔的 cache 區塊或
+LLM_CACHE_PATH / LLM_CACHE_MAX_BYTES / LLM_CACHE_TTL 設定。同時設定 cassette 時以 cassette 為準。
+
+設定檔範例：
+
+    llms:
+      chat:
+        provider: openai
+        model: gpt-4o-mini
+        temperature: 0
+        fake:            # 使用 fake 後端時的參數
+          latency: 0.2
+          rules:
+            - ["PM2.5", {"binary_score": "no"}]
+    pool:
+      max_connections: 100
+      max_keepalive_connections: 20
+      keepalive_expiry: 30
+    cache:
+      path: .cache/llm_cache.sqlite
+      max_bytes: 67108864
+      ttl: 86400
+"""
+
+import os
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple, Union
+
+from dotenv import load_dotenv
+from langchain_core.language_models.chat_models import BaseChatModel
+
+from utils.config_loader import load_yaml_config
+from utils.fake_llm import FakeChatModel
+from utils.llm_cassette import CassetteCache
+from utils.llm_cache import ResponseCache
+from utils.http_pool import SharedHTTPPool
+
+load_dotenv()
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "config.yaml")
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", ".cache", "llm_cache.sqlite")
+
+# FakeChatModel 可直接由 get_llm 的 kwargs 指定的參數
+FAKE_OPTIONS = ("responses", "rules", "responder", "latency", "stream_chunk_size", "stream_latency")
+
+# 同一目錄、同一模式共用一個 CassetteCache，讓各模組的統計彙整在一起
+_cassettes: Dict[Tuple[str, str], CassetteCache] = {}
+
+
+def get_cassette(cassette_dir: str, mode: str = "record") -> CassetteCache:
+    """
+    取得指定目錄與模式的 cassette（同一程序內共用；不同模式各自一個實例，不會改到其他模組正在使用的模式）
+
+    Args:
+        cassette_dir: 錄製檔目錄
+        mode: record 或 replay
+
+    Returns:
+        CassetteCache
+    """
+    key = (os.path.abspath(cassette_dir), mode)
+    if key not in _cassettes:
+        _cassettes[key] = CassetteCache(cassette_dir, mode=mode)
+    return _cassettes[key]
+
+
+_response_caches: Dict[str, ResponseCache] = {}
+
+
+def get_response_cache(
+    path: str = DEFAULT_CACHE_PATH,
+    max_bytes: int = 64 * 1024 * 1024,
+    ttl: Optional[float] = 24 * 3600,
+) -> ResponseCache:
+    """
+    取得指定路徑的回應快取（同一程序內共用）
+
+    Args:
+        path: SQLite 檔案路徑
+        max_bytes: 記憶體層的位元組上限
+        ttl: 存活時間（秒）
+
+    Returns:
+        ResponseCache
+    """
+    key = os.path.abspath(path)
+    if key not in _response_caches:
+        _response_caches[key] = ResponseCache(path, max_bytes=max_bytes, ttl=ttl)
+    return _response_caches[key]
+
+
+def _registry_key(*parts: Any) -> str:
+    # 設定中可能有 callable（例如 fake 的 responder），以物件 id 區分
+    return json.dumps(parts, sort_keys=True, default=lambda obj: f"{type(obj).__name__}:{id(obj)}")
+
+
+class LLMManager:
+    """
+    依名稱取得語言模型（程序層級共用）
+
+    各模組各自建立 LLMManager() 也沒關係，模型實例與連線池都存放在類別層級的 registry。
+
+    Args:
+        config_path: 設定檔路徑，未指定時使用 LLM_CONFIG_PATH 或預設路徑
+    """
+
+    _lock = threading.RLock()
+    _configs: Dict[str, Dict[str, Any]] = {}
+    _llms: Dict[str, BaseChatModel] = {}
+    _pools: Dict[str, SharedHTTPPool] = {}
+
+    def __init__(self, config_path: Optional[str] = None):
+        config_path = os.path.abspath(config_path or os.getenv("LLM_CONFIG_PATH", DEFAULT_CONFIG_PATH))
+        with self._lock:
+            if config_path not in self._configs:
+                self._configs[config_path] = load_yaml_config(config_path) if os.path.exists(config_path) else {}
+        self.config = self._configs[config_path]
+
+    def get_llm_config(self, name: str) -> Dict[str, Any]:
+        """
+        取得指定名稱的模型設定
+
+        Args:
+            name: 模型名稱，例如 "chat"
+
+        Returns:
+            模型設定字典（包含 provider 與 model）
+        """
+        config = dict((self.config.get("llms") or {}).get(name) or {})
+        config.setdefault("provider", os.getenv("LLM_PROVIDER", "openai"))
+        config.setdefault("model", os.getenv("LLM_MODEL", "gpt-4o-mini"))
+        return config
+
+    def get_llm(
+        self,
+        name: str = "chat",
+        backend: Optional[str] = None,
+        cassette: Optional[Union[str, CassetteCache]] = None,
+        cache: Optional[Union[bool, ResponseCache]] = None,
+        **kwargs: Any,
+    ) -> BaseChatModel:
+        """
+        取得語言模型
+
+        Args:
+            name: 模型名稱，例如 "chat"
+            backend: 指定後端（openai / ollama / fake），會覆蓋設定檔與環境變數
+            cassette: 錄製檔目錄或 CassetteCache，未指定時使用環境變數 LLM_CASSETTE_DIR
+            cache: 是否使用回應快取（True / False / ResponseCache），None 時依環境變數 LLM_CACHE
+            **kwargs: 覆蓋設定檔中的模型參數
+
+        Returns:
+            LangChain 聊天模型
+        """
+        config = self.get_llm_config(name)
+        config.update(kwargs)
+        provider = config.pop("provider")
+        provider = backend or os.getenv("LLM_BACKEND") or provider
+        fake_config = config.pop("fake", None) or {}
+
+        cassette = cassette or os.getenv("LLM_CASSETTE_DIR")
+        if isinstance(cassette, str):
+            cassette = get_cassette(cassette, mode=os.getenv("LLM_CASSETTE_MODE", "record"))
+        if cassette:
+            # 錄製 / 重播時以 cassette 為準
+            cache = cassette
+        else:
+            if cache is None:
+                cache = os.getenv("LLM_CACHE", "0").lower() in ("1", "true", "yes")
+            if cache is True:
+                cache = self.get_response_cache()
+
+        key = _registry_key(name, provider, config, fake_config, id(cache) if cache else None)
+        with self._lock:
+            if key not in self._llms:
+                llm = self._create_llm(provider, config, fake_config)
+                if cache:
+                    llm.cache = cache
+                if cassette:
+                    # stream 不經過 cache，錄製 / 重播時改走 invoke
+                    llm.disable_streaming = True
+                self._llms[key] = llm
+            return self._llms[key]
+
+    def get_pool(self, name: str = "default") -> SharedHTTPPool:
+        """
+        取得共用的 HTTP 連線池
+
+        Args:
+            name: 連線池名稱，模型設定中可用 pool: <name> 指定
+
+        Returns:
+            SharedHTTPPool
+        """
+        with self._lock:
+            if name not in self._pools:
+                config = self.config.get("pool") or {}
+                self._pools[name] = SharedHTTPPool(
+                    max_connections=int(os.getenv("LLM_POOL_MAX_CONNECTIONS", config.get("max_connections", 100))),
+                    max_keepalive_connections=int(
+                        os.getenv("LLM_POOL_MAX_KEEPALIVE", config.get("max_keepalive_connections", 20))
+                    ),
+                    keepalive_expiry=float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", config.get("keepalive_expiry", 30))),
+                )
+            return self._pools[name]
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """
+        取得 registry 與連線池使用狀況
+
+        Returns:
+            共用模型數量與各連線池的使用中、閒置連線數
+        """
+        with cls._lock:
+            return {
+                "llms": len(cls._llms),
+                "pools": {name: pool.stats() for name, pool in cls._pools.items()},
+            }
+
+    def get_response_cache(self) -> ResponseCache:
+        """
+        依設定檔與環境變數取得共用的回應快取
+
+        Returns:
+            ResponseCache
+        """
+        config = self.config.get("cache") or {}
+        ttl = os.getenv("LLM_CACHE_TTL", config.get("ttl", 24 * 3600))
+        return get_response_cache(
+            path=os.getenv("LLM_CACHE_PATH", config.get("path", DEFAULT_CACHE_PATH)),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", config.get("max_bytes", 64 * 1024 * 1024))),
+            ttl=float(ttl) if ttl is not None else None,
+        )
+
+    def _create_llm(self, provider: str, config: Dict[str, Any], fake_config: Dict[str, Any]) -> BaseChatModel:
+        if provider == "fake":
+            return self._create_fake(config, fake_config)
+        pool = self.get_pool(config.pop("pool", "default"))
+        if provider == "openai":
+            from langchain_openai import ChatOpenAI
+            return ChatOpenAI(http_client=pool.client, http_async_client=pool.async_client, **config)
+        if provider == "ollama":
+            from langchain_ollama import ChatOllama
+            return ChatOllama(
+                sync_client_kwargs={"transport": pool.transport},
+                async_client_kwargs={"transport": pool.async_transport},
+                **config,
+            )
+        raise ValueError(f"不支援的 LLM provider: {provider}")
+
+    def _create_fake(self, config: Dict[str, Any], fake_config: Dict[str, Any]) -> FakeChatModel:
+        # fake 後端不需要連線池
+        options = dict(fake_config)
+        options.update({key: config[key] for key in FAKE_OPTIONS if key in config})
+        options.setdefault("latency", float(os.getenv("LLM_FAKE_LATENCY", "0")))
+        options.setdefault("model_name", f"fake-{config['model']}")
+        return FakeChatModel(**options)
@@ -0,0 +1,70 @@
+"""
+文章的本地檢查
+
+字數與語言（繁體 / 簡體 / 英文）可以在本地以微秒等級算出，不需要交給 LLM 判斷。
+回傳值沿用 grader 的 'yes' / 'no' 格式，方便與 TaiwanArticlePostabilityGrader 合併。
+"""
+
+import re
+from typing import Dict
+
+MIN_CHARACTERS = 300
+
+# 常見的繁簡對照字，只收錄兩邊寫法不同的字
+_TRADITIONAL_SIMPLIFIED_PAIRS = (
+    "這这 們们 來来 個个 國国 說说 時时 會会 為为 對对 發发 後后 經经 動动 進进 開开 "
+    "隊队 員员 場场 軍军 戰战 轉转 聯联 賽赛 門门 問问 東东 長长 與与 還还 沒没 現现 "
+    "實实 學学 業业 關关 應应 機机 間间 電电 體体 頭头 報报 總总 讓让 從从 達达 選选 "
+    "運运 過过 樂乐 歡欢 籃篮 練练 擊击 壘垒 盜盗 勝胜 負负 贏赢 輸输 熱热 隨随 "
+    "傳传 網网 氣气 設设 計计 處处 區区 參参 寫写 價价 錢钱 買买 賣卖 聽听 見见 覺觉 "
+    "認认 識识 詩诗 語语 話话 讀读 邊边 親亲 愛爱 當当 變变 點点 醫医 藥药 標标 "
+    "記记 憶忆 錄录 節节 團团 術术 際际 題题 議议 論论 紀纪 舉举 辦办 數数 萬万 億亿 獅狮 灣湾"
+)
+TRADITIONAL_ONLY = frozenset(pair[0] for pair in _TRADITIONAL_SIMPLIFIED_PAIRS.split())
+SIMPLIFIED_ONLY = frozenset(pair[1] for pair in _TRADITIONAL_SIMPLIFIED_PAIRS.split())
+
+_HAN = re.compile(r"[一-鿿㐀-䶿]")
+_LATIN = re.compile(r"[A-Za-z]")
+
+
+def count_characters(text: str) -> int:
+    """計算不含空白的字元數"""
+    return sum(1 for char in text if not char.isspace())
+
+
+def detect_script(text: str) -> str:
+    """
+    判斷文章的主要文字
+
+    Args:
+        text: 文章內容
+
+    Returns:
+        "traditional"、"simplified"、"english" 或 "unknown"
+    """
+    han = len(_HAN.findall(text))
+    latin = len(_LATIN.findall(text))
+    if han == 0 and latin == 0:
+        return "unknown"
+    # 英文以字母計，一個英文字約 5 個字母，換算成「字」再和漢字比較
+    if han < latin / 5:
+        return "english"
+    traditional = sum(1 for char in text if char in TRADITIONAL_ONLY)
+    simplified = sum(1 for char in text if char in SIMPLIFIED_ONLY)
+    return "simplified" if simplified > traditional else "traditional"
+
+
+def precheck_article(text: str) -> Dict[str, str]:
+    """
+    計算可以在本地決定的評分欄位
+
+    Args:
+        text: 文章內容
+
+    Returns:
+        meets_word_count 與 is_language_traditional_chinese（'yes' / 'no'）
+    """
+    return {
+        "meets_word_count": "yes" if count_characters(text) >= MIN_CHARACTERS else "no",
+        "is_language_traditional_chinese": "yes" if detect_script(text) == "traditional" else "no",
+    }
@@ -0,0 +1,216 @@
+"""
+有上限的記憶體 checkpointer
+
+MemorySaver 會保留所有 thread 直到程序結束。BoundedMemorySaver 可以直接取代 MemorySaver，
+並在超過上限時移出最久沒有使用的 thread（LRU）：
+- max_threads：記憶體中最多保留的 thread 數
+- max_bytes：所有 thread 序列化後的總位元組數上限
+- idle_ttl：thread 閒置超過此秒數就移出
+
+設定 spill_dir 時，移出的 thread 會寫到磁碟，下次同一個 thread_id 被讀寫時再自動載回；
+沒有設定時直接丟棄（與重啟後的 MemorySaver 相同，該 thread 從頭開始）。
+stats() 提供 evictions / expired / spills / reloads 計數。
+
+注意：list(None) 只會列出目前在記憶體中的 thread。
+
+    memory = BoundedMemorySaver(max_threads=1000, idle_ttl=3600, spill_dir=".cache/threads")
+    graph = build_graph(checkpointer=memory)
+"""
+
+import os
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Sequence, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import InMemorySaver
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    以 LRU / TTL 移出閒置 thread 的 MemorySaver
+
+    Args:
+        max_threads: 記憶體中最多保留的 thread 數，None 表示不限制
+        max_bytes: 記憶體中所有 thread 的位元組數上限，None 表示不限制
+        idle_ttl: thread 閒置多少秒後移出，None 表示不限制
+        spill_dir: 移出的 thread 寫入的目錄，None 表示直接丟棄
+        **kwargs: InMemorySaver 的其他參數（例如 serde）
+    """
+
+    def __init__(
+        self,
+        max_threads: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        spill_dir: Optional[str] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._last_access: "OrderedDict[str, float]" = OrderedDict()  # 依使用時間排序，最舊的在前
+        self._thread_bytes: Dict[str, int] = {}
+        self._thread_writes: Dict[str, Set[Tuple]] = {}
+        self._thread_blobs: Dict[str, Set[Tuple]] = {}
+        self.total_bytes = 0
+        self.counters = {"evictions": 0, "expired": 0, "spills": 0, "reloads": 0}
+
+    # --- 使用紀錄與移出 ---
+
+    def _spill_path(self, thread_id: str) -> str:
+        name = hashlib.sha1(str(thread_id).encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, f"{name}.pkl")
+
+    def _touch(self, thread_id: str) -> None:
+        """記錄 thread 被使用；已移到磁碟的 thread 先載回"""
+        if thread_id not in self._last_access and self.spill_dir and os.path.exists(self._spill_path(thread_id)):
+            self._reload(thread_id)
+        self._last_access[thread_id] = time.monotonic()
+        self._last_access.move_to_end(thread_id)
+
+    def _add_bytes(self, thread_id: str, size: int) -> None:
+        self._thread_bytes[thread_id] = self._thread_bytes.get(thread_id, 0) + size
+        self.total_bytes += size
+
+    def _enforce_limits(self, current: str) -> None:
+        """移出過期與超過上限的 thread（不會移出正在使用的 thread）"""
+        now = time.monotonic()
+        while self._last_access:
+            thread_id, last_access = next(iter(self._last_access.items()))
+            if thread_id == current:
+                break
+            if self.idle_ttl is not None and now - last_access > self.idle_ttl:
+                self.counters["expired"] += 1
+            elif not (
+                (self.max_threads is not None and len(self._last_access) > self.max_threads)
+                or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+            ):
+                break
+            self._evict(thread_id)
+
+    def _evict(self, thread_id: str) -> None:
+        writes_keys = self._thread_writes.pop(thread_id, set())
+        blob_keys = self._thread_blobs.pop(thread_id, set())
+        data = {
+            "storage": dict(self.storage.pop(thread_id, {})),
+            "writes": {key: self.writes.pop(key) for key in writes_keys if key in self.writes},
+            "blobs": {key: self.blobs.pop(key) for key in blob_keys if key in self.blobs},
+            "bytes": self._thread_bytes.pop(thread_id, 0),
+        }
+        self.total_bytes -= data["bytes"]
+        del self._last_access[thread_id]
+        self.counters["evictions"] += 1
+        if self.spill_dir:
+            path = self._spill_path(thread_id)
+            with open(path + ".tmp", "wb") as file:
+                pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + ".tmp", path)
+            self.counters["spills"] += 1
+
+    def _reload(self, thread_id: str) -> None:
+        path = self._spill_path(thread_id)
+        with open(path, "rb") as file:
+            data = pickle.load(file)
+        os.remove(path)
+        self.storage[thread_id].update(data["storage"])
+        self.writes.update(data["writes"])
+        self.blobs.update(data["blobs"])
+        self._thread_writes[thread_id] = set(data["writes"])
+        self._thread_blobs[thread_id] = set(data["blobs"])
+        self._add_bytes(thread_id, data["bytes"])
+        self.counters["reloads"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        取得目前用量與移出計數
+
+        Returns:
+            記憶體中的 thread 數、位元組數，以及 evictions（含 expired）/ expired / spills / reloads
+        """
+        with self._lock:
+            return {"threads": len(self._last_access), "bytes": self.total_bytes, **self.counters}
+
+    # --- MemorySaver 介面 ---
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            self._touch(thread_id)
+            result = super().get_tuple(config)
+            self._enforce_limits(thread_id)
+            return result
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        with self._lock:
+            if config:
+                self._touch(config["configurable"]["thread_id"])
+            items = list(super().list(config, filter=filter, before=before, limit=limit))
+        yield from items
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            self._touch(thread_id)
+            result = super().put(config, checkpoint, metadata, new_versions)
+            saved_checkpoint, saved_metadata, _ = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            size = len(saved_checkpoint[1]) + len(saved_metadata[1])
+            blob_keys = self._thread_blobs.setdefault(thread_id, set())
+            for channel, version in new_versions.items():
+                key = (thread_id, checkpoint_ns, channel, version)
+                blob_keys.add(key)
+                size += len(self.blobs[key][1])
+            self._add_bytes(thread_id, size)
+            self._enforce_limits(thread_id)
+            return result
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        key = (thread_id, config["configurable"].get("checkpoint_ns", ""), config["configurable"]["checkpoint_id"])
+        with self._lock:
+            self._touch(thread_id)
+            before = sum(len(value[2][1]) for value in self.writes.get(key, {}).values())
+            super().put_writes(config, writes, task_id, task_path)
+            after = sum(len(value[2][1]) for value in self.writes.get(key, {}).values())
+            self._thread_writes.setdefault(thread_id, set()).add(key)
+            self._add_bytes(thread_id, after - before)
+            self._enforce_limits(thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            super().delete_thread(thread_id)
+            self.total_bytes -= self._thread_bytes.pop(thread_id, 0)
+            self._thread_writes.pop(thread_id, None)
+            self._thread_blobs.pop(thread_id, None)
+            self._last_access.pop(thread_id, None)
+            if self.spill_dir and os.path.exists(self._spill_path(thread_id)):
+                os.remove(self._spill_path(thread_id))
@@ -0,0 +1,118 @@
+"""
+比較各 checkpointer 在長對話下的寫入量與讀取延遲
+
+以一個每輪新增一則使用者訊息與一則回覆的 MessagesState graph（不呼叫 LLM）模擬多輪對話：
+- bytes：整個 thread 累計寫入的位元組數（checkpoint + metadata + pending writes）
+- write_s：跑完所有輪數的時間
+- read_ms：讀取最新 checkpoint 的中位數延遲（delta 為清除快取後的冷讀取，需要從快照套用差異）
+
+    python src/utils/checkpoint_benchmark.py --turns 10 100 1000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import MessagesState, StateGraph, START, END
+
+from utils.sqlite_checkpointer import SqliteCheckpointSaver
+from utils.delta_checkpointer import DeltaCheckpointSaver
+
+REPLY = "今天台北天氣晴朗，氣溫約 28 度，適合到戶外走走。"
+
+
+def _reply(state: MessagesState) -> Dict[str, Any]:
+    return {"messages": [AIMessage(content=f"{REPLY}（第 {len(state['messages']) // 2 + 1} 輪）")]}
+
+
+def build_chat_graph(checkpointer):
+    workflow = StateGraph(MessagesState)
+    workflow.add_node("reply", _reply)
+    workflow.add_edge(START, "reply")
+    workflow.add_edge("reply", END)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def memory_saver_bytes(saver: MemorySaver) -> int:
+    """計算 MemorySaver 中所有序列化資料的位元組數"""
+    total = 0
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                total += len(checkpoint[1]) + len(metadata[1])
+    total += sum(len(value[1]) for value in saver.blobs.values())
+    for writes in saver.writes.values():
+        total += sum(len(value[1]) for _, _, value, _ in writes.values())
+    return total
+
+
+def run(name: str, turns: int, directory: str, snapshot_every: int, reads: int = 20) -> Dict[str, Any]:
+    """
+    以指定的 checkpointer 跑一個多輪對話 thread
+
+    Args:
+        name: memory / sqlite / delta
+        turns: 對話輪數
+        directory: SQLite 檔案目錄
+        snapshot_every: delta 的完整快照間隔
+        reads: 讀取延遲的量測次數
+
+    Returns:
+        bytes / write_s / read_ms
+    """
+    path = os.path.join(directory, f"{name}-{turns}.sqlite")
+    if name == "memory":
+        saver = MemorySaver()
+    elif name == "sqlite":
+        saver = SqliteCheckpointSaver(path)
+    else:
+        saver = DeltaCheckpointSaver(path, snapshot_every=snapshot_every)
+
+    graph = build_chat_graph(saver)
+    config = {"configurable": {"thread_id": "benchmark"}}
+    start = time.perf_counter()
+    for turn in range(turns):
+        graph.invoke({"messages": [HumanMessage(content=f"第 {turn + 1} 個問題：今天天氣如何？")]}, config)
+    write_s = time.perf_counter() - start
+
+    latencies: List[float] = []
+    for _ in range(reads):
+        if isinstance(saver, DeltaCheckpointSaver):
+            saver.clear_cache()
+        start = time.perf_counter()
+        checkpoint = saver.get_tuple(config)
+        latencies.append((time.perf_counter() - start) * 1000)
+    assert len(checkpoint.checkpoint["channel_values"]["messages"]) == turns * 2
+
+    size = memory_saver_bytes(saver) if name == "memory" else saver.stats()["bytes_written"]
+    if name != "memory":
+        saver.close()
+    return {"bytes": size, "write_s": write_s, "read_ms": statistics.median(latencies)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="比較 checkpointer 的寫入量與讀取延遲")
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--savers", nargs="+", default=["memory", "sqlite", "delta"])
+    parser.add_argument("--snapshot-every", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'turns':>6} {'saver':<8} {'bytes':>14} {'write_s':>9} {'read_ms':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for turns in args.turns:
+            for name in args.savers:
+                result = run(name, turns, directory, args.snapshot_every)
+                print(f"{turns:>6} {name:<8} {result['bytes']:>14,} {result['write_s']:>9.2f} {result['read_ms']:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
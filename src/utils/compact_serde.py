@@ -0,0 +1,200 @@
+"""
+精簡的 checkpoint 序列化器
+
+LangGraph 預設的 JsonPlusSerializer 已經使用 msgpack，但每個 pydantic 物件（包含每則訊息）都會：
+- 寫入完整的模組與類別名稱（例如 "langchain_core.messages.ai", "AIMessage"）
+- 以 model_dump() 寫入所有欄位，包含空的 additional_kwargs / response_metadata / tool_calls 等預設值
+- 讀取時以 cls(**kwargs) 重新驗證一次
+
+CompactSerializer 改為：
+- 訊息類別以 1 byte 的代碼表示，其他 pydantic 模型以類別名稱（有註冊時）或模組路徑表示
+- 只寫入與預設值不同的欄位，直接取 __dict__，不經過 model_dump()
+- 讀取時以 cls(**kwargs) 建立物件（只有寫入的欄位需要驗證），與目前版本的類別不相容時改用 model_construct()
+其餘型別（datetime、dataclass、Send 等）沿用 JsonPlusSerializer 的處理。
+讀取時仍可解析預設序列化器寫入的資料，既有的 checkpoint 不需要轉換。
+
+任何接受 checkpointer 的 graph 都可以使用：
+
+    memory = MemorySaver(serde=CompactSerializer(models=[RequiredInformation]))
+    graph = build_graph(checkpointer=memory)
+
+或設定環境變數 CHECKPOINT_SERDE=compact，使用 get_serde() 的範例會自動切換。
+與預設序列化器的大小與速度比較：python src/utils/serde_benchmark.py
+"""
+
+import os
+import importlib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Tuple, Type
+
+import ormsgpack
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    ChatMessage,
+    FunctionMessage,
+    HumanMessage,
+    HumanMessageChunk,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+    ToolMessageChunk,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer, _msgpack_default, _msgpack_ext_hook
+
+TYPE_TAG = "compact-msgpack"
+
+EXT_MESSAGE = 32  # 內建訊息類別：(代碼, 欄位)
+EXT_MODEL = 33  # 其他 pydantic 模型：(類別名稱或 "模組:類別", 欄位)
+
+# 代碼即索引，只能在尾端新增，不能調整順序
+MESSAGE_TYPES: Tuple[Type[BaseModel], ...] = (
+    HumanMessage,
+    AIMessage,
+    SystemMessage,
+    ToolMessage,
+    FunctionMessage,
+    ChatMessage,
+    RemoveMessage,
+    AIMessageChunk,
+    HumanMessageChunk,
+    ToolMessageChunk,
+)
+_MESSAGE_CODES = {cls: code for code, cls in enumerate(MESSAGE_TYPES)}
+
+_OPTION = (
+    ormsgpack.OPT_NON_STR_KEYS
+    | ormsgpack.OPT_PASSTHROUGH_DATACLASS
+    | ormsgpack.OPT_PASSTHROUGH_DATETIME
+    | ormsgpack.OPT_PASSTHROUGH_ENUM
+    | ormsgpack.OPT_PASSTHROUGH_UUID
+)
+
+
+@lru_cache(maxsize=None)
+def _field_defaults(cls: Type[BaseModel]) -> Dict[str, Any]:
+    """取得模型欄位的預設值（default_factory 只呼叫一次用來比較）"""
+    defaults = {}
+    for name, field in cls.model_fields.items():
+        if field.default is not PydanticUndefined:
+            defaults[name] = field.default
+        elif field.default_factory is not None:
+            try:
+                defaults[name] = field.default_factory()
+            except TypeError:
+                continue  # 需要其他欄位值的 default_factory，一律寫入
+    return defaults
+
+
+def _model_fields(obj: BaseModel) -> Dict[str, Any]:
+    """只保留與預設值不同的欄位"""
+    defaults = _field_defaults(type(obj))
+    fields = {
+        key: value
+        for key, value in obj.__dict__.items()
+        if key not in defaults or value is not defaults[key] and value != defaults[key]
+    }
+    if obj.__pydantic_extra__:
+        fields.update(obj.__pydantic_extra__)
+    return fields
+
+
+def _construct_model(cls: Type[BaseModel], fields: Dict[str, Any]) -> BaseModel:
+    """
+    以讀取到的欄位建立 pydantic 物件
+
+    只使用公開的建構方式：一般的建構子由 pydantic-core 驗證，比純 Python 的 model_construct() 快；
+    欄位與目前版本的類別不相容（例如升級後欄位限制改變）時才改用 model_construct() 不經驗證建立。
+    """
+    try:
+        return cls(**fields)
+    except Exception:
+        return cls.model_construct(**fields)
+
+
+class CompactSerializer(JsonPlusSerializer):
+    """
+    以精簡 msgpack 格式序列化訊息與 pydantic 模型
+
+    Args:
+        models: 要註冊的 pydantic 模型（例如 RequiredInformation、Plan、Act），
+            以類別名稱取代完整模組路徑；名稱在註冊的模型之間必須唯一
+        **kwargs: JsonPlusSerializer 的其他參數
+    """
+
+    def __init__(self, models: Iterable[Type[BaseModel]] = (), **kwargs: Any):
+        super().__init__(**kwargs)
+        self._models: Dict[str, Type[BaseModel]] = {}
+        for cls in models:
+            if self._models.setdefault(cls.__name__, cls) is not cls:
+                raise ValueError(f"模型名稱重複：{cls.__name__}")
+
+    def _default(self, obj: Any) -> Any:
+        if isinstance(obj, BaseModel):
+            cls = type(obj)
+            code = _MESSAGE_CODES.get(cls)
+            if code is not None:
+                return ormsgpack.Ext(EXT_MESSAGE, self._pack((code, _model_fields(obj))))
+            name = cls.__name__ if self._models.get(cls.__name__) is cls else f"{cls.__module__}:{cls.__qualname__}"
+            return ormsgpack.Ext(EXT_MODEL, self._pack((name, _model_fields(obj))))
+        return _msgpack_default(obj)
+
+    def _ext_hook(self, code: int, data: bytes) -> Any:
+        if code == EXT_MESSAGE:
+            type_code, fields = self._unpack(data)
+            return _construct_model(MESSAGE_TYPES[type_code], fields)
+        if code == EXT_MODEL:
+            name, fields = self._unpack(data)
+            return _construct_model(self._models.get(name) or self._import(name), fields)
+        return _msgpack_ext_hook(code, data)
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _import(name: str) -> Type[BaseModel]:
+        module, _, qualname = name.partition(":")
+        cls: Any = importlib.import_module(module)
+        for part in qualname.split("."):
+            cls = getattr(cls, part)
+        if not (isinstance(cls, type) and issubclass(cls, BaseModel)):
+            raise TypeError(f"{name} 不是 pydantic 模型")
+        return cls
+
+    def _pack(self, obj: Any) -> bytes:
+        return ormsgpack.packb(obj, default=self._default, option=_OPTION)
+
+    def _unpack(self, data: bytes) -> Any:
+        return ormsgpack.unpackb(data, ext_hook=self._ext_hook, option=ormsgpack.OPT_NON_STR_KEYS)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if obj is None or isinstance(obj, (bytes, bytearray)):
+            return super().dumps_typed(obj)
+        try:
+            return TYPE_TAG, self._pack(obj)
+        except ormsgpack.MsgpackEncodeError:
+            return super().dumps_typed(obj)  # 例如非 UTF-8 字串，交給預設序列化器改用 json / pickle
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        if data[0] == TYPE_TAG:
+            return self._unpack(data[1])
+        return super().loads_typed(data)
+
+
+@lru_cache(maxsize=None)
+def get_serde(models: Tuple[Type[BaseModel], ...] = ()) -> Optional[JsonPlusSerializer]:
+    """
+    依環境變數 CHECKPOINT_SERDE 取得 checkpointer 使用的序列化器
+
+    Args:
+        models: 使用 compact 時要註冊的 pydantic 模型
+
+    Returns:
+        compact 時為 CompactSerializer；default（預設）時為 None，即 LangGraph 的預設序列化器
+    """
+    name = os.getenv("CHECKPOINT_SERDE", "default").lower()
+    if name == "compact":
+        return CompactSerializer(models=models)
+    if name != "default":
+        raise ValueError(f"不支援的 CHECKPOINT_SERDE：{name}（可用 default / compact）")
+    return None
@@ -0,0 +1,153 @@
+"""
+共用的 HTTP 連線池
+
+同一程序內所有 LLM client 共用一組 keep-alive 連線池（同步與非同步各一），
+避免每個模組各自建立 client、重複 TLS 握手與 socket 反覆開關。
+
+非同步連線綁定建立它的 event loop，每次 asyncio.run 都是新的 loop（例如 batch_articles），
+因此非同步連線池依 event loop 各自建立：同一個 loop 內共用，loop 結束後不會再被使用。
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+
+
+def _pool_occupancy(transport: Any) -> Optional[Dict[str, int]]:
+    """讀取 httpcore 連線池目前的連線狀態（httpx 沒有公開這些資訊，讀不到時回傳 None）"""
+    pool = getattr(transport, "_pool", None)
+    try:
+        connections = list(pool.connections)
+        idle = sum(1 for connection in connections if connection.is_idle())
+    except (AttributeError, TypeError):
+        return None
+    return {
+        "connections": len(connections),
+        "active": len(connections) - idle,
+        "idle": idle,
+        "queued_requests": len(getattr(pool, "_requests", [])),
+    }
+
+
+class LoopLocalAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    依目前的 event loop 分派到各自連線池的非同步 transport
+
+    同一個 AsyncClient 可以在不同的 event loop 中使用，每個 loop 第一次送出請求時才建立連線池；
+    已關閉的 loop 的連線池在下次取用時丟棄。
+
+    Args:
+        limits: 每個連線池的連線上限
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = weakref.WeakKeyDictionary()
+
+    def _current(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for closed in [other for other in self._transports if other.is_closed()]:
+                del self._transports[closed]
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = self._transports[loop] = httpx.AsyncHTTPTransport(limits=self.limits)
+            return transport
+
+    def transports(self) -> Dict[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]:
+        """目前仍在使用的 event loop 與其連線池"""
+        with self._lock:
+            return {loop: transport for loop, transport in self._transports.items() if not loop.is_closed()}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._current().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        """關閉目前 event loop 的連線池"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.pop(loop, None)
+        if transport is not None:
+            await transport.aclose()
+
+
+class SharedHTTPPool:
+    """
+    同步 / 非同步共用的 keep-alive 連線池
+
+    Args:
+        max_connections: 最大連線數
+        max_keepalive_connections: 最大閒置保留連線數
+        keepalive_expiry: 閒置連線保留時間（秒）
+        timeout: 預設請求逾時（秒）
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: Optional[float] = 60.0,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self.transport = httpx.HTTPTransport(limits=self.limits)
+        self.async_transport = LoopLocalAsyncTransport(self.limits)
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.Client:
+        """共用的同步 httpx client"""
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(transport=self.transport, timeout=self.timeout, follow_redirects=True)
+            return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """共用的非同步 httpx client（可在不同的 event loop 中使用，連線池依 loop 分開）"""
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = httpx.AsyncClient(
+                    transport=self.async_transport, timeout=self.timeout, follow_redirects=True
+                )
+            return self._async_client
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得連線池使用狀況
+
+        Returns:
+            連線上限與同步 / 非同步連線池的使用中、閒置連線數（非同步為各 event loop 的合計，讀不到時為 None）
+        """
+        async_pools = [_pool_occupancy(transport) for transport in self.async_transport.transports().values()]
+        async_stats = None
+        if None not in async_pools:
+            async_stats = {"event_loops": len(async_pools)}
+            for key in ("connections", "active", "idle", "queued_requests"):
+                async_stats[key] = sum(pool[key] for pool in async_pools)
+        return {
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "sync": _pool_occupancy(self.transport),
+            "async": async_stats,
+        }
+
+    def close(self) -> None:
+        """關閉同步連線池（非同步連線池需在 event loop 中以 aclose 關閉）"""
+        self.transport.close()
+
+    async def aclose(self) -> None:
+        """關閉目前 event loop 的非同步連線池"""
+        await self.async_transport.aclose()
@@ -0,0 +1,144 @@
+"""
+增量的上下文視窗修剪
+
+trim_messages(strategy="last") 每輪都從完整的歷史重新計算視窗，對話越長每輪花的時間越多。
+IncrementalTrimmer 把修剪狀態存在 graph state 中，每輪只計算新增的訊息：
+- window_start：目前視窗的起點（訊息索引）
+- token_prefix：從 window_start 開始的 token 數前綴和，token_prefix[i] 為 messages[window_start:window_start + i] 的 token 數
+- counted_id：已計入的最後一則訊息 id，用來找出新增的訊息
+
+在訊息只會增加的情況下視窗起點只會往後移，每輪只需要計算新訊息並把起點往後推。
+前綴和只保留視窗內的部分，state 的大小與視窗長度有關，與對話長度無關。
+訊息被從前面移除時（例如 utils/tiered_messages.py 的 archive_messages）只需平移索引；
+找不到 counted_id（訊息被改寫）時才重新計算。
+
+規則與 trim_messages(strategy="last", include_system=..., start_on=..., allow_partial=False) 相同，
+差別是：
+- 視窗內完全沒有 start_on 類型的訊息時，會從最後一則該類型的訊息開始（即使超過上限），
+  避免送給模型的內容只剩系統訊息
+- 保證 token_counter(系統訊息 + 視窗) <= max_tokens；trim_messages 保留系統訊息時會把整體開銷算兩次，
+  視窗可能比這裡少一則
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from langchain_core.messages import BaseMessage, SystemMessage
+
+from utils.token_counter import REPLY_OVERHEAD, get_token_counter
+
+TrimState = Dict[str, Any]
+
+
+class IncrementalTrimmer:
+    """
+    以 graph state 保存前綴和的訊息修剪器
+
+    Args:
+        max_tokens: 視窗的 token 上限（與 token_counter(視窗訊息) 比較）
+        token_counter: 計算單則訊息 token 數的函數，預設為 utils/token_counter.py 的 TokenCounter.count_message
+        include_system: 是否固定保留開頭的 SystemMessage
+        start_on: 視窗第一則（系統訊息之後）訊息的類型，例如 "human"；None 表示不限制
+        overhead: 整個視窗固定加上的 token 數，預設與 TokenCounter 的回覆開銷相同
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        token_counter: Optional[Callable[[BaseMessage], int]] = None,
+        include_system: bool = True,
+        start_on: Union[str, Sequence[str], None] = "human",
+        overhead: int = REPLY_OVERHEAD,
+    ):
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter or get_token_counter().count_message
+        self.include_system = include_system
+        self.start_on = (start_on,) if isinstance(start_on, str) else tuple(start_on or ())
+        self.overhead = overhead
+
+    def _pinned(self, messages: Sequence[BaseMessage]) -> int:
+        return 1 if self.include_system and messages and isinstance(messages[0], SystemMessage) else 0
+
+    def _restore(self, messages: Sequence[BaseMessage], state: TrimState, pinned: int) -> Tuple[int, List[int]]:
+        """從 state 還原 (window_start, token_prefix)，處理訊息從前面被移除的情況"""
+        start, prefix, counted_id = state.get("window_start"), state.get("token_prefix"), state.get("counted_id")
+        if start is None or not prefix or counted_id is None:
+            return pinned, [0]
+        counted = start + len(prefix) - 1
+        # 已計入的最後一則訊息通常就在尾端附近，從後往前找
+        for position in range(len(messages) - 1, pinned - 1, -1):
+            if messages[position].id == counted_id:
+                break
+        else:
+            return pinned, [0]  # 訊息被改寫，重新計算
+        start -= counted - (position + 1)
+        if start < pinned:
+            cut = pinned - start
+            prefix = [value - prefix[cut] for value in prefix[cut:]]
+            start = pinned
+        return start, list(prefix)
+
+    def update(self, messages: Sequence[BaseMessage], state: TrimState) -> TrimState:
+        """
+        計算新增訊息的 token 數並推進視窗起點
+
+        Args:
+            messages: 目前 state 中的所有訊息
+            state: 上一輪的修剪狀態（window_start / token_prefix / counted_id）
+
+        Returns:
+            新的修剪狀態，作為節點回傳的 state 更新
+        """
+        pinned = self._pinned(messages)
+        start, prefix = self._restore(messages, state, pinned)
+        for message in messages[start + len(prefix) - 1:]:
+            prefix.append(prefix[-1] + self.token_counter(message))
+
+        budget = self.max_tokens - self.overhead - sum(self.token_counter(message) for message in messages[:pinned])
+        shift = 0
+        while shift < len(prefix) - 1 and prefix[-1] - prefix[shift] > budget:
+            shift += 1
+        if self.start_on:
+            last_match = None
+            for index in range(start + shift, len(messages)):
+                if messages[index].type in self.start_on:
+                    last_match = index
+                    break
+            if last_match is None:
+                # 視窗內沒有 start_on 類型的訊息，退回到最後一則該類型的訊息
+                last_match = next(
+                    (index for index in range(start + shift - 1, start - 1, -1) if messages[index].type in self.start_on),
+                    len(messages),
+                )
+            shift = last_match - start
+        if shift:
+            prefix = [value - prefix[shift] for value in prefix[shift:]]
+            start += shift
+
+        return {
+            "window_start": start,
+            "token_prefix": prefix,
+            "counted_id": messages[-1].id if messages else None,
+        }
+
+    def window(self, messages: Sequence[BaseMessage], state: TrimState) -> List[BaseMessage]:
+        """依修剪狀態取出要送給模型的訊息"""
+        return trimmed_window(messages, state, include_system=self.include_system)
+
+
+def trimmed_window(messages: Sequence[BaseMessage], state: TrimState, include_system: bool = True) -> List[BaseMessage]:
+    """
+    依修剪狀態取出要送給模型的訊息
+
+    Args:
+        messages: 目前 state 中的所有訊息
+        state: IncrementalTrimmer.update() 回傳並已寫入 state 的修剪狀態，沒有時回傳所有訊息
+        include_system: 是否保留開頭的 SystemMessage
+
+    Returns:
+        固定保留的系統訊息加上視窗內的訊息
+    """
+    start = state.get("window_start")
+    if start is None:
+        return list(messages)
+    pinned = 1 if include_system and messages and isinstance(messages[0], SystemMessage) else 0
+    return list(messages[:pinned]) + list(messages[start:])
@@ -0,0 +1,316 @@
+"""
+有索引的訊息列表
+
+filter_messages(include_names=..., include_types=..., exclude_ids=...) 每次都線性掃描整個訊息列表，
+對話越長越慢。IndexedMessages 是 list 的子類別，另外維護四個索引：
+- id → 位置
+- name → 訊息
+- type → 訊息（"human"、"ai"、"tool" ...）
+- tool_call_id → 發出 tool call 的 AIMessage 與對應的 ToolMessage
+filter() / get() / by_name() 等查詢只會碰到符合條件的訊息，時間與結果數量成正比
+（沒有任何 include_* 條件時才需要看過所有訊息）。
+
+IndexedMessages 仍然是 list，現有讀取 state["messages"] 的程式碼（迭代、索引、切片、
+trim_messages、add_messages）都不需要修改。作為 graph state 的欄位時使用 IndexedMessagesChannel：
+
+    class State(TypedDict):
+        messages: Annotated[IndexedMessages, IndexedMessagesChannel]
+
+    def node(state: State):
+        questions = state["messages"].filter(include_types=("human",), exclude_ids=("q1",))
+
+更新規則與 add_messages 相同（相同 id 取代、RemoveMessage 刪除、REMOVE_ALL_MESSAGES 清空、沒有 id 時補上 uuid）。
+每次更新會先複製索引再套用（與 add_messages 每次產生新列表相同），節點先前拿到的 state 不會被改動。
+checkpoint 中存的是一般的訊息列表，從 checkpoint 恢復時 channel 會重建索引。
+"""
+
+import uuid
+from typing import Annotated, Any, Dict, Iterable, List, Optional, Sequence, TypedDict, Union
+
+from langchain_core.messages import BaseMessage, RemoveMessage, convert_to_messages
+from langgraph.channels.binop import BinaryOperatorAggregate
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+MessageType = Union[str, type]
+
+
+def _type_name(message_type: MessageType) -> str:
+    # 接受 "human" 或 HumanMessage 這類訊息類別
+    if isinstance(message_type, type):
+        return message_type.model_fields["type"].default
+    return message_type
+
+
+def _tool_call_ids(message: BaseMessage) -> List[str]:
+    tool_call_id = getattr(message, "tool_call_id", None)
+    if tool_call_id:
+        return [tool_call_id]
+    return [call["id"] for call in getattr(message, "tool_calls", None) or () if call.get("id")]
+
+
+class IndexedMessages(list):
+    """
+    以 id、name、type、tool_call_id 建立索引的訊息列表
+
+    Args:
+        messages: 初始訊息（BaseMessage，或 convert_to_messages 接受的 tuple / dict / str）
+    """
+
+    def __init__(self, messages: Iterable[Any] = ()):
+        super().__init__()
+        self._positions: Dict[str, int] = {}
+        # 次要索引的值以 dict 當作有序集合（id → None），刪除訊息時不需要掃描
+        self._by_name: Dict[str, Dict[str, None]] = {}
+        self._by_type: Dict[str, Dict[str, None]] = {}
+        self._by_tool_call_id: Dict[str, Dict[str, None]] = {}
+        self.extend(messages)
+
+    # 索引維護
+    def _index(self, message: BaseMessage) -> None:
+        if message.name is not None:
+            self._by_name.setdefault(message.name, {})[message.id] = None
+        self._by_type.setdefault(message.type, {})[message.id] = None
+        for tool_call_id in _tool_call_ids(message):
+            self._by_tool_call_id.setdefault(tool_call_id, {})[message.id] = None
+
+    def _unindex(self, message: BaseMessage) -> None:
+        keys = [(self._by_type, message.type)] + [(self._by_tool_call_id, key) for key in _tool_call_ids(message)]
+        if message.name is not None:
+            keys.append((self._by_name, message.name))
+        for index, key in keys:
+            ids = index.get(key)
+            if ids is not None:
+                ids.pop(message.id, None)
+                if not ids:
+                    del index[key]
+
+    def _reindex(self) -> None:
+        messages = list(self)
+        super().clear()
+        self._positions.clear()
+        self._by_name.clear()
+        self._by_type.clear()
+        self._by_tool_call_id.clear()
+        self.extend(messages)
+
+    def _collect(self, ids: Iterable[str]) -> List[BaseMessage]:
+        # 依在列表中的位置排序，結果與線性掃描的順序相同
+        positions = sorted(self._positions[message_id] for message_id in ids)
+        return [self[position] for position in positions]
+
+    # 查詢
+    def get(self, message_id: str, default: Optional[BaseMessage] = None) -> Optional[BaseMessage]:
+        """依 id 取得訊息"""
+        position = self._positions.get(message_id)
+        return default if position is None else self[position]
+
+    def index_of(self, message_id: str) -> int:
+        """訊息在列表中的位置，不存在時引發 KeyError"""
+        return self._positions[message_id]
+
+    def by_name(self, name: str) -> List[BaseMessage]:
+        return self._collect(self._by_name.get(name, ()))
+
+    def by_type(self, message_type: MessageType) -> List[BaseMessage]:
+        return self._collect(self._by_type.get(_type_name(message_type), ()))
+
+    def by_tool_call_id(self, tool_call_id: str) -> List[BaseMessage]:
+        """發出此 tool call 的 AIMessage 與對應的 ToolMessage"""
+        return self._collect(self._by_tool_call_id.get(tool_call_id, ()))
+
+    def filter(
+        self,
+        *,
+        include_names: Optional[Sequence[str]] = None,
+        exclude_names: Optional[Sequence[str]] = None,
+        include_types: Optional[Sequence[MessageType]] = None,
+        exclude_types: Optional[Sequence[MessageType]] = None,
+        include_ids: Optional[Sequence[str]] = None,
+        exclude_ids: Optional[Sequence[str]] = None,
+    ) -> List[BaseMessage]:
+        """
+        以索引過濾訊息，結果與 filter_messages 相同
+
+        與 filter_messages 一樣，符合任一 include_* 條件（或沒有 include_* 條件）且不符合任何 exclude_* 條件的訊息會被保留。
+        訊息類別會以其 type 比對（不包含子類別）。
+
+        Returns:
+            符合條件的訊息，依原本的順序
+        """
+        if include_names or include_types or include_ids:
+            candidates: Dict[str, None] = {}
+            for name in include_names or ():
+                candidates.update(self._by_name.get(name, {}))
+            for message_type in include_types or ():
+                candidates.update(self._by_type.get(_type_name(message_type), {}))
+            for message_id in include_ids or ():
+                if message_id in self._positions:
+                    candidates[message_id] = None
+        else:
+            candidates = dict.fromkeys(self._positions)
+
+        excluded_names = set(exclude_names or ())
+        excluded_types = {_type_name(message_type) for message_type in exclude_types or ()}
+        excluded_ids = set(exclude_ids or ())
+        kept = []
+        for message_id in candidates:
+            if message_id in excluded_ids:
+                continue
+            message = self[self._positions[message_id]]
+            if message.type in excluded_types or (message.name is not None and message.name in excluded_names):
+                continue
+            kept.append(message_id)
+        return self._collect(kept)
+
+    # 更新
+    def append(self, message: Any) -> None:
+        """追加訊息；id 已存在時取代原本的訊息（與 add_messages 相同）"""
+        if not isinstance(message, BaseMessage):
+            (message,) = convert_to_messages([message])
+        if message.id is None:
+            message.id = str(uuid.uuid4())
+        position = self._positions.get(message.id)
+        if position is not None:
+            self._unindex(self[position])
+            super().__setitem__(position, message)
+        else:
+            self._positions[message.id] = len(self)
+            super().append(message)
+        self._index(message)
+
+    def extend(self, messages: Iterable[Any]) -> None:
+        for message in messages:
+            self.append(message)
+
+    def __iadd__(self, messages: Iterable[Any]) -> "IndexedMessages":
+        self.extend(messages)
+        return self
+
+    def remove_ids(self, message_ids: Iterable[str]) -> None:
+        """刪除訊息，id 不存在時引發 ValueError（與 add_messages 的 RemoveMessage 相同）"""
+        removed = set()
+        for message_id in message_ids:
+            if message_id not in self._positions:
+                raise ValueError(f"Attempting to delete a message with an ID that doesn't exist ('{message_id}')")
+            removed.add(message_id)
+        if not removed:
+            return
+        first = min(self._positions[message_id] for message_id in removed)
+        for message_id in removed:
+            self._unindex(self[self._positions.pop(message_id)])
+        # 只需要重算第一個被刪除的位置之後的索引
+        tail = [message for message in self[first:] if message.id not in removed]
+        super().__delitem__(slice(first, None))
+        for position, message in enumerate(tail, start=first):
+            self._positions[message.id] = position
+        super().extend(tail)
+
+    def apply(self, updates: Union[Any, Sequence[Any]]) -> None:
+        """
+        就地套用節點回傳的訊息更新（規則與 add_messages 相同）
+
+        Args:
+            updates: 單則訊息或訊息列表，可包含 RemoveMessage（id 為 REMOVE_ALL_MESSAGES 時清空）
+        """
+        if not isinstance(updates, list):
+            updates = [updates]
+        # 刪除集中在最後一次處理；同一批更新中之後又出現相同 id 的訊息時以該訊息取代（與 add_messages 相同）
+        pending_removals: Dict[str, None] = {}
+        for message in convert_to_messages(updates):
+            if isinstance(message, RemoveMessage):
+                if message.id == REMOVE_ALL_MESSAGES:
+                    pending_removals.clear()
+                    self.clear()
+                else:
+                    pending_removals[message.id] = None
+                continue
+            pending_removals.pop(message.id, None)
+            self.append(message)
+        self.remove_ids(pending_removals)
+
+    def copy(self) -> "IndexedMessages":
+        """複製列表與索引（訊息本身共用），不需要重新計算索引"""
+        clone = IndexedMessages()
+        list.extend(clone, self)
+        clone._positions = dict(self._positions)
+        clone._by_name = {key: dict(ids) for key, ids in self._by_name.items()}
+        clone._by_type = {key: dict(ids) for key, ids in self._by_type.items()}
+        clone._by_tool_call_id = {key: dict(ids) for key, ids in self._by_tool_call_id.items()}
+        return clone
+
+    # 其餘會改變列表的 list 方法在修改後重建索引
+    def clear(self) -> None:
+        super().clear()
+        self._reindex()
+
+    def insert(self, index: int, message: Any) -> None:
+        super().insert(index, message)
+        self._reindex()
+
+    def pop(self, index: int = -1) -> Any:
+        message = super().pop(index)
+        self._reindex()
+        return message
+
+    def remove(self, message: Any) -> None:
+        super().remove(message)
+        self._reindex()
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        super().sort(*args, **kwargs)
+        self._reindex()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._reindex()
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        super().__setitem__(index, value)
+        self._reindex()
+
+    def __delitem__(self, index: Any) -> None:
+        super().__delitem__(index)
+        self._reindex()
+
+    def __reduce__(self):
+        # pickle / deepcopy 時只保存訊息，載入後重建索引
+        return (IndexedMessages, (list(self),))
+
+
+def add_indexed_messages(left: Sequence[Any], right: Union[Any, Sequence[Any]]) -> IndexedMessages:
+    """
+    IndexedMessages 的 reducer，規則與 add_messages 相同
+
+    Args:
+        left: 目前的訊息（IndexedMessages 或一般列表）
+        right: 節點回傳的訊息更新
+
+    Returns:
+        新的 IndexedMessages（不會修改 left）
+    """
+    merged = left.copy() if isinstance(left, IndexedMessages) else IndexedMessages(convert_to_messages(left))
+    merged.apply(right)
+    return merged
+
+
+class IndexedMessagesChannel(BinaryOperatorAggregate):
+    """
+    以 IndexedMessages 保存訊息的 state channel，用法：Annotated[IndexedMessages, IndexedMessagesChannel]
+
+    從 checkpoint 恢復時（序列化後是一般列表）重建索引。
+    """
+
+    def __init__(self, typ: Any = IndexedMessages, operator: Any = add_indexed_messages):
+        super().__init__(typ, operator)
+
+    def from_checkpoint(self, checkpoint: Any) -> "IndexedMessagesChannel":
+        channel = super().from_checkpoint(checkpoint)
+        if channel.is_available() and not isinstance(channel.value, IndexedMessages):
+            channel.value = IndexedMessages(channel.value)
+        return channel
+
+
+class IndexedMessagesState(TypedDict):
+    """與 MessagesState 相同，但 messages 為 IndexedMessages"""
+
+    messages: Annotated[IndexedMessages, IndexedMessagesChannel]
@@ -0,0 +1,198 @@
+"""
+LLM 回應快取
+
+以 LangChain 的 cache 介面掛在模型上，key 為「正規化後的 prompt + 模型字串」的雜湊。
+模型字串已包含模型參數、綁定的 tools 與 structured output schema。
+
+兩層快取：
+1. 記憶體 LRU：以位元組數為上限，並有 TTL
+2. SQLite：本地檔案（WAL 模式），程序重啟後仍可命中，命中後會放回記憶體層
+
+正規化會移除訊息的 id（add_messages 會產生隨機 id），並壓縮內容中的連續空白，
+讓同一篇文章重複送審時能命中快取。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import warnings
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        normalized = {k: _normalize(v) for k, v in value.items()}
+        # 只移除訊息本身的 id，保留序列化結構中代表類別路徑的 id
+        if normalized.get("type") == "constructor" and isinstance(normalized.get("kwargs"), dict):
+            normalized["kwargs"].pop("id", None)
+        return normalized
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    正規化序列化後的 prompt
+
+    Args:
+        prompt: LangChain 序列化後的 messages（JSON 字串）
+
+    Returns:
+        移除訊息 id 並壓縮空白後的 JSON 字串
+    """
+    try:
+        data = json.loads(prompt)
+    except ValueError:
+        return " ".join(prompt.split())
+    return json.dumps(_normalize(data), ensure_ascii=False, sort_keys=True)
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """計算正規化 prompt 與模型字串的雜湊"""
+    digest = hashlib.sha256()
+    digest.update(normalize_prompt(prompt).encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(llm_string.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResponseCache(BaseCache):
+    """
+    記憶體 LRU + SQLite 的兩層回應快取
+
+    Args:
+        path: SQLite 檔案路徑，None 表示只使用記憶體層
+        max_bytes: 記憶體層的位元組上限
+        ttl: 存活時間（秒），None 表示不過期
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[float] = 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+        self._memory_bytes = 0
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    # 記憶體層操作，呼叫前須持有 self._lock
+    def _memory_put(self, key: str, value: str, created_at: float) -> None:
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key)[0])
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        self._memory[key] = (value, created_at)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats["evictions"] += 1
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        item = self._memory.get(key)
+        if item is None:
+            return None
+        value, created_at = item
+        if self._expired(created_at):
+            del self._memory[key]
+            self._memory_bytes -= len(value)
+            self.stats["expired"] += 1
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _load(self, value: str) -> RETURN_VAL_TYPE:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # langchain_core.load.loads 仍為 beta
+            return loads(value)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            value = self._memory_get(key)
+            if value is not None:
+                self.stats["memory_hits"] += 1
+                return self._load(value)
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[1]):
+                    self.stats["disk_hits"] += 1
+                    self._memory_put(key, row[0], row[1])
+                    return self._load(row[0])
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self.stats["expired"] += 1
+
+            self.stats["misses"] += 1
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string)
+        value = dumps(return_val)
+        created_at = time.time()
+        with self._lock:
+            self._memory_put(key, value, created_at)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, created_at),
+                )
+
+    def clear(self, **kwargs: Any) -> None:
+        """清除兩層快取"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_cache")
+
+    def report(self) -> Dict[str, Any]:
+        """
+        取得快取統計
+
+        Returns:
+            命中 / 未命中次數、命中率與記憶體層使用量
+        """
+        with self._lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            total = hits + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
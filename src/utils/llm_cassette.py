@@ -0,0 +1,138 @@
+"""
+LLM 呼叫的錄製 / 重播 (cassette)
+
+以 LangChain 的 cache 介面掛在模型上，cache key 為完整渲染後的 prompt
+（messages）與模型字串（模型參數、綁定的 tools、structured output schema）。
+兩者的 sha256 即為檔名，回應以 gzip 壓縮的 JSON 存放：
+
+    <cassette_dir>/<hash 前兩碼>/<hash>.json.gz
+
+模式：
+- record：命中時重播，未命中時呼叫模型並錄製
+- replay：只重播，未命中時拋出 CassetteMissError（代表 prompt 或參數已改變）
+"""
+
+import os
+import gzip
+import json
+import time
+import shutil
+import hashlib
+import warnings
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+CASSETTE_MODES = ("record", "replay")
+
+
+class CassetteMissError(LookupError):
+    """replay 模式下找不到對應的錄製內容"""
+
+
+def cassette_key(prompt: str, llm_string: str) -> str:
+    """計算 prompt 與模型字串的內容雜湊"""
+    digest = hashlib.sha256()
+    digest.update(prompt.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(llm_string.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CassetteCache(BaseCache):
+    """
+    以內容雜湊為 key 的磁碟錄製檔
+
+    Args:
+        cassette_dir: 錄製檔目錄
+        mode: record 或 replay
+        max_missed_keys: report() 中保留的最近未命中 key 數量（總數見 stats["misses"]）
+    """
+
+    def __init__(self, cassette_dir: str, mode: str = "record", max_missed_keys: int = 100):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"不支援的 cassette 模式: {mode}，可用模式: {CASSETTE_MODES}")
+        self.cassette_dir = cassette_dir
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._started: Dict[str, float] = {}
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "recorded": 0,
+            "saved_latency_ms": 0.0,  # 重播所省下的原始呼叫延遲
+        }
+        self.missed_keys: Deque[str] = deque(maxlen=max_missed_keys)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cassette_dir, key[:2], f"{key}.json.gz")
+
+    def read_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """讀取錄製內容，不存在時回傳 None"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            return json.load(file)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cassette_key(prompt, llm_string)
+        entry = self.read_entry(key)
+        with self._lock:
+            if entry is not None:
+                self.stats["hits"] += 1
+                self.stats["saved_latency_ms"] += entry.get("latency_ms", 0.0)
+            else:
+                self.stats["misses"] += 1
+                self.missed_keys.append(key)
+                if self.mode == "record":
+                    # 只有 record 模式會接著呼叫模型並在 update 中取出，replay 模式記錄了也不會被清掉
+                    self._started[key] = time.perf_counter()
+        if entry is not None:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # langchain_core.load.loads 仍為 beta
+                return loads(entry["generations"])
+        if self.mode == "replay":
+            raise CassetteMissError(
+                f"cassette {self.cassette_dir} 沒有 key={key} 的錄製內容，prompt 或模型參數可能已改變"
+            )
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cassette_key(prompt, llm_string)
+        with self._lock:
+            started = self._started.pop(key, None)
+            self.stats["recorded"] += 1
+        entry = {
+            "key": key,
+            "prompt": prompt,
+            "llm_string": llm_string,
+            "generations": dumps(return_val),
+            "latency_ms": (time.perf_counter() - started) * 1000 if started else 0.0,
+            "recorded_at": time.time(),
+        }
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先寫入暫存檔再改名，避免並行寫入時讀到不完整的檔案
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as file:
+            json.dump(entry, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def clear(self, **kwargs: Any) -> None:
+        """清除所有錄製內容"""
+        if os.path.isdir(self.cassette_dir):
+            shutil.rmtree(self.cassette_dir)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        取得錄製 / 重播統計
+
+        Returns:
+            命中、未命中、錄製數量與重播省下的延遲（毫秒）
+        """
+        with self._lock:
+            return {**self.stats, "missed_keys": list(self.missed_keys)}
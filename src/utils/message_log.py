@@ -0,0 +1,220 @@
+"""
+只會追加的訊息紀錄（state channel）
+
+以 operator.add 作為 reducer 時，每次更新都會建立新的列表並複製所有舊訊息，N 個節點的鏈總共複製 O(N^2) 則訊息；
+如果節點又回傳 state["messages"] + [...]（完整歷史加上新訊息），列表在每個節點都會倍增。
+
+MessageLog 是不可變的序列，多個版本共用同一個底層列表（structural sharing）：
+- 每個版本只記錄自己的長度，看到的是底層列表的前 length 則
+- 在最新版本後追加時直接 append 到底層列表，O(1)，舊版本看到的內容不變
+- 在舊版本後追加（分支，例如平行節點都從同一個 state 追加）時才複製前綴，之後各自追加
+讀取（索引、切片、迭代、len）與 list 相同，state["messages"][-1] 等既有寫法不需要修改。
+
+作為 graph state 的欄位時使用 MessageLogChannel：
+
+    class State(TypedDict):
+        messages: Annotated[MessageLog, MessageLogChannel]
+
+    def node(state: State):
+        return {"messages": [("assistant", "...")]}       # 只回傳新訊息
+
+節點回傳的更新若包含先前的歷史（例如 state["messages"] + [...]，或含有同一批訊息物件的列表），
+on_history="dedupe"（預設）只會追加新的部分，on_history="raise" 則引發 InvalidUpdateError：
+
+    messages: Annotated[MessageLog, MessageLogChannel(MessageLog, on_history="raise")]
+
+list 或 MessageLog 視為多則訊息，其他值（例如 ("user", "你好") 或 BaseMessage）視為一則訊息。
+checkpoint 中存的是一般列表，從 checkpoint 恢復時轉回 MessageLog；節點回傳的 MessageLog 在 pending writes 中也能序列化。
+"""
+
+import itertools
+import threading
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, Iterator, List
+
+from langgraph.channels.base import BaseChannel
+from langgraph.errors import InvalidUpdateError
+
+# 判斷「是否為最新版本」與追加必須是原子操作（平行節點可能同時追加）
+_append_lock = threading.Lock()
+
+
+class MessageLog(Sequence):
+    """
+    共用底層列表、只能追加的不可變序列
+
+    Args:
+        items: 初始內容
+    """
+
+    __slots__ = ("_items", "_length")
+
+    def __init__(self, items: Iterable[Any] = ()):
+        self._items: List[Any] = list(items)
+        self._length = len(self._items)
+
+    @classmethod
+    def _view(cls, items: List[Any], length: int) -> "MessageLog":
+        log = cls.__new__(cls)
+        log._items = items
+        log._length = length
+        return log
+
+    def extend(self, items: Iterable[Any]) -> "MessageLog":
+        """
+        追加多則訊息
+
+        Returns:
+            新的 MessageLog（self 不變）
+        """
+        items = list(items)
+        with _append_lock:
+            if len(self._items) == self._length:
+                self._items.extend(items)
+                shared = self._items
+            else:
+                # 已經有其他版本從這裡追加過，複製前綴後分支
+                shared = self._items[:self._length] + items
+        return MessageLog._view(shared, self._length + len(items))
+
+    def append(self, item: Any) -> "MessageLog":
+        """追加一則訊息，回傳新的 MessageLog（self 不變）"""
+        return self.extend((item,))
+
+    def shares_storage(self, other: "MessageLog") -> bool:
+        """兩個版本是否共用底層列表（其中一個是另一個的前綴）"""
+        return self._items is other._items
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self._items[position] for position in range(self._length)[index]]
+        return self._items[range(self._length)[index]]
+
+    def __iter__(self) -> Iterator[Any]:
+        return itertools.islice(self._items, self._length)
+
+    def __add__(self, other: Iterable[Any]) -> "MessageLog":
+        return self.extend(other)
+
+    def __radd__(self, other: Iterable[Any]) -> List[Any]:
+        return list(other) + list(self)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"MessageLog({list(self)!r})"
+
+    def __reduce__(self):
+        # pickle / deepcopy 時只保存這個版本看得到的內容
+        return (MessageLog, (list(self),))
+
+    def _asdict(self) -> Dict[str, List[Any]]:
+        # 讓 JsonPlusSerializer 以 namedtuple 的方式序列化節點回傳的 MessageLog（pending writes），載入時呼叫 MessageLog(items=...)
+        return {"items": list(self)}
+
+
+def _shared_history(current: MessageLog, update: Sequence[Any]) -> int:
+    """update 開頭有幾則是 current 中已有的訊息（同一個物件）"""
+    if isinstance(update, MessageLog) and update.shares_storage(current):
+        return min(len(current), len(update))
+    if not current or len(update) < len(current) or update[0] is not current[0]:
+        return 0
+    shared = 0
+    for old, new in zip(current, update):
+        if old is not new:
+            break
+        shared += 1
+    return shared
+
+
+def append_log(current: MessageLog, update: Any, on_history: str = "dedupe") -> MessageLog:
+    """
+    MessageLog 的 reducer
+
+    Args:
+        current: 目前的 MessageLog
+        update: 節點回傳的訊息（list / MessageLog 為多則，其他值為一則）
+        on_history: 更新中包含先前的歷史時，dedupe 只追加新的部分，raise 引發 InvalidUpdateError
+
+    Returns:
+        追加後的 MessageLog
+    """
+    if not isinstance(update, (list, MessageLog)):
+        return current.append(update)
+    shared = _shared_history(current, update)
+    if shared:
+        if on_history == "raise":
+            raise InvalidUpdateError(
+                f"節點回傳的 messages 包含先前的 {shared} 則訊息，MessageLog 只接受新增的訊息（請回傳 [新訊息] 而不是 state['messages'] + [...]）"
+            )
+        if isinstance(update, MessageLog) and update.shares_storage(current) and len(update) >= len(current):
+            return update  # 節點以 state["messages"] + [...] 追加，結果本身就是新版本
+    return current.extend(update[shared:])
+
+
+class MessageLogChannel(BaseChannel):
+    """
+    以 MessageLog 保存訊息的 state channel，用法：Annotated[MessageLog, MessageLogChannel]
+
+    Args:
+        typ: 欄位型別（由 StateGraph 傳入）
+        on_history: 節點回傳包含先前歷史的訊息時的處理方式，dedupe（預設）或 raise
+    """
+
+    __slots__ = ("value", "on_history")
+
+    def __init__(self, typ: Any = MessageLog, on_history: str = "dedupe"):
+        if on_history not in ("dedupe", "raise"):
+            raise ValueError(f"不支援的 on_history：{on_history}（可用 dedupe / raise）")
+        super().__init__(typ)
+        self.on_history = on_history
+        self.value = MessageLog()
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, MessageLogChannel) and other.on_history == self.on_history
+
+    @property
+    def ValueType(self) -> Any:
+        return self.typ
+
+    @property
+    def UpdateType(self) -> Any:
+        return Any
+
+    def copy(self) -> "MessageLogChannel":
+        # MessageLog 不可變，直接共用
+        channel = self.__class__(self.typ, self.on_history)
+        channel.key = self.key
+        channel.value = self.value
+        return channel
+
+    def checkpoint(self) -> List[Any]:
+        return list(self.value)
+
+    def from_checkpoint(self, checkpoint: Any) -> "MessageLogChannel":
+        channel = self.__class__(self.typ, self.on_history)
+        channel.key = self.key
+        if isinstance(checkpoint, (list, tuple, MessageLog)):
+            channel.value = MessageLog(checkpoint)
+        return channel
+
+    def update(self, values: Sequence[Any]) -> bool:
+        if not values:
+            return False
+        for value in values:
+            self.value = append_log(self.value, value, self.on_history)
+        return True
+
+    def get(self) -> MessageLog:
+        return self.value
+
+    def is_available(self) -> bool:
+        return True
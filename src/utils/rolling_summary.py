@@ -0,0 +1,193 @@
+"""
+滾動摘要：把舊的對話折疊進一則持續更新的摘要
+
+未摘要的訊息超過 max_tokens 時，把較早的訊息（保留最近約 keep_tokens 的內容）連同舊摘要交給模型，
+產生新的摘要，並以 RemoveMessage 從 state 移除已折疊的訊息。摘要存在 graph state 的 summary 欄位，
+隨 checkpoint 保存；呼叫模型時放在最前面作為系統訊息。每輪送出的內容約為 摘要 + max_tokens。
+
+摘要不在回應的關鍵路徑上：
+- background（預設）：回應產生後才在背景執行緒送出摘要請求，下一輪開始時若已完成就套用，
+  尚未完成則不等待，直接沿用舊摘要（下一輪再檢查）
+- inline：回應產生後立即摘要，invoke 會等摘要完成才回傳（stream 時回應已先送出）
+程序重啟時尚未套用的背景摘要會遺失，下一輪會因為仍超過門檻而重新送出。
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+from utils.token_counter import get_token_counter
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "你負責維護一段對話的摘要。請把新的對話內容整合進目前的摘要，"
+            "保留使用者的身分、偏好、已確認的事實與尚未完成的事項，省略寒暄。"
+            "只輸出更新後的摘要，使用繁體中文，不超過 300 字。",
+        ),
+        ("human", "目前的摘要：\n{summary}\n\n新的對話內容：\n{conversation}"),
+    ]
+)
+
+
+def format_conversation(messages: Sequence[BaseMessage]) -> str:
+    return "\n".join(f"{message.type}: {message.text()}" for message in messages)
+
+
+class RollingSummarizer:
+    """
+    把超過門檻的舊訊息折疊進摘要
+
+    Args:
+        llm: 產生摘要的語言模型（或回傳 BaseChatModel 的函數，第一次摘要時才建立）
+        max_tokens: 未摘要訊息的 token 數超過此值才摘要
+        keep_tokens: 摘要後保留的最近訊息 token 數，預設為 max_tokens 的一半
+        token_counter: 計算單則訊息 token 數的函數，預設為 utils/token_counter.py 的 TokenCounter.count_message
+        background: True 時在背景執行緒摘要，False 時在節點中直接摘要
+        max_workers: 背景摘要的執行緒數
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        max_tokens: int = 2000,
+        keep_tokens: Optional[int] = None,
+        token_counter: Optional[Callable[[BaseMessage], int]] = None,
+        background: bool = True,
+        max_workers: int = 2,
+    ):
+        self._llm = llm
+        self.max_tokens = max_tokens
+        self.keep_tokens = max_tokens // 2 if keep_tokens is None else keep_tokens
+        self.token_counter = token_counter or get_token_counter().count_message
+        self.background = background
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summary") if background else None
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def chain(self):
+        llm = self._llm if isinstance(self._llm, BaseChatModel) else self._llm()
+        return (SUMMARY_PROMPT | llm).with_config(run_name="rolling_summary", tags=["rolling_summary"])
+
+    def plan(self, messages: Sequence[BaseMessage]) -> int:
+        """
+        決定要折疊的訊息
+
+        Args:
+            messages: 目前 state 中的訊息
+
+        Returns:
+            要折疊的訊息結尾索引（messages[pinned:cut]），0 表示還不需要摘要；
+            只在使用者訊息處切分，避免拆開 tool call 與 ToolMessage
+        """
+        pinned = 1 if messages and isinstance(messages[0], SystemMessage) else 0
+        counts = [self.token_counter(message) for message in messages[pinned:]]
+        if sum(counts) <= self.max_tokens:
+            return 0
+        kept, cut = 0, len(messages)
+        for index in range(len(messages) - 1, pinned - 1, -1):
+            kept += counts[index - pinned]
+            if kept > self.keep_tokens:
+                break
+            cut = index
+        while cut < len(messages) and not isinstance(messages[cut], HumanMessage):
+            cut += 1
+        if cut >= len(messages):
+            # 最近一輪本身就超過 keep_tokens，改在最後一則使用者訊息處切分
+            cut = next((index for index in range(len(messages) - 1, pinned, -1) if isinstance(messages[index], HumanMessage)), pinned)
+        return cut if cut > pinned else 0
+
+    def summarize(self, summary: str, messages: Sequence[BaseMessage]) -> str:
+        """以模型把訊息整合進摘要"""
+        result = self.chain.invoke({"summary": summary or "（尚無摘要）", "conversation": format_conversation(messages)})
+        return result.text()
+
+    def _fold(self, summary: str, messages: Sequence[BaseMessage]) -> Tuple[str, List[str]]:
+        return self.summarize(summary, messages), [message.id for message in messages]
+
+    def request(self, thread_id: str, summary: str, messages: Sequence[BaseMessage]) -> Optional[Dict[str, Any]]:
+        """
+        在回應產生後呼叫：需要時摘要舊訊息
+
+        Args:
+            thread_id: 對話 thread
+            summary: 目前的摘要
+            messages: 目前 state 中的訊息
+
+        Returns:
+            inline 時為 state 更新（summary 與 RemoveMessage）；background 時只送出請求，回傳 None
+        """
+        cut = self.plan(messages)
+        if not cut:
+            return None
+        pinned = 1 if isinstance(messages[0], SystemMessage) else 0
+        folded = list(messages[pinned:cut])
+        if not self.background:
+            return self._update(*self._fold(summary, folded), messages)
+        with self._lock:
+            if thread_id in self._pending:
+                return None  # 同一個 thread 一次只摘要一批，避免摘要互相覆蓋
+            self._pending[thread_id] = self._executor.submit(self._fold, summary, folded)
+        return None
+
+    def collect(self, thread_id: str, messages: Sequence[BaseMessage]) -> Optional[Dict[str, Any]]:
+        """
+        在下一輪開始時呼叫：套用已完成的背景摘要（不等待尚未完成的摘要）
+
+        Args:
+            thread_id: 對話 thread
+            messages: 目前 state 中的訊息
+
+        Returns:
+            state 更新（summary 與 RemoveMessage），沒有已完成的摘要時為 None
+        """
+        with self._lock:
+            future = self._pending.get(thread_id)
+            if future is None or not future.done():
+                return None
+            del self._pending[thread_id]
+        try:
+            summary, folded_ids = future.result()
+        except Exception:
+            logger.exception("thread %s 的背景摘要失敗，下一輪重新嘗試", thread_id)
+            return None
+        return self._update(summary, folded_ids, messages)
+
+    def wait(self, thread_id: str, timeout: Optional[float] = None) -> None:
+        """等待 thread 的背景摘要完成（測試或關閉程序前使用）"""
+        with self._lock:
+            future = self._pending.get(thread_id)
+        if future is not None:
+            future.exception(timeout=timeout)
+
+    @staticmethod
+    def _update(summary: str, folded_ids: Sequence[str], messages: Sequence[BaseMessage]) -> Dict[str, Any]:
+        # 摘要期間可能已有訊息被其他節點移除（例如 archive），只移除仍存在的訊息
+        present = {message.id for message in messages}
+        return {"summary": summary, "messages": [RemoveMessage(id=message_id) for message_id in folded_ids if message_id in present]}
+
+
+def with_summary(summary: Optional[str], messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """
+    把摘要作為系統訊息放在送給模型的訊息前面
+
+    Args:
+        summary: 目前的摘要，沒有時不加入
+        messages: 要送給模型的訊息
+
+    Returns:
+        訊息列表（開頭已有 SystemMessage 時，摘要放在它之後）
+    """
+    if not summary:
+        return list(messages)
+    pinned = 1 if messages and isinstance(messages[0], SystemMessage) else 0
+    return list(messages[:pinned]) + [SystemMessage(content=f"先前對話的摘要：\n{summary}")] + list(messages[pinned:])
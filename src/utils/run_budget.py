@@ -0,0 +1,191 @@
+"""
+有迴圈的 graph 的執行預算
+
+RunBudget 記錄單次執行的用量，並在超過任一上限時讓迴圈改走 fallback 節點，
+而不是一路跑到 recursion_limit 拋出 GraphRecursionError：
+- max_iterations：每個迴圈最多再繞幾次（以 cycle 名稱分開計算）
+- max_llm_calls：LLM 呼叫次數
+- max_tokens：LLM 回報的 token 總數
+- max_seconds：執行時間
+
+RunBudget 本身是 callback handler，透過 config 傳入後，節點內的 LLM 呼叫會自動計入：
+
+    budget = RunBudget(max_iterations=3, max_llm_calls=10)
+    graph.invoke(inputs, config=budget.config(recursion_limit=100))
+    print(budget.report())
+
+graph 端以 budget_router 包裝原本的 router，只有在要繼續繞迴圈時才檢查預算：
+
+    workflow.add_conditional_edges(
+        "news_chef",
+        budget_router(news_chef_router, cycle="rewrite", loop_targets={"translator", "expander"}),
+        {..., "fallback": "fallback"},
+    )
+
+config 中沒有 RunBudget 時，budget_router 不做任何事，行為與原本的 router 相同。
+"""
+
+import time
+import threading
+from typing import Any, Callable, Collection, Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+
+
+class RunBudget(BaseCallbackHandler):
+    """
+    單次執行的預算與用量
+
+    Args:
+        max_iterations: 每個迴圈的最多次數，None 表示不限制
+        max_llm_calls: LLM 呼叫次數上限
+        max_tokens: token 總數上限
+        max_seconds: 執行時間上限（秒）
+    """
+
+    def __init__(
+        self,
+        max_iterations: Optional[int] = None,
+        max_llm_calls: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+    ):
+        self.max_iterations = max_iterations
+        self.max_llm_calls = max_llm_calls
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.iterations: Dict[str, int] = {}
+        self.llm_calls = 0
+        self.tokens = 0
+        self.exhausted: Optional[str] = None
+        self.started_at = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def config(self, **kwargs: Any) -> RunnableConfig:
+        """
+        產生帶有此預算的 config（重設計時起點）
+
+        Args:
+            **kwargs: 其他 config 欄位，例如 recursion_limit、configurable
+
+        Returns:
+            傳給 graph.invoke / stream 的 config
+        """
+        self.started_at = time.perf_counter()
+        configurable = {**kwargs.pop("configurable", {}), "budget": self}
+        callbacks = list(kwargs.pop("callbacks", None) or []) + [self]
+        return {**kwargs, "configurable": configurable, "callbacks": callbacks}
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        tokens = (response.llm_output or {}).get("token_usage", {}).get("total_tokens")
+        if tokens is None:
+            tokens = 0
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                    tokens += (usage or {}).get("total_tokens", 0)
+        with self._lock:
+            self.llm_calls += 1
+            self.tokens += tokens
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def check(self, cycle: Optional[str] = None) -> Optional[str]:
+        """
+        檢查預算是否用完
+
+        Args:
+            cycle: 要檢查次數的迴圈名稱
+
+        Returns:
+            用完的預算名稱（iterations / llm_calls / tokens / seconds），尚有餘裕時為 None
+        """
+        with self._lock:
+            if cycle is not None and self.max_iterations is not None and self.iterations.get(cycle, 0) >= self.max_iterations:
+                return "iterations"
+            if self.max_llm_calls is not None and self.llm_calls >= self.max_llm_calls:
+                return "llm_calls"
+            if self.max_tokens is not None and self.tokens >= self.max_tokens:
+                return "tokens"
+        if self.max_seconds is not None and self.elapsed >= self.max_seconds:
+            return "seconds"
+        return None
+
+    def consume_iteration(self, cycle: str) -> Optional[str]:
+        """
+        迴圈要再繞一次前呼叫：預算足夠時記一次，否則回傳用完的預算名稱並停止
+
+        Args:
+            cycle: 迴圈名稱
+
+        Returns:
+            用完的預算名稱，可以繼續時為 None
+        """
+        reason = self.check(cycle)
+        with self._lock:
+            if reason is None:
+                self.iterations[cycle] = self.iterations.get(cycle, 0) + 1
+            elif self.exhausted is None:
+                self.exhausted = reason
+        return reason
+
+    def report(self) -> Dict[str, Any]:
+        """
+        取得各項預算的用量
+
+        Returns:
+            各預算的 used / limit，以及提前結束的原因 exhausted
+        """
+        with self._lock:
+            return {
+                "iterations": {
+                    cycle: {"used": used, "limit": self.max_iterations}
+                    for cycle, used in self.iterations.items()
+                },
+                "llm_calls": {"used": self.llm_calls, "limit": self.max_llm_calls},
+                "tokens": {"used": self.tokens, "limit": self.max_tokens},
+                "seconds": {"used": round(self.elapsed, 3), "limit": self.max_seconds},
+                "exhausted": self.exhausted,
+            }
+
+
+def get_budget(config: Optional[RunnableConfig]) -> Optional[RunBudget]:
+    """從 config 取出 RunBudget，沒有設定時回傳 None"""
+    return ((config or {}).get("configurable") or {}).get("budget")
+
+
+def budget_router(
+    router: Callable[[Any], str],
+    cycle: str,
+    loop_targets: Collection[str],
+    fallback: str = "fallback",
+) -> Callable[[Any, RunnableConfig], str]:
+    """
+    以預算包裝 router：router 要繼續繞迴圈但預算用完時，改走 fallback
+
+    Args:
+        router: 原本的 router
+        cycle: 迴圈名稱，用於分開計算次數
+        loop_targets: 代表繼續繞迴圈的 router 回傳值
+        fallback: 預算用完時的回傳值
+
+    Returns:
+        可直接交給 add_conditional_edges 的 router
+    """
+    def route(state: Any, config: RunnableConfig) -> str:
+        decision = router(state)
+        budget = get_budget(config)
+        if budget is None or decision not in loop_targets:
+            return decision
+        reason = budget.consume_iteration(cycle)
+        if reason is not None:
+            print(f"{router.__name__}: budget exhausted ({reason}), go to {fallback}")
+            return fallback
+        return decision
+
+    route.__name__ = router.__name__
+    return route
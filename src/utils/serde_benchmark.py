@@ -0,0 +1,114 @@
+"""
+比較預設序列化器（JsonPlusSerializer）與 CompactSerializer 的大小與編碼 / 解碼速度
+
+測試資料模擬各範例的 checkpoint channel 值：
+- messages：含 tool call、ToolMessage 與 usage_metadata 的多輪對話（4.tool_calling、10.memory）
+- required_information：7.0_requireInfo 的 RequiredInformation
+- plan / act：8.Plan-and-execute-Agent 的 Plan 與 Act
+
+    python src/utils/serde_benchmark.py --turns 1 10 100
+"""
+
+import os
+import sys
+import time
+import argparse
+import importlib.util
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from utils.compact_serde import CompactSerializer
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load_example(name: str, directory: str):
+    """範例資料夾名稱以數字開頭，無法直接 import，改以檔案路徑載入"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, directory, "run.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_state(turns: int, models: Dict[str, Any]) -> Dict[str, Any]:
+    """組出一個 turns 輪對話的 checkpoint channel 值"""
+    messages: List[Any] = [SystemMessage(content="你是 AI 客服助理，請協助使用者查詢天氣與訂票。")]
+    for turn in range(turns):
+        call_id = f"call_{turn:04d}"
+        messages += [
+            HumanMessage(content=f"第 {turn + 1} 個問題：台北明天會下雨嗎？", id=f"human-{turn}"),
+            AIMessage(
+                content="",
+                id=f"ai-{turn}-0",
+                tool_calls=[{"name": "get_weather", "args": {"city": "台北", "day": "tomorrow"}, "id": call_id, "type": "tool_call"}],
+                response_metadata={"model_name": "gpt-4o-mini", "finish_reason": "tool_calls"},
+                usage_metadata={"input_tokens": 120 + turn, "output_tokens": 18, "total_tokens": 138 + turn},
+            ),
+            ToolMessage(content="台北明天降雨機率 60%，氣溫 24-29 度。", tool_call_id=call_id, name="get_weather", id=f"tool-{turn}"),
+            AIMessage(
+                content="台北明天降雨機率 60%，建議攜帶雨具。",
+                id=f"ai-{turn}-1",
+                response_metadata={"model_name": "gpt-4o-mini", "finish_reason": "stop"},
+                usage_metadata={"input_tokens": 180 + turn, "output_tokens": 24, "total_tokens": 204 + turn},
+            ),
+        ]
+    plan = models["Plan"](steps=["搜尋 2024 奧運羽毛球男雙結果", "確認冠軍選手姓名", "整理答案"])
+    return {
+        "messages": messages,
+        "required_information": models["RequiredInformation"](provided_full_name="張小明", provided_mobile="0912345678"),
+        "plan": plan,
+        "act": models["Act"](action=plan),
+        "past_steps": [["搜尋 2024 奧運羽毛球男雙結果", "王齊麟、李洋"]],  # msgpack 會把 tuple 還原成 list
+    }
+
+
+def measure(serde: Any, value: Any, repeat: int) -> Tuple[int, float, float]:
+    """回傳 (bytes, 每秒編碼次數, 每秒解碼次數)"""
+    typed = serde.dumps_typed(value)
+    restored = serde.loads_typed(typed)
+    assert restored == value, f"{type(serde).__name__} 還原後的值不同"
+
+    def rate(func: Callable[[], Any]) -> float:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return repeat / (time.perf_counter() - start)
+
+    return len(typed[1]), rate(lambda: serde.dumps_typed(value)), rate(lambda: serde.loads_typed(typed))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="比較 checkpoint 序列化器的大小與速度")
+    parser.add_argument("--turns", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    require_info = _load_example("example_7_0", "7.0_requireInfo")
+    plan_execute = _load_example("example_8", "8.Plan-and-execute-Agent")
+    models = {
+        "RequiredInformation": require_info.RequiredInformation,
+        "Plan": plan_execute.Plan,
+        "Act": plan_execute.Act,
+    }
+    serdes = {
+        "default": JsonPlusSerializer(),
+        "compact": CompactSerializer(models=[*models.values(), plan_execute.Response]),
+    }
+
+    print(f"{'turns':>6} {'serde':<8} {'bytes':>10} {'encode/s':>10} {'decode/s':>10}")
+    for turns in args.turns:
+        state = build_state(turns, models)
+        repeat = max(args.repeat // max(turns // 10, 1), 10)
+        for name, serde in serdes.items():
+            size, encode, decode = measure(serde, state, repeat)
+            print(f"{turns:>6} {name:<8} {size:>10,} {encode:>10,.0f} {decode:>10,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+"""
+以 SQLite（WAL 模式）保存 checkpoint
+
+MemorySaver 會把每個 thread 的每個 checkpoint 永遠留在記憶體中，重啟後也全部消失。
+SqliteCheckpointSaver 把 checkpoint 存在本地檔案，記憶體中只有尚未寫入的緩衝：
+- 寫入先進緩衝，累積 batch_size 筆或超過 flush_interval 秒才以單一交易寫入
+  （程序異常結束時最多遺失一個批次；讀取前一定會先寫入緩衝）
+- checkpoints / writes 以 (thread_id, checkpoint_ns, checkpoint_id) 為主鍵，另建 (thread_id, checkpoint_id) 索引
+- keep_last 設定每個 thread 只保留最近 N 個 checkpoint，較舊的連同 pending writes 一起刪除
+
+可直接傳給有 checkpointer 參數的 build_graph()：
+
+    checkpointer = SqliteCheckpointSaver(".cache/checkpoints.sqlite", keep_last=20)
+    graph = build_graph(checkpointer=checkpointer)
+"""
+
+import time
+import random
+import sqlite3
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    checkpoint_type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_thread ON checkpoints (thread_id, checkpoint_id);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    value_type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE INDEX IF NOT EXISTS idx_writes_thread ON writes (thread_id, checkpoint_id);
+"""
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    以 SQLite 檔案保存的 checkpointer
+
+    Args:
+        path: 資料庫檔案路徑（":memory:" 為不落地的資料庫）
+        keep_last: 每個 thread / namespace 保留的 checkpoint 數，None 表示全部保留
+        batch_size: 緩衝累積多少筆寫入後寫入資料庫
+        flush_interval: 緩衝最久保留的秒數
+        serde: checkpoint 的序列化方式，預設與 MemorySaver 相同
+    """
+
+    def __init__(
+        self,
+        path: str,
+        keep_last: Optional[int] = None,
+        batch_size: int = 32,
+        flush_interval: float = 1.0,
+        serde: Optional[SerializerProtocol] = None,
+    ):
+        super().__init__(serde=serde)
+        if keep_last is not None and keep_last < 1:
+            raise ValueError("keep_last 必須大於 0")
+        self.path = path
+        self.keep_last = keep_last
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._pending_checkpoints: List[Tuple] = []
+        self._pending_writes: List[Tuple] = []
+        self._dirty_threads: Set[Tuple[str, str]] = set()
+        self._last_flush = time.monotonic()
+        self.bytes_written = 0
+
+    # --- 緩衝與保留 ---
+
+    def flush(self) -> None:
+        """把緩衝中的寫入以單一交易寫入資料庫，並套用保留設定"""
+        with self._lock:
+            if not self._pending_checkpoints and not self._pending_writes:
+                return
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._pending_checkpoints,
+                )
+                # 一般的 write 以第一次寫入為準（task 重試時不覆蓋），只有 ERROR / INTERRUPT 等特殊 channel 取代舊值
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [row for row in self._pending_writes if row[5] not in WRITES_IDX_MAP],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [row for row in self._pending_writes if row[5] in WRITES_IDX_MAP],
+                )
+                if self.keep_last is not None:
+                    for thread_id, checkpoint_ns in self._dirty_threads:
+                        self._prune(thread_id, checkpoint_ns)
+            self._pending_checkpoints.clear()
+            self._pending_writes.clear()
+            self._dirty_threads.clear()
+            self._last_flush = time.monotonic()
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        row = self._conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_last - 1),
+        ).fetchone()
+        if row is None:
+            return
+        for table in ("checkpoints", "writes"):
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, row[0]),
+            )
+
+    def _maybe_flush(self) -> None:
+        pending = len(self._pending_checkpoints) + len(self._pending_writes)
+        if pending >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def close(self) -> None:
+        """寫入緩衝並關閉資料庫"""
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    def __enter__(self) -> "SqliteCheckpointSaver":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    # --- 讀取 ---
+
+    def _row_to_tuple(self, row: Tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata = row
+        writes = self._conn.execute(
+            "SELECT task_id, channel, value_type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=self._load_checkpoint(thread_id, checkpoint_ns, checkpoint_id, checkpoint_type, checkpoint),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def _load_checkpoint(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, checkpoint_type: str, data: bytes) -> Checkpoint:
+        """還原 checkpoint，子類別可改寫儲存格式"""
+        return self.serde.loads_typed((checkpoint_type, data))
+
+    def _dump_checkpoint(self, thread_id: str, checkpoint_ns: str, parent_checkpoint_id: Optional[str], checkpoint: Checkpoint) -> Tuple[str, bytes]:
+        """序列化 checkpoint，子類別可改寫儲存格式"""
+        return self.serde.dumps_typed(checkpoint)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            self.flush()
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._row_to_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = "SELECT * FROM checkpoints"
+        conditions, params = [], []
+        if config:
+            conditions.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                conditions.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                conditions.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            conditions.append("checkpoint_id < ?")
+            params.append(before_id)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY checkpoint_id DESC"
+        if limit is not None and not filter:
+            # metadata 是序列化後的內容，有 filter 時只能在 Python 中比對，沒有時由 SQLite 直接限制筆數
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            self.flush()
+            results = []
+            # 逐筆讀取，有 filter 時先只還原 metadata，符合後才還原 checkpoint 與 pending writes，湊滿 limit 就停
+            for row in self._conn.execute(query, params):
+                if limit is not None and len(results) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[6], row[7]))
+                    if not all(metadata.get(key) == value for key, value in filter.items()):
+                        continue
+                results.append(self._row_to_tuple(row))
+        yield from results
+
+    # --- 寫入 ---
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+        metadata_type, metadata_bytes = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._lock:
+            checkpoint_type, checkpoint_bytes = self._dump_checkpoint(thread_id, checkpoint_ns, parent_checkpoint_id, checkpoint)
+            self.bytes_written += len(checkpoint_bytes) + len(metadata_bytes)
+            self._pending_checkpoints.append((
+                thread_id,
+                checkpoint_ns,
+                checkpoint["id"],
+                parent_checkpoint_id,
+                checkpoint_type,
+                checkpoint_bytes,
+                metadata_type,
+                metadata_bytes,
+            ))
+            self._dirty_threads.add((thread_id, checkpoint_ns))
+            self._maybe_flush()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, value_bytes = self.serde.dumps_typed(value)
+            rows.append((
+                thread_id, checkpoint_ns, checkpoint_id, task_id,
+                WRITES_IDX_MAP.get(channel, idx), channel, value_type, value_bytes, task_path,
+            ))
+        with self._lock:
+            self.bytes_written += sum(len(row[7]) for row in rows)
+            self._pending_writes.extend(rows)
+            self._maybe_flush()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.flush()
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        取得資料庫中的資料量
+
+        Returns:
+            thread 數、checkpoint 數、pending writes 數，與啟動後累計寫入的位元組數
+        """
+        with self._lock:
+            self.flush()
+            threads, checkpoints = self._conn.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints"
+            ).fetchone()
+            writes = self._conn.execute("SELECT COUNT(*) FROM writes").fetchone()[0]
+        return {"threads": threads, "checkpoints": checkpoints, "writes": writes, "bytes_written": self.bytes_written}
+
+    # --- 非同步版本：在執行緒中執行，避免磁碟 I/O 卡住 event loop ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # 與 MemorySaver 相同的版本格式
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
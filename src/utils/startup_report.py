@@ -0,0 +1,107 @@
+"""
+量測各範例的冷啟動時間
+
+每個範例在獨立的子程序中量測：
+- import_ms：載入模組的時間（langgraph.json 的 server worker 啟動時就是付出這段時間）
+- build_ms：呼叫 build_graph() 的時間
+
+預設使用 fake 後端，不需要網路；--backend openai 可量測載入真實 SDK 的成本（建立 client 不會連線）。
+超過啟動時間預算 (--budget-ms) 的範例會讓程式以非 0 結束。
+
+    python src/utils/startup_report.py --budget-ms 1500
+"""
+
+import os
+import sys
+import json
+import glob
+import argparse
+import subprocess
+from typing import Any, Dict, List
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_FILES = ("run.py", "graph.py", "all_run.py")
+
+# 在子程序中執行：載入模組並呼叫 build_graph()
+_PROBE = r"""
+import sys, os, json, time, importlib.util
+path = sys.argv[1]
+sys.path.insert(0, os.path.dirname(path))
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("probe_module", path)
+module = importlib.util.module_from_spec(spec)
+sys.modules["probe_module"] = module
+spec.loader.exec_module(module)
+import_ms = (time.perf_counter() - start) * 1000
+build_ms = None
+if hasattr(module, "build_graph"):
+    start = time.perf_counter()
+    module.build_graph()
+    build_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({"import_ms": import_ms, "build_ms": build_ms}))
+"""
+
+
+def find_examples() -> List[str]:
+    """找出 src 下各範例的進入點檔案"""
+    paths = []
+    for name in ENTRY_FILES:
+        paths.extend(glob.glob(os.path.join(SRC_DIR, "*", name)))
+    return sorted(path for path in paths if os.path.getsize(path) > 0)
+
+
+def measure(path: str, backend: str = "fake") -> Dict[str, Any]:
+    """
+    在子程序中量測單一範例的載入與建圖時間
+
+    Args:
+        path: 範例檔案路徑
+        backend: LLM 後端
+
+    Returns:
+        import_ms / build_ms，失敗時包含 error
+    """
+    env = {**os.environ, "LLM_BACKEND": backend}
+    env.setdefault("OPENAI_API_KEY", "startup-report")
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE, path],
+        cwd=os.path.dirname(path),
+        env=env,
+        capture_output=True,
+        text=True,
+        stdin=subprocess.DEVNULL,
+    )
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        return {"error": (result.stderr.strip().splitlines() or ["unknown error"])[-1]}
+    return json.loads(lines[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="量測各範例的冷啟動時間")
+    parser.add_argument("--budget-ms", type=float, default=None, help="import + build_graph 的時間預算（毫秒）")
+    parser.add_argument("--backend", default="fake", help="LLM 後端（fake / openai / ollama）")
+    args = parser.parse_args()
+
+    over_budget = False
+    print(f"{'example':<50} {'import_ms':>10} {'build_ms':>10} {'total_ms':>10}")
+    for path in find_examples():
+        name = os.path.relpath(path, SRC_DIR)
+        report = measure(path, backend=args.backend)
+        if "error" in report:
+            print(f"{name:<50} ERROR: {report['error']}")
+            over_budget = True
+            continue
+        build_ms = report["build_ms"] or 0.0
+        total_ms = report["import_ms"] + build_ms
+        flag = ""
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            flag = "  OVER BUDGET"
+            over_budget = True
+        build_text = f"{build_ms:.1f}" if report["build_ms"] is not None else "-"
+        print(f"{name:<50} {report['import_ms']:>10.1f} {build_text:>10} {total_ms:>10.1f}{flag}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+冷熱分層的對話儲存
+
+長期使用的 thread（例如 10.memory 的 "taiwan_chat"）訊息會不斷累積，graph state 與每個 checkpoint
+都要帶著完整的訊息列表。TieredMessageStore 把對話分成兩層：
+- 熱資料：最近 hot_window 則訊息留在 graph state（記憶體）中，LLM 每次只看到這些
+- 冷資料：更早的訊息以 append-only 方式寫入每個 thread 的區段檔，讀取時以 mmap 映射，
+  只有節點實際呼叫 read() / search() 時才會把需要的訊息載回
+
+每個 thread 有兩個檔案：
+- <hash>.seg：訊息紀錄，每筆為 [payload 長度 (4 bytes)][型別長度 (2 bytes)][序列化型別][payload]
+- <hash>.idx：每筆紀錄在 .seg 中的起始位置（8 bytes），用來以索引直接定位任意一則訊息
+兩個檔案都只會在尾端追加，不需要在記憶體中保留索引，每個 thread 的記憶體用量與對話長度無關。
+
+搭配 archive_messages() 在節點中把超出視窗的訊息移到冷資料層，並以 RemoveMessage 從 state 移除：
+
+    def archive(state: MessagesState, config: RunnableConfig):
+        return {"messages": archive_messages(store, config["configurable"]["thread_id"], state["messages"], hot_window=20)}
+"""
+
+import os
+import mmap
+import struct
+import hashlib
+import threading
+from typing import Any, Iterator, List, Optional, Sequence
+
+from langchain_core.messages import AnyMessage, HumanMessage, RemoveMessage, SystemMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+_RECORD_HEADER = struct.Struct("<IH")
+_OFFSET = struct.Struct("<Q")
+
+
+class TieredMessageStore:
+    """
+    把舊訊息寫入 mmap 區段檔的冷資料層
+
+    Args:
+        directory: 區段檔目錄
+        serde: 訊息序列化器（例如 utils/compact_serde.py 的 CompactSerializer），預設為 JsonPlusSerializer
+    """
+
+    def __init__(self, directory: str, serde: Optional[Any] = None):
+        self.directory = directory
+        self.serde = serde or JsonPlusSerializer()
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+
+    def _paths(self, thread_id: str):
+        name = hashlib.sha1(str(thread_id).encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, name)
+        return base + ".seg", base + ".idx"
+
+    def count(self, thread_id: str) -> int:
+        """冷資料層中的訊息數"""
+        _, idx_path = self._paths(thread_id)
+        try:
+            return os.path.getsize(idx_path) // _OFFSET.size
+        except FileNotFoundError:
+            return 0
+
+    def append(self, thread_id: str, messages: Sequence[AnyMessage]) -> int:
+        """
+        把訊息追加到 thread 的區段檔
+
+        Args:
+            thread_id: 對話 thread
+            messages: 要移到冷資料層的訊息（依時間順序）
+
+        Returns:
+            追加後冷資料層的訊息數
+        """
+        if not messages:
+            return self.count(thread_id)
+        seg_path, idx_path = self._paths(thread_id)
+        with self._lock, open(seg_path, "ab") as seg, open(idx_path, "ab") as idx:
+            offset = seg.tell()
+            records, offsets = [], []
+            for message in messages:
+                type_, payload = self.serde.dumps_typed(message)
+                tag = type_.encode("utf-8")
+                offsets.append(_OFFSET.pack(offset))
+                record = _RECORD_HEADER.pack(len(payload), len(tag)) + tag + payload
+                records.append(record)
+                offset += len(record)
+            # 先寫資料再寫索引，中途中斷時索引不會指向不完整的紀錄
+            seg.write(b"".join(records))
+            seg.flush()
+            idx.write(b"".join(offsets))
+            idx.flush()
+            return idx.tell() // _OFFSET.size
+
+    def append_new(self, thread_id: str, messages: Sequence[AnyMessage]) -> int:
+        """
+        追加訊息，略過已寫入的部分（依冷資料層最後一則訊息的 id 判斷）
+
+        節點重跑（例如從 checkpoint 恢復）或多個節點移出同一批訊息時，避免重複寫入。
+
+        Returns:
+            追加後冷資料層的訊息數
+        """
+        with self._lock:
+            last_id = self.last_id(thread_id)
+            ids = [message.id for message in messages]
+            if last_id in ids:
+                messages = messages[ids.index(last_id) + 1:]
+            return self.append(thread_id, messages)
+
+    def _iter_records(self, thread_id: str, indices: range) -> Iterator[AnyMessage]:
+        seg_path, idx_path = self._paths(thread_id)
+        if not len(indices):
+            return
+        with open(seg_path, "rb") as seg_file, open(idx_path, "rb") as idx_file, \
+                mmap.mmap(seg_file.fileno(), 0, access=mmap.ACCESS_READ) as seg, \
+                mmap.mmap(idx_file.fileno(), 0, access=mmap.ACCESS_READ) as idx:
+            for index in indices:
+                (offset,) = _OFFSET.unpack_from(idx, index * _OFFSET.size)
+                length, tag_length = _RECORD_HEADER.unpack_from(seg, offset)
+                start = offset + _RECORD_HEADER.size
+                tag = seg[start:start + tag_length].decode("utf-8")
+                yield self.serde.loads_typed((tag, seg[start + tag_length:start + tag_length + length]))
+
+    def read(self, thread_id: str, start: int = 0, stop: Optional[int] = None) -> List[AnyMessage]:
+        """
+        載回冷資料層的訊息
+
+        Args:
+            thread_id: 對話 thread
+            start: 起始索引（0 為最早的訊息，可用負數從尾端算起）
+            stop: 結束索引（不含），None 表示到最後
+
+        Returns:
+            訊息列表
+        """
+        return list(self._iter_records(thread_id, range(self.count(thread_id))[start:stop]))
+
+    def search(self, thread_id: str, query: str, limit: int = 5) -> List[AnyMessage]:
+        """
+        從最新往回搜尋內容包含 query 的訊息（只解碼掃描到的紀錄，不會一次載回整個區段檔）
+
+        Args:
+            thread_id: 對話 thread
+            query: 要搜尋的文字
+            limit: 最多回傳幾則
+
+        Returns:
+            符合的訊息，依時間順序
+        """
+        found: List[AnyMessage] = []
+        for message in self._iter_records(thread_id, range(self.count(thread_id) - 1, -1, -1)):
+            if query in message.text():
+                found.append(message)
+                if len(found) >= limit:
+                    break
+        return found[::-1]
+
+    def last_id(self, thread_id: str) -> Optional[str]:
+        """冷資料層最後一則訊息的 id"""
+        count = self.count(thread_id)
+        if not count:
+            return None
+        return next(self._iter_records(thread_id, range(count - 1, count))).id
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for path in self._paths(thread_id):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def archive_messages(store: TieredMessageStore, thread_id: str, messages: Sequence[AnyMessage], hot_window: int = 20) -> List[RemoveMessage]:
+    """
+    把超出熱資料視窗的訊息移到冷資料層
+
+    只在使用者訊息處切分，避免把 tool call 與對應的 ToolMessage 拆開；開頭的 SystemMessage 一律保留。
+    節點重跑時（例如從 checkpoint 恢復）已寫入的訊息不會重複寫入。
+
+    Args:
+        store: 冷資料層
+        thread_id: 對話 thread
+        messages: 目前 state 中的訊息
+        hot_window: 保留在 state 中的訊息數（實際會略多，直到下一個使用者訊息）
+
+    Returns:
+        要從 state 移除的 RemoveMessage 列表，作為節點回傳的 messages 更新
+    """
+    pinned = 0
+    while pinned < len(messages) and isinstance(messages[pinned], SystemMessage):
+        pinned += 1
+    cut = max(len(messages) - hot_window, pinned)
+    while cut < len(messages) and not isinstance(messages[cut], HumanMessage):
+        cut += 1
+    if cut >= len(messages):
+        return []  # 目前這一輪本身就超過視窗，等下一輪再移
+    old = list(messages[pinned:cut])
+    if not old:
+        return []
+
+    store.append_new(thread_id, old)
+    return [RemoveMessage(id=message.id) for message in old]
@@ -0,0 +1,216 @@
+"""
+以 tokenizer 計算訊息 token 數，並快取每則訊息的結果
+
+trim_messages 每次修剪都會對不同長度的訊息前綴重複計數，對話越長重複計算越多。
+TokenCounter 會以 (訊息 id, 內容 hash) 快取每則訊息的 token 數，持續增長的對話只需要計算新訊息。
+
+計數方式：
+- 有 tiktoken 且能載入編碼（例如 o200k_base）時使用 tiktoken 精確計數。
+  離線環境請先把編碼檔放到 TIKTOKEN_CACHE_DIR，載入失敗時自動改用估算。
+- 否則依文字系統估算：中日韓文字、拉丁字母、數字、空白、標點各有每字元的 token 比例。
+  預設比例以 o200k_base 的一般中英文內容為準，偏向高估（修剪時寧可多修一點，不要超過上限）。
+  有 tokenizer 時可以用 calibrate() 以自己的語料重新校正。
+每則訊息另外加上固定的格式開銷（角色、分隔符號），與 OpenAI chat 格式相同。
+
+直接作為 trim_messages 的 token_counter：
+
+    counter = get_token_counter()
+    trimmer = trim_messages(max_tokens=1000, token_counter=counter, strategy="last")
+
+環境變數：
+- TOKEN_COUNTER_BACKEND：auto（預設）/ tiktoken / estimate
+- TOKEN_COUNTER_ENCODING：tiktoken 編碼名稱，預設 o200k_base
+"""
+
+import os
+import json
+import math
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from langchain_core.messages import BaseMessage
+
+logger = logging.getLogger(__name__)
+
+SCRIPTS = ("cjk", "latin", "digit", "space", "other")
+
+# 每個字元的 token 數（估算用）
+DEFAULT_RATIOS: Dict[str, float] = {
+    "cjk": 1.0,
+    "latin": 0.3,
+    "digit": 0.34,
+    "space": 0.05,
+    "other": 0.6,
+}
+
+MESSAGE_OVERHEAD = 3  # 每則訊息的角色與分隔符號
+NAME_OVERHEAD = 1  # 訊息帶 name 時
+REPLY_OVERHEAD = 3  # 回覆開頭的 priming
+
+
+@lru_cache(maxsize=4096)
+def _script(char: str) -> str:
+    if char.isspace():
+        return "space"
+    if char.isdigit():
+        return "digit"
+    if char.isascii():
+        return "latin" if char.isalpha() else "other"
+    name = unicodedata.name(char, "")
+    if name.startswith(("CJK", "HIRAGANA", "KATAKANA", "HANGUL", "FULLWIDTH", "IDEOGRAPHIC")):
+        return "cjk"
+    return "latin" if char.isalpha() else "other"
+
+
+def script_counts(text: str) -> Dict[str, int]:
+    """統計文字中各文字系統的字元數"""
+    counts = dict.fromkeys(SCRIPTS, 0)
+    for char in text:
+        counts[_script(char)] += 1
+    return counts
+
+
+def message_text(message: BaseMessage) -> str:
+    """取出訊息中會送給模型的文字（內容與 tool call 參數）"""
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, ensure_ascii=False)
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        content += json.dumps([[call["name"], call["args"]] for call in tool_calls], ensure_ascii=False)
+    return content
+
+
+class TokenCounter:
+    """
+    有快取的訊息 token 計數器，可直接傳給 trim_messages(token_counter=...)
+
+    Args:
+        backend: auto / tiktoken / estimate
+        encoding: tiktoken 編碼名稱
+        ratios: 估算用的每字元 token 比例，預設為 DEFAULT_RATIOS
+        max_entries: 快取的訊息數上限
+    """
+
+    def __init__(
+        self,
+        backend: str = "auto",
+        encoding: str = "o200k_base",
+        ratios: Optional[Dict[str, float]] = None,
+        max_entries: int = 100_000,
+    ):
+        if backend not in ("auto", "tiktoken", "estimate"):
+            raise ValueError(f"不支援的 backend：{backend}（可用 auto / tiktoken / estimate）")
+        self.ratios = {**DEFAULT_RATIOS, **(ratios or {})}
+        self.max_entries = max_entries
+        self._encoder = None
+        if backend != "estimate":
+            self._encoder = _load_tiktoken(encoding, required=backend == "tiktoken")
+        self.backend = "tiktoken" if self._encoder is not None else "estimate"
+        self._cache: "OrderedDict[tuple, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def count_text(self, text: str) -> int:
+        """計算一段文字的 token 數"""
+        if not text:
+            return 0
+        if self._encoder is not None:
+            return len(self._encoder.encode(text, disallowed_special=()))
+        counts = script_counts(text)
+        return math.ceil(sum(self.ratios[script] * count for script, count in counts.items()))
+
+    def count_message(self, message: BaseMessage) -> int:
+        """計算單則訊息的 token 數（含格式開銷），結果依訊息 id 與內容快取"""
+        text = message_text(message)
+        # str 的 hash 會快取在字串物件上，重複計數同一則訊息不需要重新掃描內容
+        key = (message.type, message.id, message.name, hash(text))
+        with self._lock:
+            tokens = self._cache.get(key)
+            if tokens is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return tokens
+        tokens = self.count_text(text) + MESSAGE_OVERHEAD + (NAME_OVERHEAD if message.name else 0)
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = tokens
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def __call__(self, messages: Sequence[BaseMessage]) -> int:
+        """計算訊息列表的 token 數（trim_messages 的 token_counter 介面）"""
+        if not messages:
+            return 0
+        return sum(self.count_message(message) for message in messages) + REPLY_OVERHEAD
+
+    def calibrate(self, texts: Iterable[str]) -> Dict[str, float]:
+        """
+        以 tokenizer 的實際結果校正估算比例（需要 tiktoken）
+
+        對每段文字的各文字系統字元數與實際 token 數做非負最小平方法，結果會套用到 self.ratios。
+
+        Args:
+            texts: 代表實際內容的文字樣本
+
+        Returns:
+            校正後的比例
+        """
+        if self._encoder is None:
+            raise RuntimeError("沒有可用的 tokenizer，無法校正")
+        import numpy as np
+
+        rows, targets = [], []
+        for text in texts:
+            counts = script_counts(text)
+            rows.append([counts[script] for script in SCRIPTS])
+            targets.append(self.count_text(text))
+        matrix, target = np.array(rows, dtype=float), np.array(targets, dtype=float)
+        present = [index for index in range(len(SCRIPTS)) if matrix[:, index].any()]
+        active, solved = list(present), {}
+        # 簡單的非負最小平方法：負的係數固定為 0 後重解
+        while active:
+            solution, *_ = np.linalg.lstsq(matrix[:, active], target, rcond=None)
+            if (solution >= 0).all():
+                solved = dict(zip(active, solution))
+                break
+            active = [index for index, value in zip(active, solution) if value > 0]
+        # 樣本中沒有出現的文字系統維持原本的比例
+        for index in present:
+            self.ratios[SCRIPTS[index]] = float(solved.get(index, 0.0))
+        return dict(self.ratios)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得計數器狀態
+
+        Returns:
+            backend、快取的訊息數與命中次數
+        """
+        with self._lock:
+            return {"backend": self.backend, "entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+def _load_tiktoken(encoding: str, required: bool = False):
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(encoding)
+    except Exception as exc:  # 未安裝 tiktoken 或離線時無法下載編碼檔
+        if required:
+            raise
+        logger.warning("無法載入 tiktoken 編碼 %s，改用估算：%s", encoding, exc)
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_token_counter() -> TokenCounter:
+    """依環境變數 TOKEN_COUNTER_BACKEND / TOKEN_COUNTER_ENCODING 取得共用的 TokenCounter"""
+    return TokenCounter(
+        backend=os.getenv("TOKEN_COUNTER_BACKEND", "auto"),
+        encoding=os.getenv("TOKEN_COUNTER_ENCODING", "o200k_base"),
+    )